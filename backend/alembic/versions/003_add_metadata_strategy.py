@@ -0,0 +1,22 @@
+"""add metadata strategy to database connections
+
+Revision ID: 003_add_metadata_strategy
+Revises: 002_fix_use_cases
+Create Date: 2024-03-26 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_add_metadata_strategy'
+down_revision = '002_fix_use_cases'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # NULL means the default per-table API walk
+    op.add_column('database_connections', sa.Column('metadata_strategy', sa.String(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('database_connections', 'metadata_strategy')
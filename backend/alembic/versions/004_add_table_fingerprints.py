@@ -0,0 +1,22 @@
+"""add table fingerprints to database metadata
+
+Revision ID: 004_add_table_fingerprints
+Revises: 003_add_metadata_strategy
+Create Date: 2024-03-27 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_table_fingerprints'
+down_revision = '003_add_metadata_strategy'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Per-table last-modified time and schema hash used for incremental refreshes
+    op.add_column('database_metadata', sa.Column('table_fingerprints', sa.JSON(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('database_metadata', 'table_fingerprints')
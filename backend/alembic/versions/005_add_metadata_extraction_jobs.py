@@ -0,0 +1,49 @@
+"""add metadata extraction jobs table
+
+Revision ID: 005_add_metadata_extraction_jobs
+Revises: 004_add_table_fingerprints
+Create Date: 2024-03-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_add_metadata_extraction_jobs'
+down_revision = '004_add_table_fingerprints'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'metadata_extraction_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('database_connection_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('full_refresh', sa.Boolean(), nullable=False),
+        sa.Column('datasets_total', sa.Integer(), nullable=False),
+        sa.Column('datasets_done', sa.Integer(), nullable=False),
+        sa.Column('tables_done', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.JSON(), nullable=True),
+        sa.Column('database_metadata_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['database_connection_id'], ['database_connections.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['database_metadata_id'], ['database_metadata.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_metadata_extraction_jobs_id'), 'metadata_extraction_jobs', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_metadata_extraction_jobs_database_connection_id'),
+        'metadata_extraction_jobs',
+        ['database_connection_id'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_metadata_extraction_jobs_database_connection_id'), table_name='metadata_extraction_jobs')
+    op.drop_index(op.f('ix_metadata_extraction_jobs_id'), table_name='metadata_extraction_jobs')
+    op.drop_table('metadata_extraction_jobs')
@@ -0,0 +1,26 @@
+"""add precompiled schema text to database metadata
+
+Revision ID: 006_add_precompiled_schema
+Revises: 005_add_metadata_extraction_jobs
+Create Date: 2024-04-02 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_add_precompiled_schema'
+down_revision = '005_add_metadata_extraction_jobs'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Filled on the next metadata save; until then the schema is rendered per request
+    op.add_column('database_metadata', sa.Column('version', sa.String(), nullable=True))
+    op.add_column('database_metadata', sa.Column('schema_text', sa.Text(), nullable=True))
+    op.add_column('database_metadata', sa.Column('schema_token_count', sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('database_metadata', 'schema_token_count')
+    op.drop_column('database_metadata', 'schema_text')
+    op.drop_column('database_metadata', 'version')
@@ -0,0 +1,183 @@
+"""add normalized metadata catalog tables
+
+Revision ID: 007_add_metadata_catalog
+Revises: 006_add_precompiled_schema
+Create Date: 2024-04-05 10:00:00.000000
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_add_metadata_catalog'
+down_revision = '006_add_precompiled_schema'
+branch_labels = None
+depends_on = None
+
+def _schema_hash(columns) -> str:
+    # Same hash as DatabaseService._schema_hash, so the next save skips unchanged tables
+    return hashlib.sha256(json.dumps(columns, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def _backfill() -> None:
+    bind = op.get_bind()
+    metadata_rows = sa.table(
+        'database_metadata',
+        sa.column('database_connection_id', sa.Integer),
+        sa.column('datasets', sa.JSON),
+        sa.column('table_fingerprints', sa.JSON)
+    )
+    datasets_table = sa.table(
+        'metadata_datasets',
+        sa.column('id', sa.Integer),
+        sa.column('database_connection_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('position', sa.Integer),
+        sa.column('table_count', sa.Integer)
+    )
+    tables_table = sa.table(
+        'metadata_tables',
+        sa.column('id', sa.Integer),
+        sa.column('database_connection_id', sa.Integer),
+        sa.column('dataset_id', sa.Integer),
+        sa.column('dataset_name', sa.String),
+        sa.column('name', sa.String),
+        sa.column('position', sa.Integer),
+        sa.column('column_count', sa.Integer),
+        sa.column('schema_hash', sa.String)
+    )
+    columns_table = sa.table(
+        'metadata_columns',
+        sa.column('database_connection_id', sa.Integer),
+        sa.column('table_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('position', sa.Integer),
+        sa.column('type', sa.String),
+        sa.column('mode', sa.String),
+        sa.column('description', sa.Text)
+    )
+
+    for connection_id, datasets, fingerprints in bind.execute(sa.select(
+        metadata_rows.c.database_connection_id,
+        metadata_rows.c.datasets,
+        metadata_rows.c.table_fingerprints
+    )).fetchall():
+        if connection_id is None or not datasets:
+            continue
+        fingerprints = fingerprints or {}
+        for dataset_position, dataset in enumerate(datasets):
+            dataset_id = bind.execute(datasets_table.insert().values(
+                database_connection_id=connection_id,
+                name=dataset['name'],
+                position=dataset_position,
+                table_count=len(dataset['tables'])
+            )).inserted_primary_key[0]
+            for table_position, table in enumerate(dataset['tables']):
+                fingerprint = fingerprints.get(f"{dataset['name']}.{table['name']}") or {}
+                table_id = bind.execute(tables_table.insert().values(
+                    database_connection_id=connection_id,
+                    dataset_id=dataset_id,
+                    dataset_name=dataset['name'],
+                    name=table['name'],
+                    position=table_position,
+                    column_count=len(table['columns']),
+                    schema_hash=fingerprint.get('schema_hash') or _schema_hash(table['columns'])
+                )).inserted_primary_key[0]
+                if table['columns']:
+                    bind.execute(columns_table.insert(), [
+                        {
+                            'database_connection_id': connection_id,
+                            'table_id': table_id,
+                            'name': column['name'],
+                            'position': column_position,
+                            'type': column.get('type'),
+                            'mode': column.get('mode'),
+                            'description': column.get('description')
+                        }
+                        for column_position, column in enumerate(table['columns'])
+                    ])
+
+def upgrade() -> None:
+    op.create_table(
+        'metadata_datasets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('database_connection_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('table_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['database_connection_id'], ['database_connections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('database_connection_id', 'name', name='uq_metadata_datasets_connection_name')
+    )
+    op.create_index(op.f('ix_metadata_datasets_id'), 'metadata_datasets', ['id'], unique=False)
+
+    op.create_table(
+        'metadata_tables',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('database_connection_id', sa.Integer(), nullable=False),
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('dataset_name', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('column_count', sa.Integer(), nullable=False),
+        sa.Column('schema_hash', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['database_connection_id'], ['database_connections.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dataset_id'], ['metadata_datasets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'database_connection_id', 'dataset_name', 'name',
+            name='uq_metadata_tables_connection_dataset_name'
+        )
+    )
+    op.create_index(op.f('ix_metadata_tables_id'), 'metadata_tables', ['id'], unique=False)
+    op.create_index(op.f('ix_metadata_tables_dataset_id'), 'metadata_tables', ['dataset_id'], unique=False)
+    op.create_index(
+        'ix_metadata_tables_connection_name',
+        'metadata_tables',
+        ['database_connection_id', 'name'],
+        unique=False
+    )
+
+    op.create_table(
+        'metadata_columns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('database_connection_id', sa.Integer(), nullable=False),
+        sa.Column('table_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('mode', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['database_connection_id'], ['database_connections.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['table_id'], ['metadata_tables.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_metadata_columns_id'), 'metadata_columns', ['id'], unique=False)
+    op.create_index(
+        'ix_metadata_columns_table_position',
+        'metadata_columns',
+        ['table_id', 'position'],
+        unique=False
+    )
+    op.create_index(
+        'ix_metadata_columns_connection_name',
+        'metadata_columns',
+        ['database_connection_id', 'name'],
+        unique=False
+    )
+
+    _backfill()
+
+def downgrade() -> None:
+    op.drop_index('ix_metadata_columns_connection_name', table_name='metadata_columns')
+    op.drop_index('ix_metadata_columns_table_position', table_name='metadata_columns')
+    op.drop_index(op.f('ix_metadata_columns_id'), table_name='metadata_columns')
+    op.drop_table('metadata_columns')
+    op.drop_index('ix_metadata_tables_connection_name', table_name='metadata_tables')
+    op.drop_index(op.f('ix_metadata_tables_dataset_id'), table_name='metadata_tables')
+    op.drop_index(op.f('ix_metadata_tables_id'), table_name='metadata_tables')
+    op.drop_table('metadata_tables')
+    op.drop_index(op.f('ix_metadata_datasets_id'), table_name='metadata_datasets')
+    op.drop_table('metadata_datasets')
@@ -0,0 +1,23 @@
+"""add updated_at to database metadata
+
+Revision ID: 008_add_metadata_updated_at
+Revises: 007_add_metadata_catalog
+Create Date: 2024-04-08 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_metadata_updated_at'
+down_revision = '007_add_metadata_catalog'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # SQLite cannot add a column with a non-constant default; set existing rows explicitly
+    op.add_column('database_metadata', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE database_metadata SET updated_at = CURRENT_TIMESTAMP")
+
+def downgrade() -> None:
+    op.drop_column('database_metadata', 'updated_at')
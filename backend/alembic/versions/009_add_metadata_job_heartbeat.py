@@ -0,0 +1,39 @@
+"""add owner, heartbeat and one-active-job index to metadata extraction jobs
+
+Revision ID: 009_add_metadata_job_heartbeat
+Revises: 008_add_metadata_updated_at
+Create Date: 2024-04-22 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_add_metadata_job_heartbeat'
+down_revision = '008_add_metadata_updated_at'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status IN ('pending', 'running')")
+
+def upgrade() -> None:
+    op.add_column('metadata_extraction_jobs', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('metadata_extraction_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    # Jobs started before the upgrade have no owner to keep them alive
+    op.execute(
+        "UPDATE metadata_extraction_jobs SET status = 'failed', finished_at = CURRENT_TIMESTAMP "
+        "WHERE status IN ('pending', 'running')"
+    )
+    op.create_index(
+        'uq_metadata_extraction_jobs_active_connection',
+        'metadata_extraction_jobs',
+        ['database_connection_id'],
+        unique=True,
+        postgresql_where=ACTIVE,
+        sqlite_where=ACTIVE
+    )
+
+def downgrade() -> None:
+    op.drop_index('uq_metadata_extraction_jobs_active_connection', table_name='metadata_extraction_jobs')
+    op.drop_column('metadata_extraction_jobs', 'heartbeat_at')
+    op.drop_column('metadata_extraction_jobs', 'owner')
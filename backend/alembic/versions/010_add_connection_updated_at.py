@@ -0,0 +1,23 @@
+"""add updated_at to database connections
+
+Revision ID: 010_add_connection_updated_at
+Revises: 009_add_metadata_job_heartbeat
+Create Date: 2024-04-29 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_add_connection_updated_at'
+down_revision = '009_add_metadata_job_heartbeat'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # SQLite cannot add a column with a non-constant default; set existing rows explicitly
+    op.add_column('database_connections', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE database_connections SET updated_at = CURRENT_TIMESTAMP")
+
+def downgrade() -> None:
+    op.drop_column('database_connections', 'updated_at')
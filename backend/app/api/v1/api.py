@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, database, query
+from app.api.v1.endpoints import auth, database, metrics, query
 
 api_router = APIRouter()
 
@@ -11,4 +11,5 @@ async def health_check():
 # Include other endpoints
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(database.router, prefix="/databases", tags=["databases"])
-api_router.include_router(query.router, prefix="/query", tags=["query"]) 
\ No newline at end of file
+api_router.include_router(query.router, prefix="/query", tags=["query"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"]) 
\ No newline at end of file
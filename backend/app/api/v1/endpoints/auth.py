@@ -3,16 +3,19 @@ import logging
 from typing import Any
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.core import security
+from app.core.auth_cache import CurrentUser
 from app.core.config import settings
+from app.core.deps import get_current_user, get_db
 from app.core.security import get_password_hash, create_access_token, verify_password
 from app.models.user import User
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, User as UserSchema, UserResponse
-from app.services.user import create_user, get_user_by_email
+from app.services.user import create_user, deactivate_user, get_user_by_email
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -67,4 +70,21 @@ def register(user: UserCreate, db: Session = Depends(deps.get_db)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/users/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Deactivate a user. Superusers only; the user's existing tokens stop working at once."""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough privileges"
+        )
+    db_user = await deactivate_user(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return db_user
@@ -1,225 +1,290 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
 from app.core.deps import get_db, get_current_user
-from app.models.base_models import User
+from app.core.http_cache import cache_headers, is_not_modified, make_etag
+from app.core.responses import fast_json_response
+from app.models.metadata_job import MetadataExtractionJob
+from app.models.metadata_catalog import MetadataColumn, MetadataTable
 from app.schemas.database import (
+    CatalogColumn,
+    CatalogColumnMatch,
+    CatalogColumnMatchPage,
+    CatalogDataset,
+    CatalogDatasetPage,
+    CatalogTable,
+    CatalogTablePage,
     DatabaseConnection,
     DatabaseConnectionCreate,
     DatabaseConnectionUpdate,
     DatabaseConnectionResponse,
     DatabaseMetadata,
-    DatabaseMetadataCreate,
     DatabaseMetadataResponse
 )
+from app.schemas.metadata_job import MetadataJobResponse
 from app.services.database import (
     create_database_connection,
     get_database_connection,
     get_user_database_connections,
+    get_connections_version,
     update_database_connection,
     delete_database_connection,
-    create_database_metadata,
     get_database_metadata,
+    get_metadata_version,
     DatabaseService
 )
+from app.services.metadata_catalog import (
+    get_catalog_columns,
+    get_catalog_table,
+    list_catalog_datasets,
+    list_catalog_tables,
+    search_catalog_columns,
+    search_catalog_tables
+)
+from app.services.metadata_jobs import get_metadata_job, metadata_job_manager
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/", response_model=DatabaseConnectionResponse)
-def create_connection(
+async def create_connection(
     connection: DatabaseConnectionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Create a new database connection."""
     logger.debug(f"Creating database connection for user {current_user.id}")
-    db_connection = create_database_connection(db, connection, current_user.id)
+    db_connection = await create_database_connection(db, connection, current_user.id)
     logger.debug(f"Created database connection with ID {db_connection.id}")
     return db_connection
 
 @router.get("/", response_model=List[DatabaseConnectionResponse])
-def list_connections(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def list_connections(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """List all database connections for the current user."""
+    """List all database connections for the current user.
+
+    The ETag comes from the count, highest id and last edit of the connections,
+    so ``If-None-Match`` is answered with a 304 before the list is loaded.
+    """
     logger.debug(f"Listing database connections for user {current_user.id}")
-    connections = get_user_database_connections(db, current_user.id)
+    count, max_id, updated_at = await get_connections_version(db, current_user.id)
+    etag = make_etag(current_user.id, count, max_id, updated_at.isoformat() if updated_at else None)
+    headers = cache_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return Response(status_code=304, headers=headers)
+    connections = await get_user_database_connections(db, current_user.id)
     logger.debug(f"Found {len(connections)} connections")
+    response.headers.update(headers)
     return connections
 
 @router.get("/{connection_id}", response_model=DatabaseConnectionResponse)
-def get_connection(
+async def get_connection(
     connection_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Get a specific database connection."""
     logger.debug(f"Getting database connection {connection_id} for user {current_user.id}")
-    connection = get_database_connection(db, connection_id, current_user.id)
+    connection = await get_database_connection(db, connection_id, current_user.id)
     if not connection:
         logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
         raise HTTPException(status_code=404, detail="Database connection not found")
     return connection
 
 @router.put("/{connection_id}", response_model=DatabaseConnectionResponse)
-def update_connection(
+async def update_connection(
     connection_id: int,
     connection: DatabaseConnectionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Update a database connection."""
     logger.debug(f"Updating database connection {connection_id} for user {current_user.id}")
-    updated_connection = update_database_connection(db, connection_id, current_user.id, connection)
+    updated_connection = await update_database_connection(db, connection_id, current_user.id, connection)
     if not updated_connection:
         logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
         raise HTTPException(status_code=404, detail="Database connection not found")
     return updated_connection
 
 @router.delete("/{connection_id}")
-def delete_connection(
+async def delete_connection(
     connection_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Delete a database connection."""
     logger.debug(f"Deleting database connection {connection_id} for user {current_user.id}")
-    success = delete_database_connection(db, connection_id, current_user.id)
+    success = await delete_database_connection(db, connection_id, current_user.id)
     if not success:
         logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
         raise HTTPException(status_code=404, detail="Database connection not found")
     return {"message": "Database connection deleted successfully"}
 
 @router.post("/{connection_id}/test")
-def test_connection(
+async def test_connection(
     connection_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """Test a database connection."""
-    connection = get_database_connection(db, connection_id, current_user.id)
+    connection = await get_database_connection(db, connection_id, current_user.id)
     if not connection:
         raise HTTPException(status_code=404, detail="Database connection not found")
     
-    if DatabaseService.test_connection(connection):
+    # Connecting is blocking network I/O; keep it off the event loop
+    if await run_in_threadpool(DatabaseService.test_connection, connection):
         return {"status": "success", "message": "Connection successful"}
     else:
         raise HTTPException(status_code=400, detail="Connection failed")
 
-@router.post("/{connection_id}/metadata", response_model=DatabaseMetadataResponse)
-def extract_metadata(
+def _job_response(job: MetadataExtractionJob) -> MetadataJobResponse:
+    """Convert an extraction job row into its API response."""
+    elapsed_seconds = None
+    if job.started_at:
+        elapsed_seconds = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    return MetadataJobResponse(
+        id=job.id,
+        database_connection_id=job.database_connection_id,
+        status=job.status,
+        full_refresh=job.full_refresh,
+        datasets_total=job.datasets_total,
+        datasets_done=job.datasets_done,
+        tables_done=job.tables_done,
+        errors=job.errors or [],
+        elapsed_seconds=elapsed_seconds,
+        database_metadata_id=job.database_metadata_id,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+async def _check_metadata_cache(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    connection_id: int
+) -> Optional[Response]:
+    """Set ETag/Last-Modified from the metadata version; return a 304 if the client's copy is current.
+
+    The version hashes only datasets and relationships, so the save time is part
+    of the ETag too: every write sets it, covering tables and constraints.
+    """
+    found = await get_metadata_version(db, connection_id)
+    if not found or not found[0]:
+        return None
+    version, updated_at = found
+    etag = make_etag(connection_id, version, updated_at.isoformat() if updated_at else None)
+    headers = cache_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+@router.post("/{connection_id}/metadata", response_model=MetadataJobResponse, status_code=202)
+async def extract_metadata(
     connection_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    full_refresh: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Extract metadata from a database connection."""
-    start_time = time.time()
-    logger.info(f"Starting metadata extraction for connection {connection_id} for user {current_user.id}")
-    
+    """Start a background metadata extraction job for a database connection.
+
+    Existing metadata is refreshed incrementally unless ``full_refresh=true``.
+    If a job for this connection is already pending or running, that job is
+    returned instead of starting a new one. Poll
+    ``GET /{connection_id}/metadata/jobs/{job_id}`` for progress.
+    """
+    logger.info(f"Requesting metadata extraction for connection {connection_id} for user {current_user.id}")
+    connection = await get_database_connection(db, connection_id, current_user.id)
+    if not connection:
+        logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
+        raise HTTPException(status_code=404, detail="Database connection not found")
+
     try:
-        # Check if metadata already exists
-        logger.debug(f"Checking for existing metadata for connection {connection_id}")
-        existing_metadata = get_database_metadata(db, connection_id)
-        if existing_metadata:
-            logger.info(f"Found existing metadata for connection {connection_id}, deleting it")
-            db.delete(existing_metadata)
-            db.commit()
-            logger.debug("Existing metadata deleted successfully")
-        
-        # Get database connection
-        logger.debug(f"Fetching database connection {connection_id}")
-        connection = get_database_connection(db, connection_id, current_user.id)
-        if not connection:
-            logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
-            raise HTTPException(status_code=404, detail="Database connection not found")
-        logger.debug(f"Found database connection {connection_id}")
-        
-        # Extract metadata from BigQuery
-        logger.info(f"Starting BigQuery metadata extraction for connection {connection_id}")
-        bigquery_start = time.time()
-        try:
-            metadata_dict = DatabaseService.get_database_metadata(connection)
-            bigquery_duration = time.time() - bigquery_start
-            logger.info(f"BigQuery metadata extraction completed in {bigquery_duration:.2f} seconds")
-        except Exception as e:
-            logger.error(f"BigQuery metadata extraction failed after {time.time() - bigquery_start:.2f} seconds: {str(e)}", exc_info=True)
-            raise
-        
-        # Create metadata record
-        logger.debug(f"Creating metadata record for connection {connection_id}")
-        db_start = time.time()
-        try:
-            metadata = create_database_metadata(
-                db,
-                DatabaseMetadataCreate(
-                    database_connection_id=connection_id,
-                    datasets=metadata_dict.get('datasets'),
-                    tables=metadata_dict.get('tables'),
-                    relationships=metadata_dict.get('relationships'),
-                    constraints=metadata_dict.get('constraints')
-                )
-            )
-            db_duration = time.time() - db_start
-            logger.info(f"Database metadata creation completed in {db_duration:.2f} seconds")
-        except Exception as e:
-            logger.error(f"Database metadata creation failed after {time.time() - db_start:.2f} seconds: {str(e)}", exc_info=True)
-            raise
-        
-        # Convert to response model
-        logger.debug("Converting to response model")
-        response = DatabaseMetadataResponse(
-            id=metadata.id,
-            database_connection_id=metadata.database_connection_id,
-            datasets=metadata.datasets,
-            tables=metadata.tables,
-            relationships=metadata.relationships,
-            constraints=metadata.constraints
-        )
-        
-        total_duration = time.time() - start_time
-        logger.info(f"Metadata extraction completed successfully in {total_duration:.2f} seconds")
-        return response
-        
-    except ValueError as ve:
-        logger.error(f"Validation error for connection {connection_id}: {str(ve)}")
-        raise HTTPException(status_code=422, detail=str(ve))
+        job = await metadata_job_manager.submit(db, connection, current_user.id, full_refresh)
     except Exception as e:
-        logger.error(f"Error extracting metadata for connection {connection_id}: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing metadata extraction for connection {connection_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error extracting metadata: {str(e)}")
+    return _job_response(job)
 
-@router.get("/{connection_id}/metadata", response_model=DatabaseMetadataResponse)
-def get_connection_metadata(
+@router.get("/{connection_id}/metadata/jobs/{job_id}", response_model=MetadataJobResponse)
+async def get_metadata_job_status(
     connection_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """Get metadata for a database connection."""
+    """Get the progress of a metadata extraction job."""
+    connection = await get_database_connection(db, connection_id, current_user.id)
+    if not connection:
+        logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
+        raise HTTPException(status_code=404, detail="Database connection not found")
+
+    job = await get_metadata_job(db, job_id, connection_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Metadata job not found")
+    return _job_response(job)
+
+@router.get(
+    "/{connection_id}/metadata",
+    response_model=DatabaseMetadataResponse,
+    responses={202: {"model": MetadataJobResponse}}
+)
+async def get_connection_metadata(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get metadata for a database connection.
+
+    If no metadata has been extracted yet, an extraction job is started and
+    returned with status 202. Responses carry an ETag and Last-Modified from
+    the metadata version; a matching ``If-None-Match`` gets a 304 without
+    loading the metadata.
+    """
     logger.debug(f"Getting metadata for database connection {connection_id} for user {current_user.id}")
-    connection = get_database_connection(db, connection_id, current_user.id)
+    connection = await get_database_connection(db, connection_id, current_user.id)
     if not connection:
         logger.warning(f"Database connection {connection_id} not found for user {current_user.id}")
         raise HTTPException(status_code=404, detail="Database connection not found")
+
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
     
-    metadata = get_database_metadata(db, connection_id)
+    metadata = await get_database_metadata(db, connection_id)
     if not metadata:
-        logger.debug(f"Metadata not found for database connection {connection_id}, creating new metadata")
-        # If metadata doesn't exist, create it
-        metadata_dict = DatabaseService.get_database_metadata(connection)
-        metadata = create_database_metadata(
-            db,
-            DatabaseMetadataCreate(
-                database_connection_id=connection_id,
-                datasets=metadata_dict.get('datasets'),
-                tables=metadata_dict.get('tables'),
-                relationships=metadata_dict.get('relationships'),
-                constraints=metadata_dict.get('constraints')
-            )
-        )
+        logger.debug(f"Metadata not found for database connection {connection_id}, starting extraction job")
+        job = await metadata_job_manager.submit(db, connection, current_user.id)
+        return JSONResponse(status_code=202, content=jsonable_encoder(_job_response(job)))
     
+    if settings.FAST_JSON_RESPONSES:
+        # The JSON columns were validated when saved; serialize them as loaded
+        return fast_json_response(
+            {
+                "id": metadata.id,
+                "database_connection_id": metadata.database_connection_id,
+                "datasets": metadata.datasets,
+                "tables": metadata.tables,
+                "relationships": metadata.relationships,
+                "constraints": metadata.constraints
+            },
+            headers=dict(response.headers)
+        )
+
     # Convert to response model
     return DatabaseMetadataResponse(
         id=metadata.id,
@@ -228,4 +293,173 @@ def get_connection_metadata(
         tables=metadata.tables,
         relationships=metadata.relationships,
         constraints=metadata.constraints
-    ) 
\ No newline at end of file
+    )
+
+ColumnFields = Literal["names", "full"]
+
+def _catalog_column(column: MetadataColumn, fields: ColumnFields) -> CatalogColumn:
+    if fields == "names":
+        return CatalogColumn(name=column.name, position=column.position)
+    return CatalogColumn(
+        name=column.name,
+        position=column.position,
+        type=column.type,
+        mode=column.mode,
+        description=column.description
+    )
+
+def _catalog_table(
+    table: MetadataTable,
+    columns: Optional[List[MetadataColumn]] = None,
+    fields: ColumnFields = "names"
+) -> CatalogTable:
+    return CatalogTable(
+        dataset=table.dataset_name,
+        name=table.name,
+        column_count=table.column_count,
+        columns=[_catalog_column(column, fields) for column in columns] if columns is not None else None
+    )
+
+async def _require_connection(db: AsyncSession, connection_id: int, user_id: int) -> None:
+    if not await get_database_connection(db, connection_id, user_id):
+        logger.warning(f"Database connection {connection_id} not found for user {user_id}")
+        raise HTTPException(status_code=404, detail="Database connection not found")
+
+@router.get("/{connection_id}/metadata/datasets", response_model=CatalogDatasetPage)
+async def list_metadata_datasets(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    search: Optional[str] = Query(None, description="Dataset name prefix"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """List a connection's datasets, one page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    await _require_connection(db, connection_id, current_user.id)
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
+    try:
+        datasets, next_cursor = await list_catalog_datasets(db, connection_id, limit, cursor, search)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CatalogDatasetPage(
+        items=[CatalogDataset(name=dataset.name, table_count=dataset.table_count) for dataset in datasets],
+        next_cursor=next_cursor
+    )
+
+@router.get("/{connection_id}/metadata/datasets/{dataset_name}/tables", response_model=CatalogTablePage)
+async def list_metadata_tables(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    dataset_name: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    search: Optional[str] = Query(None, description="Table name prefix"),
+    include_columns: bool = False,
+    fields: ColumnFields = "names",
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """List the tables of one dataset, one page at a time.
+
+    Columns are left out unless ``include_columns=true``; ``fields=names``
+    returns only column names, ``fields=full`` adds types, modes and
+    descriptions.
+    """
+    await _require_connection(db, connection_id, current_user.id)
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
+    try:
+        tables, next_cursor = await list_catalog_tables(db, connection_id, dataset_name, limit, cursor, search)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = await get_catalog_columns(db, [table.id for table in tables]) if include_columns else {}
+    return CatalogTablePage(
+        items=[_catalog_table(table, columns.get(table.id), fields) for table in tables],
+        next_cursor=next_cursor
+    )
+
+@router.get("/{connection_id}/metadata/datasets/{dataset_name}/tables/{table_name}", response_model=CatalogTable)
+async def get_metadata_table(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    dataset_name: str,
+    table_name: str,
+    fields: ColumnFields = "full",
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get one table with its columns."""
+    await _require_connection(db, connection_id, current_user.id)
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
+    found = await get_catalog_table(db, connection_id, dataset_name, table_name)
+    if not found:
+        raise HTTPException(status_code=404, detail="Table not found")
+    table, columns = found
+    return _catalog_table(table, columns, fields)
+
+@router.get("/{connection_id}/metadata/search/tables", response_model=CatalogTablePage)
+async def search_metadata_tables(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, description="Table name prefix (case-sensitive)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Find tables by name prefix across all datasets."""
+    await _require_connection(db, connection_id, current_user.id)
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
+    try:
+        tables, next_cursor = await search_catalog_tables(db, connection_id, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CatalogTablePage(items=[_catalog_table(table) for table in tables], next_cursor=next_cursor)
+
+@router.get("/{connection_id}/metadata/search/columns", response_model=CatalogColumnMatchPage)
+async def search_metadata_columns(
+    connection_id: int,
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, description="Column name prefix (case-sensitive)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    fields: ColumnFields = "names",
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Find columns by name prefix across all tables."""
+    await _require_connection(db, connection_id, current_user.id)
+    not_modified = await _check_metadata_cache(request, response, db, connection_id)
+    if not_modified:
+        return not_modified
+    try:
+        matches, next_cursor = await search_catalog_columns(db, connection_id, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CatalogColumnMatchPage(
+        items=[
+            CatalogColumnMatch(
+                dataset=table.dataset_name,
+                table=table.name,
+                column=_catalog_column(column, fields)
+            )
+            for column, table in matches
+        ],
+        next_cursor=next_cursor
+    )
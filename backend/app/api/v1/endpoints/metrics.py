@@ -0,0 +1,24 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.core.auth_cache import CurrentUser
+from app.core.deps import get_current_user
+from app.db.session import pool_metrics
+
+router = APIRouter()
+
+@router.get("/db-pool")
+async def get_db_pool_metrics(
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Connection pool metrics for the app database.
+
+    Reports pool saturation (checked out connections over pool size plus
+    overflow) and connection churn for the sync and async engines, and
+    checkout wait times for the async engine that serves requests.
+    Only available to superusers.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
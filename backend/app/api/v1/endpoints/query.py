@@ -1,47 +1,51 @@
-from typing import Any
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from google.api_core.exceptions import BadRequest
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_cache import CurrentUser
+from app.core.config import settings
 from app.core.deps import get_db, get_current_user
-from app.models.user import User
-from app.models.database_connection import DatabaseConnection
-from app.models.database_metadata import DatabaseMetadata
-from app.models.use_case import UseCase
-from app.services.sql_generation import SQLGenerationService
-from app.schemas.query import QuestionRequest, SQLQueryResponse
+from app.models.base_models import DatabaseConnection
+from app.services.cost_estimation import QueryCostExceededError
+from app.services.database import GenerationMetadata, get_database_connection, get_generation_metadata, get_use_cases
+from app.services.query_execution import FORMAT_ARROW, MEDIA_TYPES, QueryNotAllowed, execute_query, pyarrow
+from app.services.sql_generation import SQLGenerationService, get_sql_generation_service
+from app.schemas.query import (
+    BatchQuestionRequest,
+    BatchQuestionResult,
+    BatchSQLQueryResponse,
+    ExecuteQueryRequest,
+    QuestionRequest,
+    SQLQueryResponse
+)
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-@router.post("/{connection_id}/generate", response_model=SQLQueryResponse)
-async def generate_sql_query(
-    *,
-    db: Session = Depends(get_db),
+async def _load_generation_context(
+    db: AsyncSession,
     connection_id: int,
-    question_in: QuestionRequest,
-    current_user: User = Depends(get_current_user)
-) -> Any:
-    """
-    Generate SQL query from natural language question.
-    """
+    user_id: int
+) -> Tuple[DatabaseConnection, GenerationMetadata, Optional[List[Dict[str, str]]]]:
+    """Load the connection, metadata and use cases a generation request needs."""
     # Get database connection
-    connection = db.query(DatabaseConnection).filter(
-        DatabaseConnection.id == connection_id,
-        DatabaseConnection.user_id == current_user.id
-    ).first()
+    connection = await get_database_connection(db, connection_id, user_id)
     if not connection:
         raise HTTPException(status_code=404, detail="Database connection not found")
     
-    # Get database metadata
-    metadata = db.query(DatabaseMetadata).filter(
-        DatabaseMetadata.database_connection_id == connection_id
-    ).first()
+    # Get database metadata (cached per version, so usually only the version is read)
+    metadata = await get_generation_metadata(db, connection_id)
     if not metadata:
         raise HTTPException(status_code=404, detail="Database metadata not found")
     
     # Get use cases for this database
-    use_cases = db.query(UseCase).filter(
-        UseCase.database_connection_id == connection_id
-    ).all()
+    use_cases = await get_use_cases(db, connection_id)
     use_cases_dict = [
         {
             "natural_language_example": case.natural_language_example,
@@ -49,19 +53,200 @@ async def generate_sql_query(
         }
         for case in use_cases
     ] if use_cases else None
+    return connection, metadata, use_cases_dict
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/{connection_id}/generate", response_model=SQLQueryResponse)
+async def generate_sql_query(
+    *,
+    db: AsyncSession = Depends(get_db),
+    connection_id: int,
+    question_in: QuestionRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    sql_service: SQLGenerationService = Depends(get_sql_generation_service)
+) -> Any:
+    """
+    Generate SQL query from natural language question.
+    """
+    connection, metadata, use_cases = await _load_generation_context(db, connection_id, current_user.id)
     
     # Generate SQL query
-    sql_service = SQLGenerationService()
     try:
         result = await sql_service.generate_sql(
             question_in.question,
             metadata,
             connection,
-            use_cases_dict
+            use_cases
         )
         return result
+    except QueryCostExceededError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating SQL query: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/{connection_id}/generate/stream")
+async def stream_sql_query(
+    *,
+    db: AsyncSession = Depends(get_db),
+    connection_id: int,
+    question_in: QuestionRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    sql_service: SQLGenerationService = Depends(get_sql_generation_service)
+) -> Any:
+    """
+    Generate SQL query from natural language question, streamed as Server-Sent Events.
+
+    Emits ``token`` events with raw model output as it arrives, then one
+    ``result`` event with the parsed ``SQLQueryResponse`` (or an ``error``
+    event if generation fails).
+    """
+    connection, metadata, use_cases = await _load_generation_context(db, connection_id, current_user.id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for kind, value in sql_service.stream_sql(
+                question_in.question,
+                metadata,
+                connection,
+                use_cases
+            ):
+                if kind == "token":
+                    yield _sse_event("token", {"text": value})
+                else:
+                    response = SQLQueryResponse(**value.model_dump())
+                    yield _sse_event("result", response.model_dump())
+        except Exception as e:
+            logger.error(f"Error streaming SQL query for connection {connection_id}: {str(e)}")
+            yield _sse_event("error", {"detail": f"Error generating SQL query: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # identity keeps the compression middleware from buffering events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
+@router.post("/{connection_id}/generate/batch", response_model=BatchSQLQueryResponse)
+async def generate_sql_query_batch(
+    *,
+    db: AsyncSession = Depends(get_db),
+    connection_id: int,
+    batch_in: BatchQuestionRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    sql_service: SQLGenerationService = Depends(get_sql_generation_service)
+) -> Any:
+    """
+    Generate SQL queries for a list of questions against one connection.
+
+    The connection, metadata and use cases are loaded once and questions are
+    generated concurrently. Each item carries either a result or an error.
+    With ``stream`` set, results are returned as NDJSON lines in completion
+    order instead of one response.
+    """
+    if len(batch_in.questions) > settings.SQL_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.SQL_BATCH_MAX_QUESTIONS} questions"
+        )
+    connection, metadata, use_cases = await _load_generation_context(db, connection_id, current_user.id)
+    concurrency = min(
+        batch_in.concurrency or settings.SQL_BATCH_CONCURRENCY,
+        settings.SQL_BATCH_MAX_CONCURRENCY
+    )
+
+    def item(index: int, result: Any, error: Any) -> BatchQuestionResult:
+        return BatchQuestionResult(
+            index=index,
+            question=batch_in.questions[index],
+            result=SQLQueryResponse(**result.model_dump()) if result is not None else None,
+            error=error
+        )
+
+    results = sql_service.generate_sql_batch(
+        batch_in.questions,
+        metadata,
+        connection,
+        use_cases,
+        concurrency
+    )
+
+    if batch_in.stream:
+        async def lines() -> AsyncIterator[str]:
+            async for index, result, error in results:
+                yield item(index, result, error).model_dump_json() + "\n"
+
+        return StreamingResponse(
+            lines(),
+            media_type="application/x-ndjson",
+            headers={"Content-Encoding": "identity"}
+        )
+
+    items = [item(index, result, error) async for index, result, error in results]
+    items.sort(key=lambda entry: entry.index)
+    failed = sum(1 for entry in items if entry.error is not None)
+    logger.info(
+        f"Generated batch of {len(items)} questions for connection {connection_id} "
+        f"({failed} failed, concurrency {concurrency})"
+    )
+    return BatchSQLQueryResponse(
+        results=items,
+        succeeded=len(items) - failed,
+        failed=failed
+    )
+
+@router.post("/{connection_id}/execute")
+async def execute_sql_query(
+    *,
+    db: AsyncSession = Depends(get_db),
+    connection_id: int,
+    query_in: ExecuteQueryRequest,
+    current_user: CurrentUser = Depends(get_current_user)
+) -> Any:
+    """
+    Run a SELECT query against the connection and stream the rows.
+
+    Other statements (DML, DDL, scripts) are rejected with a 400.
+
+    Rows are streamed as NDJSON (default) or an Arrow IPC stream, read page
+    by page so large results are never held in memory. Output stops at
+    ``max_rows`` rows or ``max_bytes`` bytes; the ``X-Total-Rows`` header
+    tells clients whether they received everything.
+    """
+    connection = await get_database_connection(db, connection_id, current_user.id)
+    if not connection:
+        raise HTTPException(status_code=404, detail="Database connection not found")
+    if query_in.format == FORMAT_ARROW and pyarrow is None:
+        raise HTTPException(status_code=400, detail="Arrow output is not available on this server")
+
+    max_rows = min(query_in.max_rows or settings.QUERY_EXECUTION_MAX_ROWS, settings.QUERY_EXECUTION_MAX_ROWS)
+    max_bytes = min(query_in.max_bytes or settings.QUERY_EXECUTION_MAX_BYTES, settings.QUERY_EXECUTION_MAX_BYTES)
+    try:
+        result = await run_in_threadpool(execute_query, connection, query_in.sql, max_rows, max_bytes)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueryNotAllowed as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BadRequest as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e.message}")
+    except Exception as e:
+        logger.error(f"Error executing query for connection {connection_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error executing query: {str(e)}"
+        )
+
+    body = result.arrow() if query_in.format == FORMAT_ARROW else result.ndjson()
+    # Sync iterators are consumed in the threadpool, one page at a time
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[query_in.format],
+        headers={**result.headers(), "Content-Encoding": "identity"},
+        # Releases the client if the body is never iterated
+        background=BackgroundTask(result.close)
+    )
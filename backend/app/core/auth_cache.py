@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from jose import jwt
+
+from app.core.config import settings
+
+class _BoundedCache:
+    """Thread-safe LRU mapping whose entries carry their own expiry time (wall clock)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Immutable snapshot of the authenticated user, safe to share across requests."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_orm_user(cls, user: Any) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser)
+        )
+
+_token_cache = _BoundedCache(settings.AUTH_TOKEN_CACHE_SIZE)
+_user_cache = _BoundedCache(settings.AUTH_USER_CACHE_SIZE)
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Decode and verify a JWT, memoizing the payload until the token expires.
+
+    Raises ``JWTError`` for invalid or expired tokens; failures are not cached.
+    """
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        _token_cache.set(token, payload, float(expires_at))
+    return payload
+
+def get_cached_user(user_id: int) -> Optional[CurrentUser]:
+    """Get a recently loaded user, if still fresh."""
+    return _user_cache.get(user_id)
+
+def cache_user(user: CurrentUser) -> None:
+    """Remember a loaded user for ``AUTH_USER_CACHE_TTL_SECONDS``."""
+    _user_cache.set(user.id, user, time.time() + settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user from the cache, e.g. after deactivation or a permission change."""
+    _user_cache.pop(user_id)
@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Optional, Union
 import os
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, validator
@@ -10,11 +10,132 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     SECRET_KEY: str = "your-secret-key-here"  # Change this in production
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # Decoded tokens memoized until they expire
+    AUTH_USER_CACHE_SIZE: int = 10000  # Users cached for get_current_user
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30.0  # How long a cached user is trusted without a DB lookup
     
     # Use absolute path for SQLite database
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{os.path.join(BASE_DIR, 'sql_app.db')}"
+    # Async URL for the request path; derived from SQLALCHEMY_DATABASE_URI when unset
+    # (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg)
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+
+    # App database connection pool (per engine; the sync and async engines each have one)
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 20  # Extra connections opened under load and closed on checkin
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced, ahead of server idle timeouts
+    DB_POOL_PRE_PING: bool = False  # Ping on every checkout; recycling makes this unnecessary in most setups
+    DB_CONNECT_TIMEOUT: int = 10  # Seconds (Postgres)
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Server-side statement timeout (Postgres); 0 disables it
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait for a write lock instead of failing with "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 64000  # Page cache per connection
     OPENAI_API_KEY: str = ""  # Add your OpenAI API key here
+    OPENAI_MODEL: str = "gpt-4"
+    OPENAI_REQUEST_TIMEOUT: float = 60.0  # Seconds
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_MAX_CONNECTIONS: int = 100  # Shared HTTP connection pool for all requests
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle connection is kept open
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+
+    # Response compression
+    RESPONSE_COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent as-is
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_ENABLED: bool = True  # Used when brotli-asgi is installed, with gzip as fallback
+    RESPONSE_BROTLI_QUALITY: int = 4
+    FAST_JSON_RESPONSES: bool = False  # Serialize large metadata responses with orjson, skipping re-validation
+
+    # Generated SQL cache
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_MAX_ENTRIES: int = 1000
+    SQL_CACHE_TTL_SECONDS: float = 60 * 60  # 1 hour
+    SQL_CACHE_SIMILARITY_ENABLED: bool = False  # Match near-identical questions by embedding similarity
+    SQL_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Minimum cosine similarity for a similarity hit
+
+    # Offline validation of generated SQL against the schema (requires sqlglot)
+    SQL_VALIDATION_ENABLED: bool = True
+    SQL_VALIDATION_MAX_RETRIES: int = 2  # Corrected queries requested from the model after a failed validation
+    SQL_VALIDATION_INDEX_CACHE_SIZE: int = 32  # Reference indexes kept in memory (one per connection and metadata version)
+
+    # Dry-run cost estimation for generated SQL
+    SQL_DRY_RUN_ENABLED: bool = False  # Dry-run generated SQL and add bytes scanned and cost to its metadata
+    SQL_DRY_RUN_BYTE_BUDGET: Optional[int] = None  # Queries scanning more bytes are flagged as over budget
+    SQL_DRY_RUN_REJECT_OVER_BUDGET: bool = False  # Reject over-budget queries instead of flagging them
+    SQL_DRY_RUN_CACHE_SIZE: int = 1000
+    SQL_DRY_RUN_CACHE_TTL_SECONDS: float = 15 * 60  # Table sizes change, so estimates are refreshed
+    BIGQUERY_PRICE_PER_TIB: float = 6.25  # On-demand USD price per TiB scanned
+
+    # Prompt assembly
+    PROMPT_TOKEN_BUDGET: int = 8000  # Whole prompt: instructions, schema, examples and question
+    USE_CASE_TOP_K: int = 5  # Most relevant use cases included as few-shot examples
+    USE_CASE_TOKEN_BUDGET: int = 1500  # Prompt tokens available for examples
+    USE_CASE_INDEX_CACHE_SIZE: int = 32  # Use case indexes kept in memory (one per connection and version)
+    GENERATION_METADATA_CACHE_SIZE: int = 32  # Metadata kept in memory for generation (one per connection and metadata version)
+    USE_CASE_EMBEDDINGS_ENABLED: bool = False  # Blend embedding similarity into the use case ranking
+    USE_CASE_EMBEDDING_WEIGHT: float = 0.5
+
+    # Schema retrieval before prompt construction
+    SCHEMA_RETRIEVAL_ENABLED: bool = True
+    SCHEMA_RETRIEVAL_TOP_K: int = 25  # Most relevant tables considered for the prompt
+    SCHEMA_TOKEN_BUDGET: int = 6000  # Prompt tokens available for the schema block (within PROMPT_TOKEN_BUDGET)
+    SCHEMA_MAX_COLUMNS_PER_TABLE: int = 60  # Wider tables keep the columns the question mentions first
+    SCHEMA_RETRIEVAL_EMBEDDINGS_ENABLED: bool = False  # Blend embedding similarity into the lexical ranking
+    SCHEMA_RETRIEVAL_EMBEDDING_WEIGHT: float = 0.5
+    SCHEMA_INDEX_CACHE_SIZE: int = 32  # Schema indexes kept in memory (one per connection and metadata version)
+
+    # Local vector index: table and use case embeddings stored per connection,
+    # memory-mapped for search and updated incrementally
+    VECTOR_INDEX_DIR: str = os.path.join(BASE_DIR, "vector_index")
+    VECTOR_INDEX_EMBED_BATCH_SIZE: int = 256  # Texts sent per embeddings request
+
+    # Relationship inference and join paths in the prompt
+    RELATIONSHIP_INFERENCE_ENABLED: bool = True  # Infer joins from column names and types where no FKs are declared
+    RELATIONSHIP_SAMPLING_ENABLED: bool = False  # Confirm inferred joins by sampling values (relational databases only)
+    RELATIONSHIP_SAMPLE_SIZE: int = 1000  # Referencing values sampled per inferred join
+    RELATIONSHIP_MIN_OVERLAP: float = 0.8  # Sampled values that must exist in the referenced column
+    JOIN_PATH_MAX_LENGTH: int = 3  # Joins per path
+    JOIN_PATH_MAX_PATHS: int = 5000  # Paths found per prompt, between pairs of its tables
+    JOIN_PATH_CACHE_SIZE: int = 32  # Join graphs kept in memory (one per connection and metadata version)
+    JOIN_PATH_SOURCE_CACHE_SIZE: int = 1024  # Tables whose shortest paths are kept per join graph
+    JOIN_PATH_TOKEN_BUDGET: int = 500  # Prompt tokens available for join conditions (within PROMPT_TOKEN_BUDGET)
+
+    # Batch SQL generation
+    SQL_BATCH_MAX_QUESTIONS: int = 500  # Questions accepted per batch request
+    SQL_BATCH_CONCURRENCY: int = 8  # Default concurrent generations per batch
+    SQL_BATCH_MAX_CONCURRENCY: int = 32  # Upper bound for a requested concurrency
+    SQL_BATCH_RATE_LIMIT_RETRIES: int = 5  # Retries per question after the client's own retries hit a rate limit
+    SQL_BATCH_RATE_LIMIT_BACKOFF: float = 2.0  # Seconds before the first retry; doubles on each retry
+
+    # BigQuery metadata crawl tuning
+    BIGQUERY_CRAWL_MAX_WORKERS: int = 8  # Concurrent get_table() requests
+    BIGQUERY_CRAWL_BATCH_SIZE: int = 10  # Tables fetched per worker task within a dataset
+    BIGQUERY_INFORMATION_SCHEMA_PAGE_SIZE: int = 10000  # Rows per page when streaming INFORMATION_SCHEMA results
+
+    # Relational database (Postgres, MySQL, SQLite) metadata extraction
+    METADATA_EXTRACTOR_MAX_WORKERS: int = 4  # Schemas read in parallel, each on its own connection
+    SQLITE_CONNECTIONS_DIR: Optional[str] = None  # SQLite connections may only open files in this directory; unset disables them
+
+    # Cached BigQuery clients
+    BIGQUERY_CLIENT_CACHE_SIZE: int = 32  # Clients kept open (one per connection)
+    BIGQUERY_CLIENT_IDLE_SECONDS: float = 30 * 60  # Close clients unused for this long
+    BIGQUERY_TOKEN_REFRESH_MARGIN: float = 5 * 60  # Refresh access tokens this many seconds before they expire
+
+    # Query execution
+    QUERY_EXECUTION_MAX_ROWS: int = 1_000_000  # Upper bound for rows streamed per request
+    QUERY_EXECUTION_MAX_BYTES: int = 256 * 1024 * 1024  # Upper bound for response bytes per request
+    QUERY_EXECUTION_MAX_BYTES_BILLED: Optional[int] = None  # Jobs scanning more than this fail instead of running
+    QUERY_EXECUTION_TIMEOUT: float = 5 * 60  # Seconds to wait for a job to finish before cancelling it
+    QUERY_EXECUTION_PAGE_SIZE: int = 10000  # Rows per page when reading through the REST API
+    QUERY_EXECUTION_MAX_QUEUE_SIZE: int = 4  # Storage Read API pages buffered ahead of the response
+
+    # Background metadata extraction jobs
+    METADATA_JOB_WORKERS: int = 2  # Extraction jobs running at the same time
+    METADATA_JOB_PROGRESS_INTERVAL: float = 1.0  # Seconds between progress writes to the job table
+    METADATA_JOB_MAX_ERRORS: int = 100  # Error messages kept per job
+    METADATA_JOB_HEARTBEAT_INTERVAL: float = 15.0  # Seconds between heartbeats for this process's active jobs
+    METADATA_JOB_STALE_SECONDS: float = 120.0  # Active jobs without a heartbeat for this long are failed
 
     class Config:
         case_sensitive = True
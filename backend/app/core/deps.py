@@ -1,34 +1,33 @@
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth_cache import CurrentUser, cache_user, decode_token, get_cached_user
 from app.core.config import settings
-from app.db.session import SessionLocal
-from app.models.base_models import User
+from app.db.session import AsyncSessionLocal, checkout_connection
+from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        # Every request uses the database; take the connection up front so pool waits are measured
+        await checkout_connection(db)
         yield db
-    finally:
-        db.close()
 
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -36,7 +35,15 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_cached_user(user_id)
     if user is None:
-        raise credentials_exception
-    return user 
\ No newline at end of file
+        result = await db.execute(select(User).where(User.id == user_id))
+        db_user = result.scalar_one_or_none()
+        if db_user is None:
+            raise credentials_exception
+        # Cache a plain snapshot; ORM instances can't be shared between sessions
+        user = CurrentUser.from_orm_user(db_user)
+        cache_user(user)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
@@ -0,0 +1,23 @@
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def fast_json_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    """Serialize already-validated data directly, skipping response model validation.
+
+    Uses orjson when it is installed; otherwise falls back to the standard
+    encoder. Only pass plain JSON-compatible data (e.g. JSON columns loaded
+    from the database), since nothing is validated on the way out.
+    """
+    if orjson is not None:
+        return ORJSONResponse(content, status_code=status_code, headers=headers)
+    return JSONResponse(content, status_code=status_code, headers=headers)
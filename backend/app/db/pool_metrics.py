@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class PoolMetrics:
+    """Connection pool counters for one engine, fed by pool events.
+
+    Checkout wait is recorded by the caller (see ``record_wait``) because the
+    pool has no event for the moment a checkout starts waiting. Engines whose
+    callers do not record it pass ``records_wait=False`` and report no wait
+    times rather than zeros.
+    """
+
+    def __init__(self, name: str, engine: Engine, wait_samples: int = 1000, records_wait: bool = True):
+        self.name = name
+        self.engine = engine
+        self.records_wait = records_wait
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=wait_samples)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checkouts = 0
+        self.peak_checked_out = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+        self.started_at = time.time()
+
+        pool = engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "close_detached", self._on_close)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_out = self._checked_out()
+        with self._lock:
+            self.checkouts += 1
+            if checked_out is not None:
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def _on_close(self, dbapi_connection, connection_record=None) -> None:
+        with self._lock:
+            self.connections_closed += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.connections_invalidated += 1
+
+    def _checked_out(self) -> Optional[int]:
+        checkedout = getattr(self.engine.pool, "checkedout", None)
+        return checkedout() if checkedout else None
+
+    def record_wait(self, seconds: float) -> None:
+        """Record how long a caller waited to get a connection from the pool."""
+        with self._lock:
+            self._waits.append(seconds)
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        size = pool.size() if hasattr(pool, "size") else None
+        overflow = pool.overflow() if hasattr(pool, "overflow") else None
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        checked_out = self._checked_out()
+        capacity = size + max(max_overflow, 0) if size is not None else None
+        uptime = max(time.time() - self.started_at, 1e-9)
+        with self._lock:
+            waits = sorted(self._waits)
+            snapshot = {
+                "engine": self.name,
+                "pool_class": type(pool).__name__,
+                "pool_size": size,
+                "max_overflow": max_overflow,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": overflow,
+                "saturation": checked_out / capacity if capacity and checked_out is not None else None,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "connections_invalidated": self.connections_invalidated,
+                # Connections opened per minute; high churn means the pool is too small or recycles too often
+                "churn_per_minute": self.connections_opened / uptime * 60
+            }
+            if self.records_wait:
+                snapshot["checkout_wait_ms"] = {
+                    "count": self.wait_count,
+                    "avg": self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0,
+                    "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000 if waits else 0.0,
+                    "max": self.wait_max * 1000
+                }
+            return snapshot
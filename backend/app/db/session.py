@@ -1,13 +1,118 @@
-from sqlalchemy import create_engine
+import time
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.db.pool_metrics import PoolMetrics
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+# Async drivers for the sync URLs in settings
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg"
+}
+
+def get_async_database_uri() -> str:
+    """Async URL for the app database (``SQLALCHEMY_ASYNC_DATABASE_URI`` or derived from the sync URL)."""
+    if settings.SQLALCHEMY_ASYNC_DATABASE_URI:
+        return settings.SQLALCHEMY_ASYNC_DATABASE_URI
+    url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _engine_options(url: URL, is_async: bool) -> Dict[str, Any]:
+    """Pool sizing and driver tuning for the app database."""
+    if _is_memory_sqlite(url):
+        # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+        return {}
+
+    options: Dict[str, Any] = {
+        "poolclass": AsyncAdaptedQueuePool if is_async else QueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        # Connections are shared between threads by the pool
+        options["connect_args"] = {"check_same_thread": False}
+    elif backend == "postgresql":
+        # Reuse the most recently returned connection so idle ones age out and get recycled
+        options["pool_use_lifo"] = True
+        if url.get_driver_name() == "asyncpg":
+            server_settings = {"application_name": settings.PROJECT_NAME}
+            if settings.DB_STATEMENT_TIMEOUT_MS:
+                server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+            options["connect_args"] = {
+                "timeout": settings.DB_CONNECT_TIMEOUT,
+                "server_settings": server_settings
+            }
+        else:
+            connect_args: Dict[str, Any] = {
+                "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+                "application_name": settings.PROJECT_NAME
+            }
+            if settings.DB_STATEMENT_TIMEOUT_MS:
+                connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+            options["connect_args"] = connect_args
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+_sync_url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+_async_url = make_url(get_async_database_uri())
+
+# Sync engine for background jobs, migrations and scripts
+engine = create_engine(_sync_url, **_engine_options(_sync_url, is_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the request path, so database calls never block the event loop
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url, is_async=True))
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Objects stay readable after commit without an implicit (sync) refresh
+    expire_on_commit=False
+)
+
+if _sync_url.get_backend_name() == "sqlite" and not _is_memory_sqlite(_sync_url):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+if _async_url.get_backend_name() == "sqlite" and not _is_memory_sqlite(_async_url):
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+pool_metrics = {
+    # Sync sessions check out lazily, so only the async request path records wait time
+    "sync": PoolMetrics("sync", engine, records_wait=False),
+    "async": PoolMetrics("async", async_engine.sync_engine)
+}
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def checkout_connection(db: AsyncSession) -> None:
+    """Check out the session's connection now, recording how long the pool made us wait."""
+    start = time.perf_counter()
+    await db.connection()
+    pool_metrics["async"].record_wait(time.perf_counter() - start)
@@ -1,8 +1,13 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.services.bigquery_clients import bigquery_client_registry
+from app.services.metadata_jobs import metadata_job_manager
+from app.services.sql_generation import close_sql_generation_service, get_sql_generation_service
 
 # Configure logging
 logging.basicConfig(
@@ -11,14 +16,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail jobs whose process exited, and keep this process's jobs alive
+    metadata_job_manager.start()
+    # Build the shared LLM client and chain once, before the first request
+    try:
+        get_sql_generation_service()
+    except Exception as e:
+        logger.warning(f"SQL generation service not initialized at startup: {str(e)}")
+    yield
+    metadata_job_manager.shutdown()
+    await close_sql_generation_service()
+    bigquery_client_registry.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API for converting natural language to SQL queries",
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    redirect_slashes=False  # Disable automatic trailing slash redirects
+    redirect_slashes=False,  # Disable automatic trailing slash redirects
+    lifespan=lifespan
 )
 
+# Compress large responses (metadata documents can be several megabytes).
+# Streaming endpoints opt out with "Content-Encoding: identity" so events are not buffered.
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+if settings.RESPONSE_BROTLI_ENABLED and BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=settings.RESPONSE_BROTLI_QUALITY,
+        minimum_size=settings.RESPONSE_COMPRESSION_MINIMUM_SIZE,
+        gzip_fallback=True
+    )
+else:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MINIMUM_SIZE,
+        compresslevel=settings.RESPONSE_GZIP_LEVEL
+    )
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1,4 +1,5 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
@@ -18,6 +19,9 @@ class DatabaseConnection(Base):
     credentials_json = Column(JSON, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     db_metadata = Column(JSON, nullable=True)  # Store database metadata directly
+    metadata_strategy = Column(String, nullable=True)  # "api" (default) or "information_schema"
+    # Set in Python so edits within the same second still change the list ETag
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     
     user = relationship("User", back_populates="database_connections")
     db_metadata_rel = relationship("DatabaseMetadata", back_populates="database_connection", uselist=False)
@@ -32,6 +36,11 @@ class DatabaseMetadata(Base):
     tables = Column(JSON, nullable=True)
     relationships = Column(JSON, nullable=True)
     constraints = Column(JSON, nullable=True)
+    table_fingerprints = Column(JSON, nullable=True)
+    version = Column(String, nullable=True)
+    schema_text = Column(Text, nullable=True)
+    schema_token_count = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), nullable=True)
 
     database_connection = relationship("DatabaseConnection", back_populates="db_metadata_rel")
 
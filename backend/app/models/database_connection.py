@@ -17,6 +17,7 @@ class DatabaseConnection(Base):
     credentials_json = Column(JSON, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     db_metadata = Column(JSON, nullable=True)  # Store database metadata directly
+    metadata_strategy = Column(String, nullable=True)  # "api" (default) or "information_schema"
     
     user = relationship("User", back_populates="database_connections")
     db_metadata_rel = relationship("DatabaseMetadata", back_populates="database_connection", uselist=False)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, JSON, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, JSON, ForeignKey, String, Text
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -11,5 +12,10 @@ class DatabaseMetadata(Base):
     tables = Column(JSON, nullable=True)  # List of tables and their schemas
     relationships = Column(JSON, nullable=True)  # Table relationships
     constraints = Column(JSON, nullable=True)  # Database constraints
+    table_fingerprints = Column(JSON, nullable=True)  # "dataset.table" -> last_modified / schema_hash
+    version = Column(String, nullable=True)  # Hash of datasets and relationships
+    schema_text = Column(Text, nullable=True)  # Schema block rendered for prompts
+    schema_token_count = Column(Integer, nullable=True)  # Prompt tokens in schema_text
+    updated_at = Column(DateTime, server_default=func.now(), nullable=True)  # Last save, for Last-Modified
     
     database_connection = relationship("DatabaseConnection", back_populates="db_metadata_rel") 
\ No newline at end of file
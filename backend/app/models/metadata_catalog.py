@@ -0,0 +1,52 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index, UniqueConstraint
+from app.db.base_class import Base
+
+# Normalized copy of DatabaseMetadata.datasets, kept in sync when metadata is
+# saved, so single tables and columns can be looked up and searched by index.
+
+class MetadataDataset(Base):
+    __tablename__ = "metadata_datasets"
+    __table_args__ = (
+        UniqueConstraint("database_connection_id", "name", name="uq_metadata_datasets_connection_name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    database_connection_id = Column(Integer, ForeignKey("database_connections.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    position = Column(Integer, nullable=False)  # Listing order within the connection
+    table_count = Column(Integer, nullable=False, default=0)
+
+class MetadataTable(Base):
+    __tablename__ = "metadata_tables"
+    __table_args__ = (
+        UniqueConstraint(
+            "database_connection_id", "dataset_name", "name",
+            name="uq_metadata_tables_connection_dataset_name"
+        ),
+        Index("ix_metadata_tables_connection_name", "database_connection_id", "name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    database_connection_id = Column(Integer, ForeignKey("database_connections.id", ondelete="CASCADE"), nullable=False)
+    dataset_id = Column(Integer, ForeignKey("metadata_datasets.id", ondelete="CASCADE"), index=True, nullable=False)
+    dataset_name = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    position = Column(Integer, nullable=False)  # Listing order within the dataset
+    column_count = Column(Integer, nullable=False, default=0)
+    schema_hash = Column(String, nullable=True)  # Matches the table's fingerprint; unchanged tables are skipped
+
+class MetadataColumn(Base):
+    __tablename__ = "metadata_columns"
+    __table_args__ = (
+        Index("ix_metadata_columns_table_position", "table_id", "position"),
+        Index("ix_metadata_columns_connection_name", "database_connection_id", "name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    database_connection_id = Column(Integer, ForeignKey("database_connections.id", ondelete="CASCADE"), nullable=False)
+    table_id = Column(Integer, ForeignKey("metadata_tables.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    position = Column(Integer, nullable=False)
+    type = Column(String, nullable=True)
+    mode = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
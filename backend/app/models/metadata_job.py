@@ -0,0 +1,34 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index, JSON, text
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+# At most one pending or running job per connection, across all workers
+_ACTIVE = text("status IN ('pending', 'running')")
+
+class MetadataExtractionJob(Base):
+    __tablename__ = "metadata_extraction_jobs"
+    __table_args__ = (
+        Index(
+            "uq_metadata_extraction_jobs_active_connection",
+            "database_connection_id",
+            unique=True,
+            postgresql_where=_ACTIVE,
+            sqlite_where=_ACTIVE
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    database_connection_id = Column(Integer, ForeignKey("database_connections.id"), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, succeeded, failed
+    full_refresh = Column(Boolean, nullable=False, default=False)
+    datasets_total = Column(Integer, nullable=False, default=0)
+    datasets_done = Column(Integer, nullable=False, default=0)
+    tables_done = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=True)  # List of error messages
+    database_metadata_id = Column(Integer, ForeignKey("database_metadata.id"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True)  # "host:pid:boot id" of the process that runs the job
+    heartbeat_at = Column(DateTime, nullable=True)  # Refreshed by the owner while the job is active
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from pydantic import BaseModel
 
 class DatabaseConnectionBase(BaseModel):
@@ -11,6 +11,7 @@ class DatabaseConnectionBase(BaseModel):
     project_id: Optional[str] = None
     dataset: Optional[str] = None
     credentials_json: Optional[Dict[str, Any]] = None
+    metadata_strategy: Optional[Literal["api", "information_schema"]] = None
 
 class DatabaseConnectionCreate(DatabaseConnectionBase):
     pass
@@ -40,13 +41,14 @@ class DatabaseMetadataBase(BaseModel):
 
 class DatabaseMetadataCreate(DatabaseMetadataBase):
     database_connection_id: int
+    table_fingerprints: Optional[Dict[str, Dict[str, Any]]] = None
 
     class Config:
         from_attributes = True
         populate_by_name = True
 
 class DatabaseMetadataUpdate(DatabaseMetadataBase):
-    pass
+    table_fingerprints: Optional[Dict[str, Dict[str, Any]]] = None
 
 class DatabaseMetadataInDB(DatabaseMetadataBase):
     id: int
@@ -59,4 +61,38 @@ class DatabaseMetadata(DatabaseMetadataInDB):
     pass
 
 class DatabaseMetadataResponse(DatabaseMetadataInDB):
-    pass 
\ No newline at end of file
+    pass
+
+class CatalogColumn(BaseModel):
+    name: str
+    position: int
+    type: Optional[str] = None
+    mode: Optional[str] = None
+    description: Optional[str] = None
+
+class CatalogDataset(BaseModel):
+    name: str
+    table_count: int
+
+class CatalogTable(BaseModel):
+    dataset: str
+    name: str
+    column_count: int
+    columns: Optional[List[CatalogColumn]] = None  # Only when requested
+
+class CatalogColumnMatch(BaseModel):
+    dataset: str
+    table: str
+    column: CatalogColumn
+
+class CatalogDatasetPage(BaseModel):
+    items: List[CatalogDataset]
+    next_cursor: Optional[str] = None
+
+class CatalogTablePage(BaseModel):
+    items: List[CatalogTable]
+    next_cursor: Optional[str] = None
+
+class CatalogColumnMatchPage(BaseModel):
+    items: List[CatalogColumnMatch]
+    next_cursor: Optional[str] = None
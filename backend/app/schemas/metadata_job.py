@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional, List
+from pydantic import BaseModel
+
+class MetadataJobResponse(BaseModel):
+    id: int
+    database_connection_id: int
+    status: str
+    full_refresh: bool = False
+    datasets_total: int = 0
+    datasets_done: int = 0
+    tables_done: int = 0
+    errors: List[str] = []
+    elapsed_seconds: Optional[float] = None
+    database_metadata_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
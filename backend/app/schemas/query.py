@@ -1,5 +1,5 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, List, Literal
+from pydantic import BaseModel, Field
 
 class QuestionRequest(BaseModel):
     question: str
@@ -9,4 +9,26 @@ class QuestionRequest(BaseModel):
 class SQLQueryResponse(BaseModel):
     sql_query: str
     explanation: str
-    metadata: Optional[Dict[str, Any]] = None 
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = None
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    stream: bool = False  # Return NDJSON lines as each question finishes
+
+class BatchQuestionResult(BaseModel):
+    index: int
+    question: str
+    result: Optional[SQLQueryResponse] = None
+    error: Optional[str] = None
+
+class BatchSQLQueryResponse(BaseModel):
+    results: List[BatchQuestionResult]
+    succeeded: int
+    failed: int
+
+class ExecuteQueryRequest(BaseModel):
+    sql: str = Field(..., min_length=1)
+    format: Literal["ndjson", "arrow"] = "ndjson"
+    max_rows: Optional[int] = Field(default=None, ge=1)  # Capped at QUERY_EXECUTION_MAX_ROWS
+    max_bytes: Optional[int] = Field(default=None, ge=1)  # Capped at QUERY_EXECUTION_MAX_BYTES
@@ -0,0 +1,257 @@
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def credentials_hash(connection: Any) -> str:
+    """Hash the credentials and project a client was built from."""
+    payload = json.dumps(
+        {"project_id": connection.project_id, "credentials": connection.credentials_json},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class _ClientEntry:
+    def __init__(self, connection_id: int, client: Any, credentials: Any, session: Any, credentials_hash: str):
+        self.connection_id = connection_id
+        self.client = client
+        self.credentials = credentials
+        self.session = session
+        self.credentials_hash = credentials_hash
+        self.storage_client: Any = None
+        self.last_used = time.monotonic()
+        self.refresh_lock = threading.Lock()
+        self.in_use = 0
+        # Replaced or invalidated while checked out; closed on the last release
+        self.retired = False
+
+class BigQueryClientRegistry:
+    """Process-wide BigQuery clients, one per connection.
+
+    Clients are keyed by connection id and rebuilt when the connection's
+    credentials or project change. Each client keeps its own pooled HTTP
+    session sized for the metadata crawl. Access tokens are refreshed when
+    they are within ``BIGQUERY_TOKEN_REFRESH_MARGIN`` seconds of expiring, so
+    requests never stall on an expired token. Clients idle for longer than
+    ``BIGQUERY_CLIENT_IDLE_SECONDS`` are closed, and the least recently used
+    clients are closed beyond ``BIGQUERY_CLIENT_CACHE_SIZE``.
+
+    Callers hold a client through ``checkout()``. Checked out clients are
+    never closed: eviction skips them, and a client replaced or invalidated
+    while in use is closed when its last holder releases it. Clients are
+    built and tokens refreshed outside the registry lock, so a slow build
+    for one connection does not block the others.
+    """
+
+    def __init__(self, max_clients: int, idle_seconds: float, refresh_margin: float):
+        self.max_clients = max(1, max_clients)
+        self.idle_seconds = idle_seconds
+        self.refresh_margin = refresh_margin
+        self._entries: "OrderedDict[int, _ClientEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, connection: Any, key_hash: str) -> _ClientEntry:
+        from google.auth.transport.requests import AuthorizedSession
+        from google.cloud import bigquery
+        from google.oauth2 import service_account
+        from requests.adapters import HTTPAdapter
+
+        if not connection.credentials_json:
+            raise ValueError("No credentials provided")
+        if not connection.project_id:
+            raise ValueError("No project ID provided")
+
+        credentials = service_account.Credentials.from_service_account_info(
+            connection.credentials_json,
+            scopes=["https://www.googleapis.com/auth/cloud-platform"]
+        )
+        # One keep-alive connection per crawl worker instead of requests' default of 10
+        pool_size = max(settings.BIGQUERY_CRAWL_MAX_WORKERS, 10)
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        client = bigquery.Client(credentials=credentials, project=connection.project_id, _http=session)
+        logger.debug(f"Created BigQuery client for connection {connection.id} (project {connection.project_id})")
+        return _ClientEntry(connection.id, client, credentials, session, key_hash)
+
+    def _refresh_if_expiring(self, entry: _ClientEntry) -> None:
+        """Refresh the access token ahead of expiry, once per entry at a time."""
+        from google.auth.transport.requests import Request
+
+        credentials = entry.credentials
+        expiry = credentials.expiry
+        if credentials.token and expiry is not None:
+            remaining = (expiry - datetime.datetime.utcnow()).total_seconds()
+            if remaining > self.refresh_margin:
+                return
+        with entry.refresh_lock:
+            # Another thread may have refreshed while we waited
+            expiry = credentials.expiry
+            if credentials.token and expiry is not None and \
+                    (expiry - datetime.datetime.utcnow()).total_seconds() > self.refresh_margin:
+                return
+            credentials.refresh(Request(entry.session))
+            logger.debug(f"Refreshed BigQuery access token, expires at {credentials.expiry}")
+
+    def _close(self, entry: _ClientEntry) -> None:
+        try:
+            entry.client.close()
+            if entry.storage_client is not None:
+                entry.storage_client.transport.close()
+        except Exception as e:
+            logger.warning(f"Error closing BigQuery client for connection {entry.connection_id}: {str(e)}")
+
+    def _retire(self, entry: _ClientEntry) -> List[_ClientEntry]:
+        """Entries to close now for an entry that left the registry. Caller holds the lock."""
+        if entry.in_use:
+            entry.retired = True
+            return []
+        return [entry]
+
+    def _evict(self) -> List[_ClientEntry]:
+        """Remove idle clients and the least recently used beyond the limit, skipping checked out ones.
+
+        Caller holds the lock and closes the returned entries after releasing it.
+        """
+        now = time.monotonic()
+        evicted = [
+            entry for entry in self._entries.values()
+            if not entry.in_use and now - entry.last_used > self.idle_seconds
+        ]
+        overflow = len(self._entries) - len(evicted) - self.max_clients
+        for entry in self._entries.values():
+            if overflow <= 0:
+                break
+            if not entry.in_use and entry not in evicted:
+                evicted.append(entry)
+                overflow -= 1
+        for entry in evicted:
+            del self._entries[entry.connection_id]
+        return evicted
+
+    def _acquire(self, connection: Any) -> _ClientEntry:
+        """Check out the connection's entry, building it outside the lock on first use."""
+        key_hash = credentials_hash(connection)
+        to_close: List[_ClientEntry] = []
+        with self._lock:
+            entry = self._entries.get(connection.id)
+            if entry is not None and entry.credentials_hash != key_hash:
+                # Credentials changed without an explicit invalidation
+                to_close += self._retire(self._entries.pop(connection.id))
+                entry = None
+            if entry is not None:
+                entry.in_use += 1
+                entry.last_used = time.monotonic()
+                self._entries.move_to_end(connection.id)
+            to_close += self._evict()
+        for stale in to_close:
+            self._close(stale)
+        if entry is not None:
+            return entry
+
+        built = self._build(connection, key_hash)
+        to_close = []
+        with self._lock:
+            entry = self._entries.get(connection.id)
+            if entry is not None and entry.credentials_hash == key_hash:
+                # Another thread built the same client first
+                to_close.append(built)
+            else:
+                if entry is not None:
+                    to_close += self._retire(self._entries.pop(connection.id))
+                entry = built
+                self._entries[connection.id] = entry
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(connection.id)
+            to_close += self._evict()
+        for stale in to_close:
+            self._close(stale)
+        return entry
+
+    def _release(self, entry: _ClientEntry) -> None:
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            close = entry.retired and not entry.in_use
+        if close:
+            self._close(entry)
+
+    @contextmanager
+    def checkout(self, connection: Any) -> Iterator[Any]:
+        """Check out the BigQuery client for a connection, building it on first use.
+
+        The client stays open until the block exits, even if it is evicted,
+        invalidated or replaced meanwhile.
+        """
+        entry = self._acquire(connection)
+        try:
+            self._refresh_if_expiring(entry)
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    def get_storage_client(self, connection: Any) -> Optional[Any]:
+        """Get the BigQuery Storage Read API client for a checked out connection.
+
+        Built on first use with the same credentials as the BigQuery client.
+        Returns None when google-cloud-bigquery-storage is not installed (or
+        the connection's client is not checked out); results are then read
+        through the REST API.
+        """
+        try:
+            from google.cloud import bigquery_storage
+        except ImportError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(connection.id)
+        if entry is None:
+            return None
+        if entry.storage_client is None:
+            storage_client = bigquery_storage.BigQueryReadClient(credentials=entry.credentials)
+            with self._lock:
+                built = entry.storage_client is None
+                if built:
+                    entry.storage_client = storage_client
+            if built:
+                logger.debug(f"Created BigQuery Storage client for connection {connection.id}")
+            else:
+                # Another thread built one first
+                storage_client.transport.close()
+        return entry.storage_client
+
+    def invalidate(self, connection_id: int) -> None:
+        """Forget the client for a connection, closing it once no caller holds it."""
+        with self._lock:
+            entry = self._entries.pop(connection_id, None)
+            to_close = self._retire(entry) if entry is not None else []
+        for stale in to_close:
+            self._close(stale)
+        if entry is not None:
+            logger.debug(f"Invalidated BigQuery client for connection {connection_id}")
+
+    def close(self) -> None:
+        """Close every client (checked out ones when they are released)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            to_close = [stale for entry in entries for stale in self._retire(entry)]
+        for entry in to_close:
+            self._close(entry)
+
+bigquery_client_registry = BigQueryClientRegistry(
+    max_clients=settings.BIGQUERY_CLIENT_CACHE_SIZE,
+    idle_seconds=settings.BIGQUERY_CLIENT_IDLE_SECONDS,
+    refresh_margin=settings.BIGQUERY_TOKEN_REFRESH_MARGIN
+)
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.bigquery_clients import bigquery_client_registry
+
+logger = logging.getLogger(__name__)
+
+TIB = 1024 ** 4
+
+class QueryCostExceededError(ValueError):
+    """A generated query would scan more than the configured byte budget."""
+
+    def __init__(self, total_bytes_processed: int, byte_budget: int):
+        self.total_bytes_processed = total_bytes_processed
+        self.byte_budget = byte_budget
+        super().__init__(
+            f"Query would process {total_bytes_processed} bytes, above the budget of {byte_budget} bytes"
+        )
+
+def normalize_sql(sql: str) -> str:
+    return " ".join(sql.split()).rstrip(";")
+
+class CostEstimator:
+    """Dry-runs generated SQL to learn how many bytes it would scan.
+
+    Results are cached per connection, schema version and normalized SQL for
+    ``ttl_seconds`` (table sizes change, so entries do not live forever).
+    ``client_factory`` returns a context manager that yields the BigQuery
+    client for a connection; by default it checks out the connection's
+    cached client.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        client_factory: Callable[[Any], ContextManager[Any]] = bigquery_client_registry.checkout
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.client_factory = client_factory
+        self._entries: "OrderedDict[Tuple[int, str, str], Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _dry_run(self, connection: Any, sql: str) -> int:
+        from google.cloud import bigquery
+
+        with self.client_factory(connection) as client:
+            job = client.query(sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+        return job.total_bytes_processed or 0
+
+    async def bytes_processed(self, connection: Any, sql: str, version: str) -> Tuple[int, bool]:
+        """Bytes the query would scan, and whether the answer came from the cache."""
+        sql_hash = hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()
+        key = (connection.id, version, sql_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1], True
+
+        total_bytes = await asyncio.to_thread(self._dry_run, connection, sql)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, total_bytes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total_bytes, False
+
+    async def estimate(self, connection: Any, sql: str, version: str) -> Dict[str, Any]:
+        """Bytes scanned, on-demand cost and budget check for a query.
+
+        Dry-run failures (e.g. invalid SQL) are reported in ``error`` rather
+        than raised, so generation still returns the query.
+        """
+        budget = settings.SQL_DRY_RUN_BYTE_BUDGET
+        try:
+            total_bytes, cached = await self.bytes_processed(connection, sql, version)
+        except Exception as e:
+            logger.warning(f"Dry run failed for connection {connection.id}: {str(e)}")
+            return {"error": str(e), "byte_budget": budget}
+        return {
+            "total_bytes_processed": total_bytes,
+            "estimated_cost_usd": round(total_bytes / TIB * settings.BIGQUERY_PRICE_PER_TIB, 6),
+            "byte_budget": budget,
+            "over_budget": budget is not None and total_bytes > budget,
+            "cached": cached
+        }
+
+    def invalidate_connection(self, connection_id: int) -> None:
+        """Drop every cached dry run for a connection."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == connection_id]:
+                del self._entries[key]
+
+cost_estimator = CostEstimator(
+    max_entries=settings.SQL_DRY_RUN_CACHE_SIZE,
+    ttl_seconds=settings.SQL_DRY_RUN_CACHE_TTL_SECONDS
+)
+
+async def check_query_cost(connection: Any, sql: str, version: str) -> Dict[str, Any]:
+    """Estimate a generated query's cost, raising if it is over budget and rejection is enabled."""
+    estimate = await cost_estimator.estimate(connection, sql, version)
+    if estimate.get("over_budget"):
+        logger.info(
+            f"Generated query for connection {connection.id} is over budget: "
+            f"{estimate['total_bytes_processed']} > {estimate['byte_budget']} bytes"
+        )
+        if settings.SQL_DRY_RUN_REJECT_OVER_BUDGET:
+            raise QueryCostExceededError(estimate["total_bytes_processed"], estimate["byte_budget"])
+    return estimate
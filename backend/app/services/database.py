@@ -1,13 +1,86 @@
-from typing import Dict, Any, Optional, List
-from sqlalchemy import create_engine, inspect
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, List, Tuple
+from sqlalchemy import create_engine, delete, func, inspect, select
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.base_models import DatabaseConnection, DatabaseMetadata
-from app.schemas.database import DatabaseConnectionCreate, DatabaseConnectionUpdate, DatabaseMetadataCreate
+from app.models.base_models import DatabaseConnection, DatabaseMetadata, UseCase
+from app.models.metadata_job import MetadataExtractionJob
+from app.schemas.database import (
+    DatabaseConnectionCreate,
+    DatabaseConnectionUpdate,
+    DatabaseMetadataCreate,
+    DatabaseMetadataUpdate
+)
 from app.core.config import settings
+from app.services.bigquery_clients import bigquery_client_registry
+from app.services.cost_estimation import cost_estimator
+from app.services.extractors.registry import get_extractor
+from app.services.join_graph import infer_relationships
+from app.services.metadata_catalog import delete_metadata_catalog, sync_metadata_catalog
+from app.services.query_cache import schema_version, sql_query_cache
+from app.services.schema_retrieval import index_table_embeddings, render_schema
+from app.services.tokens import count_tokens
+from app.services.vector_index import vector_index_registry
 
-def create_database_connection(
-    db: Session,
+class MetadataCrawlProgress:
+    """Thread-safe progress counters updated while metadata is extracted."""
+
+    def __init__(
+        self,
+        on_update: Optional[Callable[["MetadataCrawlProgress"], None]] = None,
+        max_errors: int = 100
+    ):
+        self._lock = threading.Lock()
+        self._on_update = on_update
+        self._max_errors = max_errors
+        self.datasets_total = 0
+        self.datasets_done = 0
+        self.tables_done = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+
+    def set_datasets_total(self, total: int) -> None:
+        with self._lock:
+            self.datasets_total = total
+        self._notify()
+
+    def add_datasets(self, count: int = 1) -> None:
+        with self._lock:
+            self.datasets_done += count
+        self._notify()
+
+    def add_tables(self, count: int = 1) -> None:
+        with self._lock:
+            self.tables_done += count
+        self._notify()
+
+    def add_error(self, message: str) -> None:
+        with self._lock:
+            self.error_count += 1
+            if len(self.errors) < self._max_errors:
+                self.errors.append(message)
+        self._notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "datasets_total": self.datasets_total,
+                "datasets_done": self.datasets_done,
+                "tables_done": self.tables_done,
+                "errors": list(self.errors)
+            }
+
+    def _notify(self) -> None:
+        if self._on_update:
+            self._on_update(self)
+
+async def create_database_connection(
+    db: AsyncSession,
     connection: DatabaseConnectionCreate,
     user_id: int
 ) -> DatabaseConnection:
@@ -17,62 +90,156 @@ def create_database_connection(
         user_id=user_id
     )
     db.add(db_connection)
-    db.commit()
-    db.refresh(db_connection)
+    await db.commit()
+    await db.refresh(db_connection)
     return db_connection
 
-def get_database_connection(
-    db: Session,
+async def get_database_connection(
+    db: AsyncSession,
     connection_id: int,
     user_id: int
 ) -> Optional[DatabaseConnection]:
     """Get a database connection by ID."""
-    return db.query(DatabaseConnection).filter(
-        DatabaseConnection.id == connection_id,
-        DatabaseConnection.user_id == user_id
-    ).first()
+    result = await db.execute(
+        select(DatabaseConnection).where(
+            DatabaseConnection.id == connection_id,
+            DatabaseConnection.user_id == user_id
+        )
+    )
+    return result.scalars().first()
 
-def get_user_database_connections(
-    db: Session,
+async def get_user_database_connections(
+    db: AsyncSession,
     user_id: int
 ) -> List[DatabaseConnection]:
     """Get all database connections for a user."""
-    return db.query(DatabaseConnection).filter(
-        DatabaseConnection.user_id == user_id
-    ).all()
+    result = await db.execute(
+        select(DatabaseConnection).where(DatabaseConnection.user_id == user_id)
+    )
+    return list(result.scalars().all())
 
-def update_database_connection(
-    db: Session,
+async def get_connections_version(
+    db: AsyncSession,
+    user_id: int
+) -> Tuple[int, Optional[int], Optional[datetime]]:
+    """Count, highest id and last edit of a user's connections; changes whenever the list does."""
+    result = await db.execute(
+        select(
+            func.count(DatabaseConnection.id),
+            func.max(DatabaseConnection.id),
+            func.max(DatabaseConnection.updated_at)
+        ).where(DatabaseConnection.user_id == user_id)
+    )
+    count, max_id, updated_at = result.one()
+    return count, max_id, updated_at
+
+async def update_database_connection(
+    db: AsyncSession,
     connection_id: int,
     user_id: int,
     connection: DatabaseConnectionUpdate
 ) -> Optional[DatabaseConnection]:
     """Update a database connection."""
-    db_connection = get_database_connection(db, connection_id, user_id)
+    db_connection = await get_database_connection(db, connection_id, user_id)
     if not db_connection:
         return None
     
     for key, value in connection.dict(exclude_unset=True).items():
         setattr(db_connection, key, value)
     
-    db.commit()
-    db.refresh(db_connection)
+    await db.commit()
+    await db.refresh(db_connection)
+    sql_query_cache.invalidate_connection(connection_id)
+    bigquery_client_registry.invalidate(connection_id)
+    cost_estimator.invalidate_connection(connection_id)
     return db_connection
 
-def delete_database_connection(
-    db: Session,
+async def delete_database_connection(
+    db: AsyncSession,
     connection_id: int,
     user_id: int
 ) -> bool:
     """Delete a database connection."""
-    db_connection = get_database_connection(db, connection_id, user_id)
+    db_connection = await get_database_connection(db, connection_id, user_id)
     if not db_connection:
         return False
     
-    db.delete(db_connection)
-    db.commit()
+    # Rows that reference the connection without an ORM relationship
+    await db.run_sync(lambda session: delete_metadata_catalog(session, connection_id))
+    await db.execute(
+        delete(MetadataExtractionJob).where(MetadataExtractionJob.database_connection_id == connection_id)
+    )
+    await db.delete(db_connection)
+    await db.commit()
+    sql_query_cache.invalidate_connection(connection_id)
+    bigquery_client_registry.invalidate(connection_id)
+    cost_estimator.invalidate_connection(connection_id)
+    vector_index_registry.drop_connection(connection_id)
     return True
 
+async def get_use_cases(
+    db: AsyncSession,
+    connection_id: int
+) -> List[UseCase]:
+    """Get the use cases defined for a database connection."""
+    result = await db.execute(
+        select(UseCase).where(UseCase.database_connection_id == connection_id)
+    )
+    return list(result.scalars().all())
+
+def _precompile_schema(db_metadata: DatabaseMetadata) -> None:
+    """Version, render and count the prompt schema block once, when metadata is saved."""
+    db_metadata.version = schema_version(db_metadata.datasets, db_metadata.relationships)
+    db_metadata.schema_text = render_schema(db_metadata.datasets)
+    db_metadata.schema_token_count = count_tokens(db_metadata.schema_text)
+
+def _infer_relationships(connection: DatabaseConnection, metadata_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Declared foreign keys plus inferred joins, optionally confirmed by sampling values."""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    relationships = infer_relationships(
+        metadata_dict.get('datasets'),
+        metadata_dict.get('relationships'),
+        metadata_dict.get('constraints')
+    )
+    inferred = [relationship for relationship in relationships if relationship["source"] == "inferred"]
+    if not inferred or not settings.RELATIONSHIP_SAMPLING_ENABLED:
+        return relationships
+
+    try:
+        overlaps = get_extractor(connection).sample_overlap(connection, inferred, settings.RELATIONSHIP_SAMPLE_SIZE)
+    except Exception as e:
+        logger.warning(f"Relationship sampling failed for connection {connection.id}, keeping inferred joins: {str(e)}")
+        return relationships
+    rejected = set()
+    for relationship, overlap in zip(inferred, overlaps):
+        if overlap is None:
+            continue
+        relationship["overlap"] = round(overlap, 3)
+        if overlap < settings.RELATIONSHIP_MIN_OVERLAP:
+            rejected.add(id(relationship))
+    if rejected:
+        logger.info(f"Dropped {len(rejected)} inferred joins below the sampled overlap threshold for connection {connection.id}")
+    return [relationship for relationship in relationships if id(relationship) not in rejected]
+
+def _index_table_embeddings(db_metadata: DatabaseMetadata) -> None:
+    """Embed new or changed tables when metadata is saved, so questions find them precomputed."""
+    if not settings.SCHEMA_RETRIEVAL_EMBEDDINGS_ENABLED:
+        return
+    import logging
+    logger = logging.getLogger(__name__)
+
+    try:
+        stats = index_table_embeddings(db_metadata.database_connection_id, db_metadata.datasets)
+        logger.info(
+            f"Updated table embeddings for connection {db_metadata.database_connection_id}: "
+            f"{stats['embedded']} embedded, {stats['removed']} removed, {stats['total']} total"
+        )
+    except Exception as e:
+        # Retrieval embeds missing tables on demand; the metadata itself is saved
+        logger.warning(f"Error updating table embeddings: {str(e)}")
+
 def create_database_metadata(
     db: Session,
     metadata: DatabaseMetadataCreate
@@ -88,65 +255,252 @@ def create_database_metadata(
             datasets=metadata.datasets,
             tables=metadata.tables,
             relationships=metadata.relationships,
-            constraints=metadata.constraints
+            constraints=metadata.constraints,
+            table_fingerprints=metadata.table_fingerprints
         )
+        _precompile_schema(db_metadata)
+        db_metadata.updated_at = datetime.utcnow()
         logger.debug(f"Creating metadata for connection {metadata.database_connection_id}")
         db.add(db_metadata)
+        sync_metadata_catalog(db, db_metadata.database_connection_id, db_metadata.datasets, db_metadata.table_fingerprints)
         db.commit()
         logger.debug(f"Successfully created metadata for connection {metadata.database_connection_id}")
         db.refresh(db_metadata)
+        _index_table_embeddings(db_metadata)
         return db_metadata
     except Exception as e:
         logger.error(f"Error creating database metadata: {str(e)}")
         db.rollback()
         raise
 
-def get_database_metadata(
+def update_database_metadata(
     db: Session,
+    db_metadata: DatabaseMetadata,
+    metadata: DatabaseMetadataUpdate
+) -> DatabaseMetadata:
+    """Update existing database metadata in place."""
+    import logging
+    logger = logging.getLogger(__name__)
+
+    try:
+        for key, value in metadata.dict(exclude_unset=True).items():
+            setattr(db_metadata, key, value)
+        _precompile_schema(db_metadata)
+        db_metadata.updated_at = datetime.utcnow()
+        sync_metadata_catalog(db, db_metadata.database_connection_id, db_metadata.datasets, db_metadata.table_fingerprints)
+        db.commit()
+        logger.debug(f"Successfully updated metadata for connection {db_metadata.database_connection_id}")
+        db.refresh(db_metadata)
+        _index_table_embeddings(db_metadata)
+        return db_metadata
+    except Exception as e:
+        logger.error(f"Error updating database metadata: {str(e)}")
+        db.rollback()
+        raise
+
+async def get_metadata_version(
+    db: AsyncSession,
+    connection_id: int
+) -> Optional[Tuple[Optional[str], Optional[datetime]]]:
+    """Get the version and last save time of a connection's metadata without loading it."""
+    result = await db.execute(
+        select(DatabaseMetadata.version, DatabaseMetadata.updated_at).where(
+            DatabaseMetadata.database_connection_id == connection_id
+        )
+    )
+    row = result.first()
+    return (row.version, row.updated_at) if row else None
+
+async def get_database_metadata(
+    db: AsyncSession,
     connection_id: int
 ) -> Optional[DatabaseMetadata]:
     """Get metadata for a database connection."""
-    return db.query(DatabaseMetadata).filter(
-        DatabaseMetadata.database_connection_id == connection_id
+    result = await db.execute(
+        select(DatabaseMetadata).where(DatabaseMetadata.database_connection_id == connection_id)
+    )
+    return result.scalars().first()
+
+@dataclass(frozen=True)
+class GenerationMetadata:
+    """The parts of a connection's metadata that SQL generation reads."""
+    id: int
+    database_connection_id: int
+    version: Optional[str]
+    datasets: Optional[List[Dict[str, Any]]]
+    relationships: Optional[List[Dict[str, Any]]]
+    schema_text: Optional[str]
+    schema_token_count: Optional[int]
+
+_generation_metadata_cache: "OrderedDict[Tuple[int, str], GenerationMetadata]" = OrderedDict()
+_generation_metadata_lock = threading.Lock()
+
+async def get_generation_metadata(
+    db: AsyncSession,
+    connection_id: int
+) -> Optional[GenerationMetadata]:
+    """Get the metadata SQL generation needs, loading the JSON columns once per version.
+
+    Each call reads only the stored version; the datasets and relationships
+    are loaded when that version is not cached yet. At most
+    ``GENERATION_METADATA_CACHE_SIZE`` versions are kept.
+    """
+    result = await db.execute(
+        select(DatabaseMetadata.version).where(DatabaseMetadata.database_connection_id == connection_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    if row.version is not None:
+        with _generation_metadata_lock:
+            cached = _generation_metadata_cache.get((connection_id, row.version))
+            if cached is not None:
+                _generation_metadata_cache.move_to_end((connection_id, row.version))
+                return cached
+
+    metadata = await get_database_metadata(db, connection_id)
+    if metadata is None:
+        return None
+    snapshot = GenerationMetadata(
+        id=metadata.id,
+        database_connection_id=metadata.database_connection_id,
+        version=metadata.version,
+        datasets=metadata.datasets,
+        relationships=metadata.relationships,
+        schema_text=metadata.schema_text,
+        schema_token_count=metadata.schema_token_count
+    )
+    if snapshot.version is not None:
+        with _generation_metadata_lock:
+            _generation_metadata_cache[(connection_id, snapshot.version)] = snapshot
+            while len(_generation_metadata_cache) > settings.GENERATION_METADATA_CACHE_SIZE:
+                _generation_metadata_cache.popitem(last=False)
+    return snapshot
+
+def extract_database_metadata(
+    db: Session,
+    connection: DatabaseConnection,
+    full_refresh: bool = False,
+    progress: Optional[MetadataCrawlProgress] = None
+) -> DatabaseMetadata:
+    """Extract metadata for a connection and save it.
+
+    Existing metadata is refreshed incrementally: only tables that were added
+    or modified since the last extraction are re-fetched and deleted tables
+    are dropped. ``full_refresh`` forces a crawl of the whole project.
+    """
+    import logging
+    import time
+    logger = logging.getLogger(__name__)
+
+    # Runs on a job worker thread with a sync session
+    existing_metadata = db.query(DatabaseMetadata).filter(
+        DatabaseMetadata.database_connection_id == connection.id
     ).first()
+    previous = None
+    if existing_metadata and existing_metadata.table_fingerprints and not full_refresh:
+        logger.info(f"Found existing metadata for connection {connection.id}, refreshing incrementally")
+        previous = {
+            "datasets": existing_metadata.datasets,
+            "table_fingerprints": existing_metadata.table_fingerprints
+        }
+
+    # Extract metadata from the source database
+    logger.info(f"Starting {connection.connection_type} metadata extraction for connection {connection.id}")
+    extract_start = time.time()
+    try:
+        metadata_dict = DatabaseService.get_database_metadata(connection, previous, progress)
+        extract_duration = time.time() - extract_start
+        logger.info(f"Metadata extraction completed in {extract_duration:.2f} seconds")
+    except Exception as e:
+        logger.error(f"Metadata extraction failed after {time.time() - extract_start:.2f} seconds: {str(e)}", exc_info=True)
+        raise
+
+    if settings.RELATIONSHIP_INFERENCE_ENABLED:
+        metadata_dict['relationships'] = _infer_relationships(connection, metadata_dict)
+
+    # Create or update metadata record
+    logger.debug(f"Saving metadata record for connection {connection.id}")
+    db_start = time.time()
+    try:
+        if existing_metadata:
+            metadata = update_database_metadata(
+                db,
+                existing_metadata,
+                DatabaseMetadataUpdate(
+                    datasets=metadata_dict.get('datasets'),
+                    tables=metadata_dict.get('tables'),
+                    relationships=metadata_dict.get('relationships'),
+                    constraints=metadata_dict.get('constraints'),
+                    table_fingerprints=metadata_dict.get('table_fingerprints')
+                )
+            )
+        else:
+            metadata = create_database_metadata(
+                db,
+                DatabaseMetadataCreate(
+                    database_connection_id=connection.id,
+                    datasets=metadata_dict.get('datasets'),
+                    tables=metadata_dict.get('tables'),
+                    relationships=metadata_dict.get('relationships'),
+                    constraints=metadata_dict.get('constraints'),
+                    table_fingerprints=metadata_dict.get('table_fingerprints')
+                )
+            )
+        db_duration = time.time() - db_start
+        logger.info(f"Database metadata save completed in {db_duration:.2f} seconds")
+    except Exception as e:
+        logger.error(f"Database metadata save failed after {time.time() - db_start:.2f} seconds: {str(e)}", exc_info=True)
+        raise
+    # Answers generated against the old schema are no longer valid
+    sql_query_cache.invalidate_connection(connection.id)
+    return metadata
 
 class DatabaseService:
+    METADATA_STRATEGY_API = "api"
+    METADATA_STRATEGY_INFORMATION_SCHEMA = "information_schema"
+
+    # INFORMATION_SCHEMA reports GoogleSQL type names; map them back to the
+    # legacy names returned by the table API so both strategies agree.
+    _INFORMATION_SCHEMA_TYPES = {
+        "INT64": "INTEGER",
+        "FLOAT64": "FLOAT",
+        "BOOL": "BOOLEAN",
+        "STRUCT": "RECORD",
+    }
+
     @staticmethod
     def get_connection_url(connection: DatabaseConnection) -> str:
-        """Get the connection URL for BigQuery."""
+        """Get the connection URL (without the password) for display and logging."""
+        extractor = get_extractor(connection)
+        if hasattr(extractor, "connection_url"):
+            return extractor.connection_url(connection).render_as_string(hide_password=True)
         return f"bigquery://{connection.project_id}"
 
     @staticmethod
     def create_engine(connection: DatabaseConnection):
-        """Create a BigQuery engine using the connection details."""
-        from google.cloud import bigquery
-        from google.oauth2 import service_account
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        try:
-            if not connection.credentials_json:
-                raise ValueError("No credentials provided")
-            if not connection.project_id:
-                raise ValueError("No project ID provided")
-                
-            credentials = service_account.Credentials.from_service_account_info(
-                connection.credentials_json
-            )
-            client = bigquery.Client(credentials=credentials, project=connection.project_id)
-            logger.debug(f"Successfully created BigQuery client for project {connection.project_id}")
-            return client
-        except Exception as e:
-            logger.error(f"Error creating BigQuery client: {str(e)}")
-            raise
+        """Check out the BigQuery client for the connection; use it as a context manager.
+
+        Clients are cached per connection (see ``bigquery_client_registry``),
+        so credentials are parsed and tokens minted once rather than per call.
+        """
+        return bigquery_client_registry.checkout(connection)
 
     @staticmethod
-    def get_database_metadata(connection: DatabaseConnection) -> Dict[str, Any]:
-        """Get metadata for the BigQuery connection."""
+    def get_database_metadata(
+        connection: DatabaseConnection,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[MetadataCrawlProgress] = None
+    ) -> Dict[str, Any]:
+        """Get metadata for a connection with the extractor for its type.
+
+        When ``previous`` metadata with table fingerprints is given, backends
+        that support it re-fetch only tables added or modified since then.
+        """
         import logging
         logger = logging.getLogger(__name__)
         try:
-            metadata = DatabaseService._get_bigquery_metadata(connection)
+            metadata = get_extractor(connection).extract(connection, previous, progress)
             logger.debug(f"Successfully extracted metadata for connection {connection.id}")
             return metadata
         except Exception as e:
@@ -154,8 +508,102 @@ class DatabaseService:
             raise
 
     @staticmethod
-    def _get_bigquery_metadata(connection: DatabaseConnection) -> Dict[str, Any]:
-        """Get BigQuery-specific metadata."""
+    def _columns_from_schema(schema) -> List[Dict[str, Any]]:
+        """Convert a BigQuery table schema into column dictionaries."""
+        return [
+            {
+                "name": field.name,
+                "type": str(field.field_type),
+                "mode": field.mode,
+                "description": field.description
+            }
+            for field in schema
+        ]
+
+    @staticmethod
+    def _schema_hash(columns: List[Dict[str, Any]]) -> str:
+        """Hash a table's column list so schema changes can be detected."""
+        import hashlib
+        import json
+        return hashlib.sha256(
+            json.dumps(columns, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    @staticmethod
+    def _table_fingerprint(columns: List[Dict[str, Any]], last_modified: Optional[int]) -> Dict[str, Any]:
+        """Build the fingerprint stored for a table alongside the metadata."""
+        return {
+            "last_modified": last_modified,
+            "schema_hash": DatabaseService._schema_hash(columns)
+        }
+
+    @staticmethod
+    def _table_modified_times(client, dataset_ref) -> Dict[str, int]:
+        """Get last-modified times (epoch ms) for every table in a dataset in one query."""
+        sql = f"""
+            SELECT table_id, last_modified_time
+            FROM `{dataset_ref.project}.{dataset_ref.dataset_id}.__TABLES__`
+            ORDER BY table_id
+        """
+        return {
+            row["table_id"]: int(row["last_modified_time"])
+            for row in client.query(sql).result()
+        }
+
+    @staticmethod
+    def _fetch_table_batch(
+        client,
+        dataset_ref,
+        table_ids: List[str],
+        progress: Optional[MetadataCrawlProgress] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch the schemas for a batch of tables, skipping tables that fail.
+
+        Returns one ``{"name", "columns", "fingerprint"}`` entry per table
+        that could be fetched.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+
+        tables = []
+        for table_id in table_ids:
+            try:
+                table = client.get_table(dataset_ref.table(table_id))
+                columns = DatabaseService._columns_from_schema(table.schema)
+                last_modified = int(table.modified.timestamp() * 1000) if table.modified else None
+                tables.append({
+                    "name": table_id,
+                    "columns": columns,
+                    "fingerprint": DatabaseService._table_fingerprint(columns, last_modified)
+                })
+                logger.debug(f"Processed {len(columns)} columns for table {table_id}")
+                if progress:
+                    progress.add_tables()
+            except Exception as e:
+                logger.error(f"Error processing table {table_id}: {str(e)}", exc_info=True)
+                if progress:
+                    progress.add_error(f"Error processing table {dataset_ref.dataset_id}.{table_id}: {str(e)}")
+                continue
+        return tables
+
+    @staticmethod
+    def _get_bigquery_metadata(
+        connection: DatabaseConnection,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[MetadataCrawlProgress] = None
+    ) -> Dict[str, Any]:
+        """Get BigQuery-specific metadata.
+
+        Table schemas are fetched concurrently: each dataset's tables are split
+        into batches of ``BIGQUERY_CRAWL_BATCH_SIZE`` and the batches are spread
+        over a pool of ``BIGQUERY_CRAWL_MAX_WORKERS`` threads. Datasets and
+        tables keep the order in which BigQuery lists them.
+
+        With ``previous`` metadata, each dataset's tables are listed together
+        with their last-modified times and only new or modified tables are
+        fetched; unchanged tables reuse their previous columns and tables
+        that no longer exist are dropped.
+        """
         import logging
         import time
         logger = logging.getLogger(__name__)
@@ -163,92 +611,356 @@ class DatabaseService:
         try:
             logger.info(f"Creating BigQuery client for project {connection.project_id}")
             client_start = time.time()
-            try:
-                client = DatabaseService.create_engine(connection)
-                client_duration = time.time() - client_start
-                logger.info(f"BigQuery client created in {client_duration:.2f} seconds")
-            except Exception as e:
-                logger.error(f"Failed to create BigQuery client after {time.time() - client_start:.2f} seconds: {str(e)}", exc_info=True)
-                raise
-            
-            # Get datasets
-            logger.info("Starting to fetch datasets")
-            datasets_start = time.time()
-            datasets = []
-            dataset_count = 0
-            table_count = 0
-            
-            try:
-                for dataset in client.list_datasets():
-                    dataset_count += 1
-                    dataset_ref = dataset.reference
-                    logger.debug(f"Processing dataset {dataset.dataset_id} ({dataset_count})")
-                    tables = []
-                    
-                    # Get tables in dataset
+            with DatabaseService.create_engine(connection) as client:
+                logger.info(f"BigQuery client ready in {time.time() - client_start:.2f} seconds")
+
+                max_workers = max(1, settings.BIGQUERY_CRAWL_MAX_WORKERS)
+                batch_size = max(1, settings.BIGQUERY_CRAWL_BATCH_SIZE)
+                incremental = bool(previous and previous.get("table_fingerprints"))
+                previous_fingerprints = previous.get("table_fingerprints", {}) if incremental else {}
+                previous_columns = {
+                    f"{dataset['name']}.{table['name']}": table["columns"]
+                    for dataset in (previous.get("datasets") or [] if incremental else [])
+                    for table in dataset["tables"]
+                }
+
+                # Get datasets
+                logger.info(
+                    f"Starting to fetch datasets (workers={max_workers}, batch_size={batch_size}, "
+                    f"incremental={incremental})"
+                )
+                datasets_start = time.time()
+                try:
+                    dataset_items = list(client.list_datasets())
+                except Exception as e:
+                    logger.error(f"Error listing datasets: {str(e)}", exc_info=True)
+                    raise
+                if progress:
+                    progress.set_datasets_total(len(dataset_items))
+
+                def list_dataset_tables(dataset):
+                    """List (table_id, last_modified) pairs; last_modified is only known when incremental."""
+                    if incremental:
+                        try:
+                            modified = DatabaseService._table_modified_times(client, dataset.reference)
+                            return list(modified.items())
+                        except Exception as e:
+                            logger.warning(
+                                f"Could not read modification times for dataset {dataset.dataset_id}, "
+                                f"re-fetching all of its tables: {str(e)}"
+                            )
                     try:
-                        for table in client.list_tables(dataset_ref):
-                            table_count += 1
-                            table_ref = table.reference
-                            logger.debug(f"Processing table {table.table_id} ({table_count})")
-                            
-                            try:
-                                schema = client.get_table(table_ref).schema
-                                logger.debug(f"Retrieved schema for table {table.table_id}")
-                                
-                                # Get columns
-                                columns = []
-                                for field in schema:
-                                    columns.append({
-                                        "name": field.name,
-                                        "type": str(field.field_type),
-                                        "mode": field.mode,
-                                        "description": field.description
-                                    })
-                                
-                                tables.append({
-                                    "name": table.table_id,
-                                    "columns": columns
-                                })
-                                logger.debug(f"Processed {len(columns)} columns for table {table.table_id}")
-                            except Exception as e:
-                                logger.error(f"Error processing table {table.table_id}: {str(e)}", exc_info=True)
-                                continue
+                        return [(table.table_id, None) for table in client.list_tables(dataset.reference)]
                     except Exception as e:
                         logger.error(f"Error listing tables for dataset {dataset.dataset_id}: {str(e)}", exc_info=True)
-                        continue
-                    
-                    datasets.append({
-                        "name": dataset.dataset_id,
-                        "tables": tables
-                    })
-                    logger.debug(f"Completed processing dataset {dataset.dataset_id} with {len(tables)} tables")
-            except Exception as e:
-                logger.error(f"Error listing datasets: {str(e)}", exc_info=True)
-                raise
-            
-            datasets_duration = time.time() - datasets_start
-            logger.info(f"Fetched {dataset_count} datasets and {table_count} tables in {datasets_duration:.2f} seconds")
-            
-            metadata = {
-                "datasets": datasets
-            }
-            return metadata
+                        if progress:
+                            progress.add_error(f"Error listing tables for dataset {dataset.dataset_id}: {str(e)}")
+                        return None
+
+                datasets = []
+                table_fingerprints = {}
+                table_count = 0
+                fetched_count = 0
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bq-crawl") as executor:
+                    # Tables are listed for all datasets up front, then each dataset's
+                    # tables are submitted in batches so the pool stays saturated.
+                    dataset_tables = list(executor.map(list_dataset_tables, dataset_items))
+
+                    pending = []
+                    for dataset, table_items in zip(dataset_items, dataset_tables):
+                        if table_items is None:
+                            if progress:
+                                progress.add_datasets()
+                            continue
+                        to_fetch = []
+                        for table_id, last_modified in table_items:
+                            key = f"{dataset.dataset_id}.{table_id}"
+                            fingerprint = previous_fingerprints.get(key)
+                            unchanged = (
+                                last_modified is not None
+                                and fingerprint is not None
+                                and fingerprint.get("last_modified") == last_modified
+                                and key in previous_columns
+                            )
+                            if not unchanged:
+                                to_fetch.append(table_id)
+                        logger.debug(
+                            f"Queueing {len(to_fetch)} of {len(table_items)} tables for dataset {dataset.dataset_id}"
+                        )
+                        futures = [
+                            executor.submit(
+                                DatabaseService._fetch_table_batch,
+                                client,
+                                dataset.reference,
+                                to_fetch[i:i + batch_size],
+                                progress
+                            )
+                            for i in range(0, len(to_fetch), batch_size)
+                        ]
+                        pending.append((dataset, table_items, futures))
+
+                    for dataset, table_items, futures in pending:
+                        fetched = {}
+                        for future in futures:
+                            for table in future.result():
+                                fetched[table["name"]] = table
+                        fetched_count += len(fetched)
+
+                        tables = []
+                        for table_id, _ in table_items:
+                            key = f"{dataset.dataset_id}.{table_id}"
+                            if table_id in fetched:
+                                table = fetched[table_id]
+                                tables.append({
+                                    "name": table_id,
+                                    "columns": table["columns"]
+                                })
+                                table_fingerprints[key] = table["fingerprint"]
+                            elif key in previous_columns and key in previous_fingerprints:
+                                tables.append({
+                                    "name": table_id,
+                                    "columns": previous_columns[key]
+                                })
+                                table_fingerprints[key] = previous_fingerprints[key]
+                        table_count += len(tables)
+                        datasets.append({
+                            "name": dataset.dataset_id,
+                            "tables": tables
+                        })
+                        if progress:
+                            progress.add_tables(len(tables) - len(fetched))
+                            progress.add_datasets()
+                        logger.debug(f"Completed processing dataset {dataset.dataset_id} with {len(tables)} tables")
+
+                datasets_duration = time.time() - datasets_start
+                throughput = fetched_count / datasets_duration if datasets_duration > 0 else 0.0
+                logger.info(
+                    f"Fetched {len(datasets)} datasets and {table_count} tables ({fetched_count} schemas fetched) "
+                    f"in {datasets_duration:.2f} seconds "
+                    f"({throughput:.1f} tables/sec, workers={max_workers}, batch_size={batch_size})"
+                )
+                if incremental:
+                    removed = set(previous_fingerprints) - set(table_fingerprints)
+                    logger.info(
+                        f"Incremental refresh: {fetched_count} tables added or changed, "
+                        f"{table_count - fetched_count} unchanged, {len(removed)} removed"
+                    )
+
+                metadata = {
+                    "datasets": datasets,
+                    "table_fingerprints": table_fingerprints
+                }
+                return metadata
             
         except Exception as e:
             logger.error(f"Error in _get_bigquery_metadata: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def _information_schema_column(row) -> Dict[str, Any]:
+        """Convert an INFORMATION_SCHEMA.COLUMNS row into a column dictionary."""
+        data_type = row["data_type"]
+        if data_type.startswith("ARRAY<"):
+            mode = "REPEATED"
+            data_type = data_type[len("ARRAY<"):-1]
+        else:
+            mode = "NULLABLE" if row["is_nullable"] == "YES" else "REQUIRED"
+        # Drop parameters such as STRING(10), NUMERIC(10, 2) or STRUCT<...>
+        base_type = data_type.split("<", 1)[0].split("(", 1)[0].strip()
+        return {
+            "name": row["column_name"],
+            "type": DatabaseService._INFORMATION_SCHEMA_TYPES.get(base_type, base_type),
+            "mode": mode,
+            "description": row["description"]
+        }
+
+    @staticmethod
+    def _get_bigquery_metadata_information_schema(
+        connection: DatabaseConnection,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[MetadataCrawlProgress] = None
+    ) -> Dict[str, Any]:
+        """Get BigQuery metadata from bulk INFORMATION_SCHEMA queries.
+
+        Runs one COLUMNS query per dataset region (joined with
+        COLUMN_FIELD_PATHS for descriptions) and streams the result pages into
+        the same datasets/tables/columns tree the API walk produces.
+
+        With ``previous`` metadata, the COLUMNS queries are filtered to the
+        tables added or modified since then (datasets whose modification times
+        cannot be read are queried whole); unchanged tables reuse their
+        previous columns and tables that no longer exist are dropped.
+        """
+        import logging
+        import time
+        from google.cloud import bigquery
+        logger = logging.getLogger(__name__)
+
+        start = time.time()
+        with DatabaseService.create_engine(connection) as client:
+            incremental = bool(previous and previous.get("table_fingerprints"))
+            previous_fingerprints = previous.get("table_fingerprints", {}) if incremental else {}
+            previous_columns = {
+                f"{dataset['name']}.{table['name']}": table["columns"]
+                for dataset in (previous.get("datasets") or [] if incremental else [])
+                for table in dataset["tables"]
+            }
+
+            # Seed the tree from list_datasets() so empty datasets are kept and
+            # hidden datasets returned by INFORMATION_SCHEMA are ignored.
+            tree: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+            datasets_by_location: Dict[str, List[str]] = {}
+            dataset_items = list(client.list_datasets())
+            # List items carry no public location; look each dataset up concurrently
+            with ThreadPoolExecutor(max_workers=max(1, settings.BIGQUERY_CRAWL_MAX_WORKERS)) as executor:
+                locations = list(executor.map(
+                    lambda dataset: client.get_dataset(dataset.reference).location,
+                    dataset_items
+                ))
+            for dataset, location in zip(dataset_items, locations):
+                tree[dataset.dataset_id] = {}
+                datasets_by_location.setdefault(location.lower(), []).append(dataset.dataset_id)
+            if progress:
+                progress.set_datasets_total(len(dataset_items))
+
+            # Modification times feed the fingerprints and decide what a refresh
+            # re-queries; None marks a dataset whose times could not be read.
+            def dataset_modified_times(dataset):
+                try:
+                    return DatabaseService._table_modified_times(client, dataset.reference)
+                except Exception as e:
+                    logger.warning(f"Could not read modification times for dataset {dataset.dataset_id}: {str(e)}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=max(1, settings.BIGQUERY_CRAWL_MAX_WORKERS)) as executor:
+                modified_times = dict(zip(
+                    [dataset.dataset_id for dataset in dataset_items],
+                    executor.map(dataset_modified_times, dataset_items)
+                ))
+
+            # Datasets queried whole, and single tables queried as "dataset.table"
+            whole_datasets = set(tree) if not incremental else set()
+            changed_tables = set()
+            if incremental:
+                for dataset_name, times in modified_times.items():
+                    if times is None:
+                        whole_datasets.add(dataset_name)
+                        continue
+                    for table_name, last_modified in times.items():
+                        key = f"{dataset_name}.{table_name}"
+                        fingerprint = previous_fingerprints.get(key)
+                        if (
+                            fingerprint is not None
+                            and fingerprint.get("last_modified") == last_modified
+                            and key in previous_columns
+                        ):
+                            tree[dataset_name][table_name] = previous_columns[key]
+                            if progress:
+                                progress.add_tables()
+                        else:
+                            changed_tables.add(key)
+
+            row_count = 0
+            for location, dataset_ids in datasets_by_location.items():
+                region_datasets = [name for name in dataset_ids if name in whole_datasets]
+                region_tables = sorted(
+                    key for key in changed_tables if key.split(".", 1)[0] in dataset_ids
+                )
+                if not region_datasets and not region_tables:
+                    continue
+                region = f"`{connection.project_id}`.`region-{location}`.INFORMATION_SCHEMA"
+                where = ""
+                job_config = None
+                if incremental:
+                    where = """
+                    WHERE c.table_schema IN UNNEST(@datasets)
+                        OR CONCAT(c.table_schema, '.', c.table_name) IN UNNEST(@tables)
+                    """
+                    job_config = bigquery.QueryJobConfig(query_parameters=[
+                        bigquery.ArrayQueryParameter("datasets", "STRING", region_datasets),
+                        bigquery.ArrayQueryParameter("tables", "STRING", region_tables)
+                    ])
+                sql = f"""
+                    SELECT
+                        c.table_schema,
+                        c.table_name,
+                        c.column_name,
+                        c.data_type,
+                        c.is_nullable,
+                        p.description
+                    FROM {region}.COLUMNS AS c
+                    LEFT JOIN {region}.COLUMN_FIELD_PATHS AS p
+                        ON p.table_schema = c.table_schema
+                        AND p.table_name = c.table_name
+                        AND p.field_path = c.column_name
+                    {where}
+                    ORDER BY c.table_schema, c.table_name, c.ordinal_position
+                """
+                logger.info(
+                    f"Querying INFORMATION_SCHEMA for {len(region_datasets)} datasets and "
+                    f"{len(region_tables)} changed tables in region {location}"
+                )
+                query_start = time.time()
+                rows = client.query(sql, job_config=job_config).result(
+                    page_size=settings.BIGQUERY_INFORMATION_SCHEMA_PAGE_SIZE
+                )
+                fetched = set()
+                for row in rows:
+                    tables = tree.get(row["table_schema"])
+                    if tables is None:
+                        continue
+                    key = (row["table_schema"], row["table_name"])
+                    if key not in fetched:
+                        fetched.add(key)
+                        tables[row["table_name"]] = []
+                        if progress:
+                            progress.add_tables()
+                    tables[row["table_name"]].append(DatabaseService._information_schema_column(row))
+                    row_count += 1
+                logger.info(f"Streamed INFORMATION_SCHEMA rows for region {location} in {time.time() - query_start:.2f} seconds")
+
+            datasets = []
+            table_fingerprints = {}
+            for dataset_name, tables in tree.items():
+                times = modified_times[dataset_name] or {}
+                table_names = sorted(tables) if incremental else list(tables)
+                for table_name in table_names:
+                    table_fingerprints[f"{dataset_name}.{table_name}"] = DatabaseService._table_fingerprint(
+                        tables[table_name], times.get(table_name)
+                    )
+                datasets.append({
+                    "name": dataset_name,
+                    "tables": [
+                        {"name": table_name, "columns": tables[table_name]}
+                        for table_name in table_names
+                    ]
+                })
+            if progress:
+                progress.add_datasets(len(datasets))
+            table_count = sum(len(dataset["tables"]) for dataset in datasets)
+            logger.info(
+                f"Fetched {len(datasets)} datasets, {table_count} tables and {row_count} columns "
+                f"from INFORMATION_SCHEMA in {time.time() - start:.2f} seconds"
+            )
+            if incremental:
+                removed = set(previous_fingerprints) - set(table_fingerprints)
+                logger.info(
+                    f"Incremental refresh: {len(changed_tables)} tables added or changed, "
+                    f"{table_count - len(changed_tables)} unchanged, {len(removed)} removed"
+                )
+            return {
+                "datasets": datasets,
+                "table_fingerprints": table_fingerprints
+            }
+
     @staticmethod
     def test_connection(connection: DatabaseConnection) -> bool:
-        """Test if the BigQuery connection is valid."""
+        """Test if the connection is valid."""
         import logging
         logger = logging.getLogger(__name__)
         try:
-            client = DatabaseService.create_engine(connection)
-            # Try to list datasets to verify connection
-            next(client.list_datasets())
-            logger.debug(f"Successfully tested connection for project {connection.project_id}")
+            get_extractor(connection).test_connection(connection)
+            logger.debug(f"Successfully tested connection {connection.id}")
             return True
         except Exception as e:
             logger.error(f"Connection test failed: {str(e)}")
@@ -0,0 +1,19 @@
+import threading
+
+from app.core.config import settings
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+def get_embeddings_client():
+    """Get the process-wide OpenAI embeddings client, creating it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                from langchain_community.embeddings import OpenAIEmbeddings
+                _embeddings = OpenAIEmbeddings(
+                    api_key=settings.OPENAI_API_KEY,
+                    model=settings.OPENAI_EMBEDDING_MODEL
+                )
+    return _embeddings
@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+class MetadataExtractor(ABC):
+    """Reads a connection's schema into the dictionaries stored in ``DatabaseMetadata``.
+
+    ``extract`` returns ``datasets`` (``[{"name", "tables": [{"name",
+    "columns": [{"name", "type", "mode", "description"}]}]}]``) and
+    ``table_fingerprints`` keyed by ``"dataset.table"``, plus
+    ``relationships`` and ``constraints`` where the backend has them:
+
+    - relationship: ``{"name", "from_dataset", "from_table", "from_columns",
+      "to_dataset", "to_table", "to_columns"}`` (one per foreign key)
+    - constraint: ``{"type": "primary_key" | "unique", "name", "dataset",
+      "table", "columns"}``
+
+    Extractors are stateless; one instance is created per call.
+    """
+
+    @abstractmethod
+    def extract(
+        self,
+        connection: Any,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """Extract the schema. ``previous`` metadata allows an incremental refresh where supported."""
+
+    @abstractmethod
+    def test_connection(self, connection: Any) -> bool:
+        """Check that the connection's credentials work."""
+
+    def sample_overlap(self, connection: Any, relationships: List[Dict[str, Any]], sample_size: int) -> List[Optional[float]]:
+        """Share of sampled non-null referencing values found in the referenced column, per relationship.
+
+        None where the backend cannot sample (or sampling would cost money).
+        """
+        return [None] * len(relationships)
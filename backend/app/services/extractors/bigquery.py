@@ -0,0 +1,43 @@
+import logging
+from typing import Any, Dict, Optional
+
+from app.services.extractors.base import MetadataExtractor
+
+logger = logging.getLogger(__name__)
+
+class BigQueryExtractor(MetadataExtractor):
+    """BigQuery projects, crawled through the table API or INFORMATION_SCHEMA.
+
+    The crawl itself lives in ``DatabaseService``; this selects the strategy
+    configured on the connection. If the INFORMATION_SCHEMA strategy fails,
+    it falls back to the per-table API walk. When ``previous`` metadata with
+    table fingerprints is given, either strategy re-fetches only the tables
+    that were added or modified since then.
+    """
+
+    def extract(
+        self,
+        connection: Any,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        from app.services.database import DatabaseService
+
+        strategy = connection.metadata_strategy or DatabaseService.METADATA_STRATEGY_API
+        if strategy == DatabaseService.METADATA_STRATEGY_INFORMATION_SCHEMA:
+            try:
+                return DatabaseService._get_bigquery_metadata_information_schema(connection, previous, progress)
+            except Exception as e:
+                logger.warning(
+                    f"INFORMATION_SCHEMA extraction failed for connection {connection.id}, "
+                    f"falling back to the table API: {str(e)}"
+                )
+        return DatabaseService._get_bigquery_metadata(connection, previous, progress)
+
+    def test_connection(self, connection: Any) -> bool:
+        from app.services.bigquery_clients import bigquery_client_registry
+
+        with bigquery_client_registry.checkout(connection) as client:
+            # Listing datasets verifies the credentials and project
+            next(iter(client.list_datasets()), None)
+        return True
@@ -0,0 +1,27 @@
+from typing import Any, Dict, Type
+
+from app.services.extractors.base import MetadataExtractor
+from app.services.extractors.bigquery import BigQueryExtractor
+from app.services.extractors.sql import MySQLExtractor, PostgresExtractor, SQLiteExtractor
+
+# connection_type -> extractor; connections without a type are BigQuery
+EXTRACTORS: Dict[str, Type[MetadataExtractor]] = {
+    "bigquery": BigQueryExtractor,
+    "postgresql": PostgresExtractor,
+    "postgres": PostgresExtractor,
+    "mysql": MySQLExtractor,
+    "mariadb": MySQLExtractor,
+    "sqlite": SQLiteExtractor,
+}
+
+def register_extractor(connection_type: str, extractor: Type[MetadataExtractor]) -> None:
+    """Add (or replace) the extractor used for a connection type."""
+    EXTRACTORS[connection_type.lower()] = extractor
+
+def get_extractor(connection: Any) -> MetadataExtractor:
+    """Get the metadata extractor for a connection's type."""
+    connection_type = (connection.connection_type or "bigquery").lower()
+    extractor = EXTRACTORS.get(connection_type)
+    if extractor is None:
+        raise ValueError(f"Unsupported connection type: {connection.connection_type}")
+    return extractor()
@@ -0,0 +1,391 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from sqlalchemy import case, create_engine, func, inspect, literal, select, text
+from sqlalchemy import column as sa_column, table as sa_table
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.engine.reflection import ObjectKind
+
+from app.core.config import settings
+from app.services.extractors.base import MetadataExtractor
+
+logger = logging.getLogger(__name__)
+
+def _column(name: str, column_type: Any, nullable: bool, description: Optional[str]) -> Dict[str, Any]:
+    # Same shape as BigQuery columns, so prompts and the catalog treat all backends alike
+    return {
+        "name": name,
+        "type": str(column_type),
+        "mode": "NULLABLE" if nullable else "REQUIRED",
+        "description": description or None
+    }
+
+def _relationship(
+    name: Optional[str],
+    schema: str,
+    table: str,
+    columns: List[str],
+    to_schema: str,
+    to_table: str,
+    to_columns: List[str]
+) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "from_dataset": schema,
+        "from_table": table,
+        "from_columns": columns,
+        "to_dataset": to_schema,
+        "to_table": to_table,
+        "to_columns": to_columns
+    }
+
+def _constraint(kind: str, name: Optional[str], schema: str, table: str, columns: List[str]) -> Dict[str, Any]:
+    return {"type": kind, "name": name, "dataset": schema, "table": table, "columns": columns}
+
+class SQLAlchemyExtractor(MetadataExtractor):
+    """Relational databases reached through SQLAlchemy; schemas map to datasets.
+
+    Each schema is read with bulk reflection (``Inspector.get_multi_*``):
+    one catalog pass per kind of object instead of one round trip per table.
+    Dialects whose bulk reflection still loops over tables override
+    ``read_schema`` with direct catalog queries. Schemas are read in
+    parallel on up to ``METADATA_EXTRACTOR_MAX_WORKERS`` connections.
+
+    The password is taken from ``credentials_json["password"]``. Set
+    ``dataset`` on the connection to read a single schema.
+    """
+
+    drivername = ""
+    default_port: Optional[int] = None
+    system_schemas = frozenset({"information_schema"})
+
+    def connection_url(self, connection: Any) -> URL:
+        credentials = connection.credentials_json if isinstance(connection.credentials_json, dict) else {}
+        return URL.create(
+            self.drivername,
+            username=connection.username or None,
+            password=credentials.get("password"),
+            host=connection.host or None,
+            port=int(connection.port) if connection.port else self.default_port,
+            database=connection.database_name or None
+        )
+
+    def create_engine(self, connection: Any, pool_size: int = 1) -> Engine:
+        return create_engine(
+            self.connection_url(connection),
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_pre_ping=True
+        )
+
+    def is_system_schema(self, schema: str) -> bool:
+        return schema.lower() in self.system_schemas
+
+    def schema_names(self, conn: Connection, connection: Any) -> List[str]:
+        if connection.dataset:
+            return [connection.dataset]
+        return [schema for schema in inspect(conn).get_schema_names() if not self.is_system_schema(schema)]
+
+    def read_schema(self, conn: Connection, schema: str) -> Dict[str, Any]:
+        """Tables (name -> columns), relationships and constraints of one schema."""
+        inspector = inspect(conn)
+        tables: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        columns = inspector.get_multi_columns(schema=schema, kind=ObjectKind.ANY)
+        for (_, table), table_columns in sorted(columns.items(), key=lambda item: item[0][1]):
+            tables[table] = [
+                _column(column["name"], column["type"], column.get("nullable", True), column.get("comment"))
+                for column in table_columns
+            ]
+
+        relationships = []
+        for (_, table), foreign_keys in inspector.get_multi_foreign_keys(schema=schema).items():
+            for foreign_key in foreign_keys:
+                relationships.append(_relationship(
+                    foreign_key.get("name"),
+                    schema,
+                    table,
+                    foreign_key["constrained_columns"],
+                    foreign_key.get("referred_schema") or schema,
+                    foreign_key["referred_table"],
+                    foreign_key["referred_columns"]
+                ))
+
+        constraints = []
+        for (_, table), primary_key in inspector.get_multi_pk_constraint(schema=schema).items():
+            if primary_key and primary_key.get("constrained_columns"):
+                constraints.append(_constraint(
+                    "primary_key", primary_key.get("name"), schema, table, primary_key["constrained_columns"]
+                ))
+        for (_, table), uniques in inspector.get_multi_unique_constraints(schema=schema).items():
+            for unique in uniques:
+                constraints.append(_constraint("unique", unique.get("name"), schema, table, unique["column_names"]))
+        return {"tables": tables, "relationships": relationships, "constraints": constraints}
+
+    def extract(
+        self,
+        connection: Any,
+        previous: Optional[Dict[str, Any]] = None,
+        progress: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """Read every schema. Catalog queries are cheap, so ``previous`` is not needed."""
+        from app.services.database import DatabaseService
+
+        start = time.time()
+        workers = max(1, settings.METADATA_EXTRACTOR_MAX_WORKERS)
+        engine = self.create_engine(connection, pool_size=workers)
+        try:
+            with engine.connect() as conn:
+                schemas = self.schema_names(conn, connection)
+            if progress:
+                progress.set_datasets_total(len(schemas))
+
+            def read(schema: str) -> Optional[Dict[str, Any]]:
+                try:
+                    with engine.connect() as conn:
+                        result = self.read_schema(conn, schema)
+                except Exception as e:
+                    logger.error(f"Error reading schema {schema}: {str(e)}", exc_info=True)
+                    if progress:
+                        progress.add_error(f"Error reading schema {schema}: {str(e)}")
+                    return None
+                if progress:
+                    progress.add_tables(len(result["tables"]))
+                    progress.add_datasets()
+                return result
+
+            with ThreadPoolExecutor(max_workers=min(workers, len(schemas)) or 1) as executor:
+                results = list(executor.map(read, schemas))
+        finally:
+            engine.dispose()
+
+        datasets = []
+        relationships = []
+        constraints = []
+        table_fingerprints = {}
+        for schema, result in zip(schemas, results):
+            if result is None:
+                continue
+            datasets.append({
+                "name": schema,
+                "tables": [{"name": table, "columns": columns} for table, columns in result["tables"].items()]
+            })
+            for table, columns in result["tables"].items():
+                table_fingerprints[f"{schema}.{table}"] = DatabaseService._table_fingerprint(columns, None)
+            relationships.extend(result["relationships"])
+            constraints.extend(result["constraints"])
+
+        table_count = sum(len(dataset["tables"]) for dataset in datasets)
+        logger.info(
+            f"Read {len(datasets)} schemas, {table_count} tables and {len(relationships)} foreign keys "
+            f"from connection {connection.id} in {time.time() - start:.2f} seconds"
+        )
+        return {
+            "datasets": datasets,
+            "relationships": relationships,
+            "constraints": constraints,
+            "table_fingerprints": table_fingerprints
+        }
+
+    def sample_overlap(self, connection: Any, relationships: List[Dict[str, Any]], sample_size: int) -> List[Optional[float]]:
+        """Check single-column relationships against the first ``sample_size`` referencing values."""
+        overlaps: List[Optional[float]] = []
+        engine = self.create_engine(connection)
+        try:
+            with engine.connect() as conn:
+                for relationship in relationships:
+                    if len(relationship["from_columns"]) != 1:
+                        overlaps.append(None)
+                        continue
+                    from_column = sa_column(relationship["from_columns"][0])
+                    to_column = sa_column(relationship["to_columns"][0])
+                    child = sa_table(relationship["from_table"], from_column, schema=relationship["from_dataset"])
+                    parent = sa_table(relationship["to_table"], to_column, schema=relationship["to_dataset"])
+                    sample = select(from_column.label("value")).select_from(child).where(
+                        from_column.isnot(None)
+                    ).limit(sample_size).subquery()
+                    matched = select(literal(1)).select_from(parent).where(to_column == sample.c.value).exists()
+                    try:
+                        total, found = conn.execute(select(
+                            func.count(),
+                            func.coalesce(func.sum(case((matched, 1), else_=0)), 0)
+                        ).select_from(sample)).one()
+                    except Exception as e:
+                        logger.warning(f"Could not sample {relationship['from_table']}.{from_column.name}: {str(e)}")
+                        conn.rollback()
+                        overlaps.append(None)
+                        continue
+                    overlaps.append(found / total if total else None)
+        finally:
+            engine.dispose()
+        return overlaps
+
+    def test_connection(self, connection: Any) -> bool:
+        engine = self.create_engine(connection)
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        finally:
+            engine.dispose()
+
+class PostgresExtractor(SQLAlchemyExtractor):
+    """PostgreSQL; SQLAlchemy's bulk reflection reads each schema in a few pg_catalog queries."""
+
+    drivername = "postgresql+psycopg2"
+    default_port = 5432
+
+    def is_system_schema(self, schema: str) -> bool:
+        return super().is_system_schema(schema) or schema.startswith("pg_")
+
+class MySQLExtractor(SQLAlchemyExtractor):
+    """MySQL and MariaDB, read with one information_schema query per kind of object.
+
+    A connection's ``database_name`` is its schema unless ``dataset`` is set.
+    """
+
+    drivername = "mysql+pymysql"
+    default_port = 3306
+    system_schemas = frozenset({"information_schema", "mysql", "performance_schema", "sys"})
+
+    def schema_names(self, conn: Connection, connection: Any) -> List[str]:
+        if not connection.dataset and connection.database_name:
+            return [connection.database_name]
+        return super().schema_names(conn, connection)
+
+    def read_schema(self, conn: Connection, schema: str) -> Dict[str, Any]:
+        tables: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        rows = conn.execute(text("""
+            SELECT table_name, column_name, column_type, is_nullable, column_comment
+            FROM information_schema.columns
+            WHERE table_schema = :schema
+            ORDER BY table_name, ordinal_position
+        """), {"schema": schema})
+        for table, name, column_type, is_nullable, comment in rows:
+            tables.setdefault(table, []).append(_column(name, column_type.upper(), is_nullable == "YES", comment))
+
+        foreign_keys: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        rows = conn.execute(text("""
+            SELECT table_name, constraint_name, column_name,
+                   referenced_table_schema, referenced_table_name, referenced_column_name
+            FROM information_schema.key_column_usage
+            WHERE table_schema = :schema AND referenced_table_name IS NOT NULL
+            ORDER BY table_name, constraint_name, ordinal_position
+        """), {"schema": schema})
+        for table, name, column, to_schema, to_table, to_column in rows:
+            foreign_key = foreign_keys.setdefault(
+                (table, name), _relationship(name, schema, table, [], to_schema, to_table, [])
+            )
+            foreign_key["from_columns"].append(column)
+            foreign_key["to_columns"].append(to_column)
+
+        constraints: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        rows = conn.execute(text("""
+            SELECT tc.table_name, tc.constraint_name, tc.constraint_type, k.column_name
+            FROM information_schema.table_constraints tc
+            JOIN information_schema.key_column_usage k
+              ON k.constraint_schema = tc.constraint_schema
+             AND k.table_name = tc.table_name
+             AND k.constraint_name = tc.constraint_name
+            WHERE tc.table_schema = :schema AND tc.constraint_type IN ('PRIMARY KEY', 'UNIQUE')
+            ORDER BY tc.table_name, tc.constraint_name, k.ordinal_position
+        """), {"schema": schema})
+        for table, name, kind, column in rows:
+            constraint = constraints.setdefault((table, name), _constraint(
+                "primary_key" if kind == "PRIMARY KEY" else "unique", name, schema, table, []
+            ))
+            constraint["columns"].append(column)
+
+        return {
+            "tables": tables,
+            "relationships": list(foreign_keys.values()),
+            "constraints": list(constraints.values())
+        }
+
+class SQLiteExtractor(SQLAlchemyExtractor):
+    """SQLite files, read through the pragma table-valued functions.
+
+    ``database_name`` is the file's path within ``SQLITE_CONNECTIONS_DIR``;
+    files elsewhere are refused, and files are opened read-only so a missing
+    path is never created. Each query joins ``sqlite_master`` with a pragma,
+    so the whole file is read in three statements however many tables it has.
+    """
+
+    drivername = "sqlite"
+
+    def database_path(self, connection: Any) -> str:
+        """Resolve the connection's file, raising ``ValueError`` if it is not an allowed path."""
+        if not settings.SQLITE_CONNECTIONS_DIR:
+            raise ValueError("SQLite connections are disabled; set SQLITE_CONNECTIONS_DIR to allow them")
+        root = os.path.realpath(settings.SQLITE_CONNECTIONS_DIR)
+        path = os.path.realpath(os.path.join(root, connection.database_name or ""))
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            raise ValueError(f"SQLite database {connection.database_name!r} not found in SQLITE_CONNECTIONS_DIR")
+        return path
+
+    def connection_url(self, connection: Any) -> URL:
+        return URL.create(
+            self.drivername,
+            database=f"file:{quote(self.database_path(connection))}",
+            query={"mode": "ro", "uri": "true"}
+        )
+
+    def schema_names(self, conn: Connection, connection: Any) -> List[str]:
+        return ["main"]
+
+    def read_schema(self, conn: Connection, schema: str) -> Dict[str, Any]:
+        tables: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        primary_keys: Dict[str, List[tuple]] = {}
+        rows = conn.execute(text("""
+            SELECT m.name, p.name, p.type, p."notnull", p.pk
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.name, p.cid
+        """))
+        for table, name, column_type, not_null, pk in rows:
+            # Primary key columns are reported as required, as the other backends do
+            tables.setdefault(table, []).append(_column(name, column_type or "ANY", not (not_null or pk), None))
+            if pk:
+                primary_keys.setdefault(table, []).append((pk, name))
+
+        constraints = [
+            _constraint("primary_key", None, schema, table, [name for _, name in sorted(columns)])
+            for table, columns in primary_keys.items()
+        ]
+        uniques: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        rows = conn.execute(text("""
+            SELECT m.name, il.name, ii.name
+            FROM sqlite_master m
+            JOIN pragma_index_list(m.name) il
+            JOIN pragma_index_info(il.name) ii
+            WHERE m.type = 'table' AND il."unique" = 1 AND il.origin = 'u'
+            ORDER BY m.name, il.name, ii.seqno
+        """))
+        for table, name, column in rows:
+            uniques.setdefault((table, name), _constraint("unique", name, schema, table, []))["columns"].append(column)
+        constraints.extend(uniques.values())
+
+        foreign_keys: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        rows = conn.execute(text("""
+            SELECT m.name, f.id, f."table", f."from", f."to"
+            FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+            WHERE m.type = 'table'
+            ORDER BY m.name, f.id, f.seq
+        """))
+        for table, key_id, to_table, column, to_column in rows:
+            foreign_key = foreign_keys.setdefault(
+                (table, key_id), _relationship(None, schema, table, [], schema, to_table, [])
+            )
+            foreign_key["from_columns"].append(column)
+            foreign_key["to_columns"].append(to_column)
+        for foreign_key in foreign_keys.values():
+            if None in foreign_key["to_columns"]:
+                # REFERENCES without columns points at the parent's primary key
+                parent = sorted(primary_keys.get(foreign_key["to_table"], []))
+                foreign_key["to_columns"] = [name for _, name in parent]
+
+        return {"tables": tables, "relationships": list(foreign_keys.values()), "constraints": constraints}
@@ -0,0 +1,281 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.query_cache import metadata_version
+from app.services.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Naming conventions stripped before matching a table to a referencing column
+_TABLE_PREFIXES = ("dim_", "fact_", "fct_", "tbl_", "stg_")
+
+def _type_family(column_type: Optional[str]) -> str:
+    """Coarse type family, so INT64 matches INTEGER and STRING matches VARCHAR."""
+    column_type = (column_type or "").upper()
+    if "INT" in column_type or "SERIAL" in column_type:
+        return "integer"
+    if any(name in column_type for name in ("CHAR", "TEXT", "STRING", "UUID")):
+        return "string"
+    if "NUMERIC" in column_type or "DECIMAL" in column_type:
+        return "numeric"
+    return column_type
+
+def _entity_names(table: str) -> Set[str]:
+    """Names a referencing column may use for a table: orders -> order, categories -> category."""
+    name = table.lower()
+    for prefix in _TABLE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    names = {name}
+    if name.endswith("ies"):
+        names.add(name[:-3] + "y")
+    elif name.endswith("ses") or name.endswith("xes"):
+        names.add(name[:-2])
+    elif name.endswith("s") and not name.endswith("ss"):
+        names.add(name[:-1])
+    return names
+
+def _referenced_entity(column: str) -> Optional[str]:
+    """The entity a column points at by name: customer_id / customerId -> customer."""
+    if column.lower().endswith("_id") and len(column) > 3:
+        return column[:-3].lower()
+    if column.endswith("Id") and len(column) > 2:
+        return column[:-2].lower()
+    return None
+
+def _key_columns(datasets: List[Dict[str, Any]], constraints: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Single-column key of each table: its declared primary key, else an ``id`` column."""
+    declared = {
+        (constraint["dataset"], constraint["table"]): constraint["columns"][0]
+        for constraint in constraints
+        if constraint.get("type") == "primary_key" and len(constraint.get("columns") or []) == 1
+    }
+    keys = {}
+    for dataset in datasets:
+        for table in dataset["tables"]:
+            by_name = {column["name"]: column for column in table["columns"]}
+            name = declared.get((dataset["name"], table["name"]))
+            if name is None:
+                name = next((column for column in by_name if column.lower() == "id"), None)
+            if name in by_name:
+                keys[(dataset["name"], table["name"])] = by_name[name]
+    return keys
+
+def infer_relationships(
+    datasets: Optional[List[Dict[str, Any]]],
+    declared: Optional[List[Dict[str, Any]]] = None,
+    constraints: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Declared foreign keys plus joins inferred from column names and types.
+
+    A column is taken to reference a table when it is named after the table
+    (``customer_id`` -> ``customers.id``) or has the same name as a table's
+    single-column key (``customer_id`` -> ``customers.customer_id``), and the
+    types are compatible. A table in the same dataset wins; otherwise the
+    match must be unique across datasets. Columns already covered by a
+    declared foreign key are not inferred again. Each relationship records
+    its ``source`` ("declared" or "inferred").
+    """
+    datasets = datasets or []
+    relationships = [{**relationship, "source": relationship.get("source", "declared")} for relationship in declared or []]
+    covered = {
+        (relationship["from_dataset"], relationship["from_table"], column)
+        for relationship in relationships
+        for column in relationship["from_columns"]
+    }
+
+    keys = _key_columns(datasets, constraints or [])
+    by_entity: Dict[str, List[Tuple[str, str]]] = {}
+    by_key_name: Dict[str, List[Tuple[str, str]]] = {}
+    for (dataset, table), key in keys.items():
+        for entity in _entity_names(table):
+            by_entity.setdefault(entity, []).append((dataset, table))
+        if key["name"].lower() != "id":
+            by_key_name.setdefault(key["name"].lower(), []).append((dataset, table))
+
+    for dataset in datasets:
+        for table in dataset["tables"]:
+            own_key = keys.get((dataset["name"], table["name"]))
+            for column in table["columns"]:
+                if (dataset["name"], table["name"], column["name"]) in covered:
+                    continue
+                if own_key is not None and own_key["name"] == column["name"]:
+                    continue
+                entity = _referenced_entity(column["name"])
+                candidates = by_key_name.get(column["name"].lower(), []) + \
+                    (by_entity.get(entity, []) if entity else [])
+                candidates = [
+                    target for target in dict.fromkeys(candidates)
+                    if target != (dataset["name"], table["name"])
+                    and _type_family(keys[target].get("type")) == _type_family(column.get("type"))
+                ]
+                local = [target for target in candidates if target[0] == dataset["name"]]
+                if len(local) == 1:
+                    target = local[0]
+                elif not local and len(candidates) == 1:
+                    target = candidates[0]
+                else:
+                    continue
+                relationships.append({
+                    "name": None,
+                    "from_dataset": dataset["name"],
+                    "from_table": table["name"],
+                    "from_columns": [column["name"]],
+                    "to_dataset": target[0],
+                    "to_table": target[1],
+                    "to_columns": [keys[target]["name"]],
+                    "source": "inferred"
+                })
+    return relationships
+
+def _node(dataset: str, table: str) -> str:
+    return f"{dataset}.{table}"
+
+class JoinGraph:
+    """Tables as nodes and relationships as undirected edges.
+
+    Breadth-first searches are cached per source table, so prompts that
+    select the same tables reuse them. At most ``JOIN_PATH_SOURCE_CACHE_SIZE``
+    sources are kept.
+    """
+
+    def __init__(self, relationships: Optional[List[Dict[str, Any]]]):
+        self.adjacency: Dict[str, List[Tuple[str, int]]] = {}
+        for index, relationship in enumerate(relationships or []):
+            source = _node(relationship["from_dataset"], relationship["from_table"])
+            target = _node(relationship["to_dataset"], relationship["to_table"])
+            if source == target:
+                continue
+            self.adjacency.setdefault(source, []).append((target, index))
+            self.adjacency.setdefault(target, []).append((source, index))
+        self._paths: "OrderedDict[str, Dict[str, List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def paths_from(self, start: str) -> Dict[str, List[int]]:
+        """Shortest path to every table within ``JOIN_PATH_MAX_LENGTH`` joins of ``start``."""
+        with self._lock:
+            found = self._paths.get(start)
+            if found is not None:
+                self._paths.move_to_end(start)
+                return found
+
+        found = {start: []}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if len(found[node]) >= settings.JOIN_PATH_MAX_LENGTH:
+                continue
+            for neighbor, index in self.adjacency.get(node, []):
+                if neighbor not in found:
+                    found[neighbor] = found[node] + [index]
+                    queue.append(neighbor)
+
+        with self._lock:
+            self._paths[start] = found
+            while len(self._paths) > settings.JOIN_PATH_SOURCE_CACHE_SIZE:
+                self._paths.popitem(last=False)
+        return found
+
+_graph_cache: "OrderedDict[Tuple[int, str], JoinGraph]" = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+def get_join_graph(connection_id: int, metadata: Any) -> JoinGraph:
+    """Get the join graph for a connection's current metadata, building it once per version."""
+    key = (connection_id, metadata_version(metadata))
+    with _graph_cache_lock:
+        graph = _graph_cache.get(key)
+        if graph is not None:
+            _graph_cache.move_to_end(key)
+            return graph
+
+    graph = JoinGraph(metadata.relationships)
+    with _graph_cache_lock:
+        _graph_cache[key] = graph
+        while len(_graph_cache) > settings.JOIN_PATH_CACHE_SIZE:
+            _graph_cache.popitem(last=False)
+    return graph
+
+def build_join_paths(
+    relationships: Optional[List[Dict[str, Any]]],
+    tables: List[str],
+    graph: Optional[JoinGraph] = None
+) -> Dict[str, Dict[str, List[int]]]:
+    """Shortest join path between each pair of ``tables`` ("dataset.table") that is connected.
+
+    Paths are found by breadth-first search from each of ``tables`` up to
+    ``JOIN_PATH_MAX_LENGTH`` joins, so they may pass through tables outside
+    the list, and are stored once per pair (under the lexically smaller
+    table) as lists of indexes into ``relationships``. At most
+    ``JOIN_PATH_MAX_PATHS`` paths are kept. Pass the cached ``graph`` for
+    ``relationships`` to reuse earlier searches.
+    """
+    graph = graph or JoinGraph(relationships)
+    wanted = set(tables)
+    paths: Dict[str, Dict[str, List[int]]] = {}
+    stored = 0
+    for start in sorted(wanted.intersection(graph.adjacency)):
+        for target, path in graph.paths_from(start).items():
+            if target > start and target in wanted:
+                if stored >= settings.JOIN_PATH_MAX_PATHS:
+                    logger.warning(f"Join path limit of {settings.JOIN_PATH_MAX_PATHS} reached; remaining paths skipped")
+                    return paths
+                paths.setdefault(start, {})[target] = path
+                stored += 1
+    return paths
+
+def _render_relationship(relationship: Dict[str, Any]) -> str:
+    source = _node(relationship["from_dataset"], relationship["from_table"])
+    target = _node(relationship["to_dataset"], relationship["to_table"])
+    return "  - " + " AND ".join(
+        f"{source}.{from_column} = {target}.{to_column}"
+        for from_column, to_column in zip(relationship["from_columns"], relationship["to_columns"])
+    )
+
+def select_join_paths(
+    relationships: Optional[List[Dict[str, Any]]],
+    tables: List[str],
+    token_budget: int,
+    graph: Optional[JoinGraph] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Render the joins connecting ``tables`` ("dataset.table"), within ``token_budget`` tokens.
+
+    Joins are taken from the shortest paths between each pair of tables, so
+    tables that are only connected through an intermediate table still get
+    a path. Shorter paths are added first. ``graph`` is passed on to
+    ``build_join_paths``.
+    """
+    if not relationships or len(tables) < 2:
+        return "", {"joins": 0, "tokens": 0}
+    join_paths = build_join_paths(relationships, tables, graph)
+
+    pair_paths = []
+    ordered = sorted(set(tables))
+    for position, start in enumerate(ordered):
+        targets = join_paths.get(start, {})
+        for target in ordered[position + 1:]:
+            path = targets.get(target)
+            if path:
+                pair_paths.append(path)
+    pair_paths.sort(key=len)
+
+    header = "\nTable Relationships (join conditions):\n"
+    used = count_tokens(header)
+    selected: List[int] = []
+    lines: Dict[int, str] = {}
+    for path in pair_paths:
+        new = [index for index in dict.fromkeys(path) if index not in lines]
+        new_lines = {index: _render_relationship(relationships[index]) for index in new}
+        # Each line is followed by a newline when joined
+        tokens = sum(count_tokens(line) + 1 for line in new_lines.values())
+        if used + tokens > token_budget:
+            continue
+        lines.update(new_lines)
+        selected.extend(new)
+        used += tokens
+    if not selected:
+        return "", {"joins": 0, "tokens": 0}
+    return header + "\n".join(lines[index] for index in sorted(selected)), {"joins": len(selected), "tokens": used}
@@ -0,0 +1,290 @@
+import base64
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.metadata_catalog import MetadataColumn, MetadataDataset, MetadataTable
+
+logger = logging.getLogger(__name__)
+
+def _column_rows(connection_id: int, table_id: int, columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "database_connection_id": connection_id,
+            "table_id": table_id,
+            "name": column["name"],
+            "position": position,
+            "type": column.get("type"),
+            "mode": column.get("mode"),
+            "description": column.get("description")
+        }
+        for position, column in enumerate(columns)
+    ]
+
+def sync_metadata_catalog(
+    db: Session,
+    connection_id: int,
+    datasets: Optional[List[Dict[str, Any]]],
+    table_fingerprints: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, int]:
+    """Bring the normalized catalog tables in line with a connection's metadata.
+
+    Only tables whose schema hash changed have their columns rewritten;
+    removed tables and datasets are deleted. Runs inside the caller's
+    transaction and does not commit.
+
+    The catalog is a derived copy for paging and search; the JSON columns on
+    ``database_metadata`` stay the source of truth. SQL generation, schema
+    retrieval and validation need every table of a version at once, so they
+    read the blob, once per version (see ``get_generation_metadata``).
+    """
+    from app.services.database import DatabaseService
+
+    table_fingerprints = table_fingerprints or {}
+    existing_datasets = {
+        dataset.name: dataset
+        for dataset in db.execute(
+            select(MetadataDataset).where(MetadataDataset.database_connection_id == connection_id)
+        ).scalars()
+    }
+    existing_tables = {
+        (table.dataset_name, table.name): table
+        for table in db.execute(
+            select(MetadataTable).where(MetadataTable.database_connection_id == connection_id)
+        ).scalars()
+    }
+
+    # Datasets first so new tables can reference them
+    dataset_rows: Dict[str, MetadataDataset] = {}
+    for position, dataset in enumerate(datasets or []):
+        row = existing_datasets.pop(dataset["name"], None)
+        if row is None:
+            row = MetadataDataset(database_connection_id=connection_id, name=dataset["name"])
+            db.add(row)
+        row.position = position
+        row.table_count = len(dataset["tables"])
+        dataset_rows[dataset["name"]] = row
+    db.flush()
+
+    changed: List[Tuple[MetadataTable, List[Dict[str, Any]]]] = []
+    unchanged = 0
+    for dataset in datasets or []:
+        dataset_row = dataset_rows[dataset["name"]]
+        for position, table in enumerate(dataset["tables"]):
+            key = (dataset["name"], table["name"])
+            fingerprint = table_fingerprints.get(f"{dataset['name']}.{table['name']}") or {}
+            schema_hash = fingerprint.get("schema_hash") or DatabaseService._schema_hash(table["columns"])
+            row = existing_tables.pop(key, None)
+            if row is None:
+                row = MetadataTable(
+                    database_connection_id=connection_id,
+                    dataset_name=dataset["name"],
+                    name=table["name"]
+                )
+                db.add(row)
+                changed.append((row, table["columns"]))
+            elif row.schema_hash == schema_hash:
+                unchanged += 1
+            else:
+                changed.append((row, table["columns"]))
+            row.dataset_id = dataset_row.id
+            row.position = position
+            row.schema_hash = schema_hash
+            row.column_count = len(table["columns"])
+
+    removed_table_ids = [row.id for row in existing_tables.values()]
+    removed_dataset_ids = [row.id for row in existing_datasets.values()]
+    db.flush()
+
+    # Columns are replaced wholesale for changed tables; IN lists are chunked
+    # to stay under bind parameter limits
+    stale_table_ids = [row.id for row, _ in changed] + removed_table_ids
+    for start in range(0, len(stale_table_ids), 500):
+        db.execute(delete(MetadataColumn).where(MetadataColumn.table_id.in_(stale_table_ids[start:start + 500])))
+    for start in range(0, len(removed_table_ids), 500):
+        db.execute(delete(MetadataTable).where(MetadataTable.id.in_(removed_table_ids[start:start + 500])))
+    if removed_dataset_ids:
+        db.execute(delete(MetadataDataset).where(MetadataDataset.id.in_(removed_dataset_ids)))
+
+    column_rows = [
+        row
+        for table_row, columns in changed
+        for row in _column_rows(connection_id, table_row.id, columns)
+    ]
+    if column_rows:
+        db.execute(insert(MetadataColumn), column_rows)
+
+    stats = {
+        "tables_written": len(changed),
+        "tables_unchanged": unchanged,
+        "tables_removed": len(removed_table_ids),
+        "columns_written": len(column_rows)
+    }
+    logger.debug(f"Synced metadata catalog for connection {connection_id}: {stats}")
+    return stats
+
+def delete_metadata_catalog(db: Session, connection_id: int) -> None:
+    """Remove a connection's catalog rows. Does not commit."""
+    db.execute(delete(MetadataColumn).where(MetadataColumn.database_connection_id == connection_id))
+    db.execute(delete(MetadataTable).where(MetadataTable.database_connection_id == connection_id))
+    db.execute(delete(MetadataDataset).where(MetadataDataset.database_connection_id == connection_id))
+
+async def get_catalog_table(
+    db: AsyncSession,
+    connection_id: int,
+    dataset_name: str,
+    table_name: str
+) -> Optional[Tuple[MetadataTable, List[MetadataColumn]]]:
+    """Look up one table and its columns by name."""
+    result = await db.execute(
+        select(MetadataTable).where(
+            MetadataTable.database_connection_id == connection_id,
+            MetadataTable.dataset_name == dataset_name,
+            MetadataTable.name == table_name
+        )
+    )
+    table = result.scalars().first()
+    if table is None:
+        return None
+    columns = await db.execute(
+        select(MetadataColumn).where(MetadataColumn.table_id == table.id).order_by(MetadataColumn.position)
+    )
+    return table, list(columns.scalars().all())
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor for the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: Optional[str], types: Tuple[type, ...]) -> Optional[List[Any]]:
+    """Decode a cursor from ``encode_cursor`` holding one value of each of ``types``.
+
+    Raises ``ValueError`` if it is malformed or has the wrong shape.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, expected in zip(values, types):
+        # bool is an int subclass but never a valid key
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+    return values
+
+def _prefix(column, prefix: str):
+    """Prefix match written as a range so it can use the B-tree index (case-sensitive)."""
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+def _page(rows: List[Any], limit: int, key) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra lookahead row and build the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+async def list_catalog_datasets(
+    db: AsyncSession,
+    connection_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None
+) -> Tuple[List[MetadataDataset], Optional[str]]:
+    """Page through a connection's datasets in listing order."""
+    query = select(MetadataDataset).where(MetadataDataset.database_connection_id == connection_id)
+    if search:
+        query = query.where(_prefix(MetadataDataset.name, search))
+    after = decode_cursor(cursor, (int, int))
+    if after:
+        query = query.where(tuple_(MetadataDataset.position, MetadataDataset.id) > tuple_(*after))
+    result = await db.execute(
+        query.order_by(MetadataDataset.position, MetadataDataset.id).limit(limit + 1)
+    )
+    return _page(list(result.scalars().all()), limit, lambda row: (row.position, row.id))
+
+async def list_catalog_tables(
+    db: AsyncSession,
+    connection_id: int,
+    dataset_name: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None
+) -> Tuple[List[MetadataTable], Optional[str]]:
+    """Page through the tables of one dataset in listing order."""
+    query = select(MetadataTable).where(
+        MetadataTable.database_connection_id == connection_id,
+        MetadataTable.dataset_name == dataset_name
+    )
+    if search:
+        query = query.where(_prefix(MetadataTable.name, search))
+    after = decode_cursor(cursor, (int, int))
+    if after:
+        query = query.where(tuple_(MetadataTable.position, MetadataTable.id) > tuple_(*after))
+    result = await db.execute(
+        query.order_by(MetadataTable.position, MetadataTable.id).limit(limit + 1)
+    )
+    return _page(list(result.scalars().all()), limit, lambda row: (row.position, row.id))
+
+async def get_catalog_columns(
+    db: AsyncSession,
+    table_ids: List[int]
+) -> Dict[int, List[MetadataColumn]]:
+    """Load the columns of several tables in one query, grouped by table id."""
+    columns: Dict[int, List[MetadataColumn]] = {table_id: [] for table_id in table_ids}
+    if not table_ids:
+        return columns
+    result = await db.execute(
+        select(MetadataColumn)
+        .where(MetadataColumn.table_id.in_(table_ids))
+        .order_by(MetadataColumn.table_id, MetadataColumn.position)
+    )
+    for column in result.scalars():
+        columns[column.table_id].append(column)
+    return columns
+
+async def search_catalog_tables(
+    db: AsyncSession,
+    connection_id: int,
+    prefix: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[MetadataTable], Optional[str]]:
+    """Find tables whose name starts with ``prefix``, across all datasets."""
+    query = select(MetadataTable).where(
+        MetadataTable.database_connection_id == connection_id,
+        _prefix(MetadataTable.name, prefix)
+    )
+    after = decode_cursor(cursor, (str, int))
+    if after:
+        query = query.where(tuple_(MetadataTable.name, MetadataTable.id) > tuple_(*after))
+    result = await db.execute(query.order_by(MetadataTable.name, MetadataTable.id).limit(limit + 1))
+    return _page(list(result.scalars().all()), limit, lambda row: (row.name, row.id))
+
+async def search_catalog_columns(
+    db: AsyncSession,
+    connection_id: int,
+    prefix: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Tuple[MetadataColumn, MetadataTable]], Optional[str]]:
+    """Find columns whose name starts with ``prefix``, with the table each belongs to."""
+    query = (
+        select(MetadataColumn, MetadataTable)
+        .join(MetadataTable, MetadataTable.id == MetadataColumn.table_id)
+        .where(
+            MetadataColumn.database_connection_id == connection_id,
+            _prefix(MetadataColumn.name, prefix)
+        )
+    )
+    after = decode_cursor(cursor, (str, int))
+    if after:
+        query = query.where(tuple_(MetadataColumn.name, MetadataColumn.id) > tuple_(*after))
+    result = await db.execute(query.order_by(MetadataColumn.name, MetadataColumn.id).limit(limit + 1))
+    rows = [tuple(row) for row in result.all()]
+    return _page(rows, limit, lambda row: (row[0].name, row[0].id))
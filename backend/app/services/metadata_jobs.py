@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.base_models import DatabaseConnection
+from app.models.metadata_job import MetadataExtractionJob
+from app.services.database import MetadataCrawlProgress, extract_database_metadata
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+async def get_metadata_job(
+    db: AsyncSession,
+    job_id: int,
+    connection_id: int
+) -> Optional[MetadataExtractionJob]:
+    """Get a metadata extraction job for a connection."""
+    result = await db.execute(
+        select(MetadataExtractionJob).where(
+            MetadataExtractionJob.id == job_id,
+            MetadataExtractionJob.database_connection_id == connection_id
+        )
+    )
+    return result.scalars().first()
+
+async def get_active_metadata_job(
+    db: AsyncSession,
+    connection_id: int
+) -> Optional[MetadataExtractionJob]:
+    """Get the pending or running extraction job for a connection, if any."""
+    result = await db.execute(
+        select(MetadataExtractionJob).where(
+            MetadataExtractionJob.database_connection_id == connection_id,
+            MetadataExtractionJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).order_by(MetadataExtractionJob.id.desc())
+    )
+    return result.scalars().first()
+
+class MetadataJobManager:
+    """Runs metadata extraction jobs on an in-process worker pool.
+
+    Job state and progress are persisted in the ``metadata_extraction_jobs``
+    table so they can be polled from any request. Only one job per connection
+    is active at a time, enforced by a partial unique index so it holds across
+    worker processes; submitting again while a job is pending or running
+    returns the existing job.
+
+    Each job records the process that owns it, and a background thread
+    refreshes the heartbeat of this process's active jobs. Active jobs whose
+    heartbeat is older than ``METADATA_JOB_STALE_SECONDS`` belong to a process
+    that has exited and are failed, by whichever process notices first.
+    """
+
+    def __init__(self, max_workers: int):
+        self._max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._submit_lock = asyncio.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix="metadata-job"
+            )
+        return self._executor
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        connection: DatabaseConnection,
+        user_id: int,
+        full_refresh: bool = False
+    ) -> MetadataExtractionJob:
+        """Queue an extraction job for a connection, reusing an active one."""
+        async with self._submit_lock:
+            job = await get_active_metadata_job(db, connection.id)
+            if job:
+                logger.info(f"Reusing active metadata job {job.id} for connection {connection.id}")
+                return job
+
+            job = MetadataExtractionJob(
+                database_connection_id=connection.id,
+                user_id=user_id,
+                status=JOB_PENDING,
+                full_refresh=full_refresh,
+                datasets_total=0,
+                datasets_done=0,
+                tables_done=0,
+                errors=[],
+                owner=self.owner,
+                heartbeat_at=datetime.utcnow()
+            )
+            db.add(job)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker process queued a job for the connection first
+                await db.rollback()
+                job = await get_active_metadata_job(db, connection.id)
+                if job is None:
+                    raise
+                logger.info(f"Reusing active metadata job {job.id} for connection {connection.id}")
+                return job
+            await db.refresh(job)
+            self._get_executor().submit(self._run, job.id)
+        logger.info(f"Queued metadata job {job.id} for connection {connection.id}")
+        return job
+
+    def _progress_writer(self, job_id: int) -> Callable[[MetadataCrawlProgress], None]:
+        """Build a progress callback that persists counters at most once per interval."""
+        write_lock = threading.Lock()
+        last_write = [0.0]
+
+        def write(progress: MetadataCrawlProgress) -> None:
+            now = time.time()
+            if now - last_write[0] < settings.METADATA_JOB_PROGRESS_INTERVAL:
+                return
+            # Crawler threads skip the update rather than wait on another write
+            if not write_lock.acquire(blocking=False):
+                return
+            try:
+                last_write[0] = now
+                db = SessionLocal()
+                try:
+                    db.query(MetadataExtractionJob).filter(
+                        MetadataExtractionJob.id == job_id
+                    ).update(progress.snapshot(), synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+            except Exception as e:
+                logger.warning(f"Could not record progress for metadata job {job_id}: {str(e)}")
+            finally:
+                write_lock.release()
+
+        return write
+
+    def _finish(
+        self,
+        db: Session,
+        job: MetadataExtractionJob,
+        status: str,
+        progress: MetadataCrawlProgress
+    ) -> None:
+        for key, value in progress.snapshot().items():
+            setattr(job, key, value)
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+    def _run(self, job_id: int) -> None:
+        """Execute a queued job on a worker thread."""
+        db = SessionLocal()
+        try:
+            job = db.get(MetadataExtractionJob, job_id)
+            if job.status != JOB_PENDING:
+                # Failed as stale while it waited for a worker thread
+                logger.warning(f"Skipping metadata job {job_id} with status {job.status}")
+                return
+            connection = db.get(DatabaseConnection, job.database_connection_id)
+            job.status = JOB_RUNNING
+            job.started_at = datetime.utcnow()
+            db.commit()
+            logger.info(f"Started metadata job {job_id} for connection {job.database_connection_id}")
+
+            progress = MetadataCrawlProgress(
+                on_update=self._progress_writer(job_id),
+                max_errors=settings.METADATA_JOB_MAX_ERRORS
+            )
+            try:
+                if connection is None:
+                    raise ValueError("Database connection not found")
+                metadata = extract_database_metadata(db, connection, job.full_refresh, progress)
+            except Exception as e:
+                logger.error(f"Metadata job {job_id} failed: {str(e)}", exc_info=True)
+                db.rollback()
+                progress.add_error(f"Error extracting metadata: {str(e)}")
+                self._finish(db, job, JOB_FAILED, progress)
+                return
+
+            job.database_metadata_id = metadata.id
+            self._finish(db, job, JOB_SUCCEEDED, progress)
+            logger.info(f"Metadata job {job_id} succeeded")
+        except Exception as e:
+            logger.error(f"Unexpected error running metadata job {job_id}: {str(e)}", exc_info=True)
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        """Fail stale jobs and start sending heartbeats for this process's jobs."""
+        self.recover_interrupted_jobs()
+        if self._heartbeat_thread is None:
+            self._stopped.clear()
+            self._heartbeat_thread = threading.Thread(
+                target=self._heartbeat_loop,
+                name="metadata-job-heartbeat",
+                daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(settings.METADATA_JOB_HEARTBEAT_INTERVAL):
+            self.heartbeat()
+            self.recover_interrupted_jobs()
+
+    def heartbeat(self) -> None:
+        """Mark the active jobs owned by this process as alive."""
+        db = SessionLocal()
+        try:
+            db.query(MetadataExtractionJob).filter(
+                MetadataExtractionJob.owner == self.owner,
+                MetadataExtractionJob.status.in_(ACTIVE_JOB_STATUSES)
+            ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Could not record metadata job heartbeat: {str(e)}")
+        finally:
+            db.close()
+
+    def recover_interrupted_jobs(self) -> None:
+        """Fail pending or running jobs whose owner stopped sending heartbeats."""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.METADATA_JOB_STALE_SECONDS)
+        db = SessionLocal()
+        try:
+            count = db.query(MetadataExtractionJob).filter(
+                MetadataExtractionJob.status.in_(ACTIVE_JOB_STATUSES),
+                or_(
+                    MetadataExtractionJob.heartbeat_at < cutoff,
+                    MetadataExtractionJob.heartbeat_at.is_(None) & (MetadataExtractionJob.created_at < cutoff)
+                )
+            ).update({
+                "status": JOB_FAILED,
+                "finished_at": datetime.utcnow(),
+                "errors": ["Job interrupted: the process running it stopped responding"]
+            }, synchronize_session=False)
+            db.commit()
+            if count:
+                logger.warning(f"Marked {count} interrupted metadata jobs as failed")
+        except Exception as e:
+            logger.error(f"Could not recover interrupted metadata jobs: {str(e)}")
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        """Stop heartbeats and the worker pool without waiting for running jobs."""
+        self._stopped.set()
+        self._heartbeat_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+metadata_job_manager = MetadataJobManager(settings.METADATA_JOB_WORKERS)
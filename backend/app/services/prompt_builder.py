@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import get_embeddings_client
+from app.services.schema_retrieval import BM25Index, tokenize
+from app.services.tokens import count_tokens
+from app.services.vector_index import vector_index_registry
+
+logger = logging.getLogger(__name__)
+
+def format_use_case(case: Dict[str, str]) -> str:
+    """Render one use case as a few-shot example."""
+    return (
+        f"- Question: {case['natural_language_example']}\n" +
+        f"  Query: {case['example_query']}"
+    )
+
+def format_use_cases(use_cases: Optional[List[Dict[str, str]]]) -> str:
+    """Render use cases as few-shot examples for the prompt."""
+    if not use_cases:
+        return ""
+    return "\nUse Cases:\n" + "\n".join(format_use_case(case) for case in use_cases)
+
+def use_cases_version(use_cases: List[Dict[str, str]]) -> str:
+    payload = json.dumps(use_cases, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def use_case_key(case: Dict[str, str]) -> str:
+    """Vector index key for a use case; examples with the same question share one vector."""
+    return hashlib.sha1(case["natural_language_example"].encode("utf-8")).hexdigest()[:16]
+
+class UseCaseIndex:
+    """BM25 index over a connection's use cases, with per-example token counts."""
+
+    def __init__(self, use_cases: List[Dict[str, str]]):
+        self.use_cases = use_cases
+        self.tokens = [count_tokens(format_use_case(case)) for case in use_cases]
+        # The question text matters most; the query adds table and column names
+        self.bm25 = BM25Index([
+            tokenize(case["natural_language_example"]) * 2 + tokenize(case["example_query"])
+            for case in use_cases
+        ])
+        self.embeddings: Optional[np.ndarray] = None
+        self._embeddings_lock = asyncio.Lock()
+
+    async def ensure_embeddings(self, connection_id: int) -> None:
+        """Load question vectors from the connection's vector index, embedding new use cases first.
+
+        The stored index follows the current set of use cases, so added,
+        edited and removed examples are applied without re-embedding the rest.
+        """
+        async with self._embeddings_lock:
+            if self.embeddings is not None or not self.use_cases:
+                return
+            store = vector_index_registry.get(connection_id, "use_cases")
+            keys = [use_case_key(case) for case in self.use_cases]
+            entries = {key: case["natural_language_example"] for key, case in zip(keys, self.use_cases)}
+            await asyncio.to_thread(store.sync, entries, get_embeddings_client().embed_documents)
+            self.embeddings = await asyncio.to_thread(store.vectors_for, keys)
+
+    def select(
+        self,
+        question: str,
+        top_k: int,
+        token_budget: int,
+        question_vector: Optional[np.ndarray] = None,
+        embedding_weight: float = 0.5
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """Pick up to ``top_k`` of the most relevant use cases that fit the token budget."""
+        scores = self.bm25.scores(tokenize(question))
+        if question_vector is not None and self.embeddings is not None:
+            lexical = scores / scores.max() if scores.max() > 0 else scores
+            scores = (1 - embedding_weight) * lexical + embedding_weight * (self.embeddings @ question_vector)
+        ranked = [int(index) for index in np.argsort(-scores, kind="stable") if scores[index] > 0]
+        if not ranked:
+            # Nothing matches; generic examples still show the expected style
+            ranked = list(range(len(self.use_cases)))
+
+        selected = []
+        used = 0
+        # Header line added by format_use_cases
+        header_tokens = count_tokens("\nUse Cases:\n")
+        for index in ranked:
+            if len(selected) >= top_k:
+                break
+            tokens = self.tokens[index] + 1  # Joining newline
+            if used + tokens + header_tokens > token_budget:
+                continue
+            selected.append(index)
+            used += tokens
+        # Keep the examples in their original order
+        selected.sort()
+        return [self.use_cases[index] for index in selected], used + header_tokens if selected else 0
+
+_index_cache: "OrderedDict[Tuple[int, str], UseCaseIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+async def get_use_case_index(connection_id: int, use_cases: List[Dict[str, str]]) -> UseCaseIndex:
+    """Get the use case index for a connection, building it once per version of its use cases."""
+    key = (connection_id, use_cases_version(use_cases))
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = await asyncio.to_thread(UseCaseIndex, use_cases)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > settings.USE_CASE_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    logger.info(f"Built use case index for connection {connection_id}: {len(use_cases)} use cases")
+    return index
+
+async def select_use_cases(
+    question: str,
+    connection_id: int,
+    use_cases: Optional[List[Dict[str, str]]],
+    token_budget: int
+) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """Choose the few-shot examples for a question within ``token_budget`` tokens."""
+    if not use_cases:
+        return [], {"use_cases_total": 0, "use_cases_selected": 0, "tokens": 0}
+    index = await get_use_case_index(connection_id, use_cases)
+    question_vector = None
+    if settings.USE_CASE_EMBEDDINGS_ENABLED:
+        try:
+            await index.ensure_embeddings(connection_id)
+            vector = np.asarray(await get_embeddings_client().aembed_query(question), dtype=np.float32)
+            question_vector = vector / (np.linalg.norm(vector) or 1.0)
+        except Exception as e:
+            logger.warning(f"Embedding retrieval unavailable for use cases, using lexical ranking only: {str(e)}")
+
+    selected, tokens = index.select(
+        question,
+        settings.USE_CASE_TOP_K,
+        token_budget,
+        question_vector=question_vector,
+        embedding_weight=settings.USE_CASE_EMBEDDING_WEIGHT
+    )
+    return selected, {
+        "use_cases_total": len(use_cases),
+        "use_cases_selected": len(selected),
+        "tokens": tokens
+    }
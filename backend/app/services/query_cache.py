@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import get_embeddings_client
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, str, str]  # (connection_id, version, normalized question)
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache key."""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?.! ")
+
+def schema_version(datasets: Optional[List[Dict[str, Any]]], relationships: Optional[List[Dict[str, Any]]]) -> str:
+    """Hash the schema content; stored as ``DatabaseMetadata.version`` when metadata is saved."""
+    payload = json.dumps(
+        {"datasets": datasets, "relationships": relationships},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def metadata_version(metadata: Any, use_cases: Optional[List[Dict[str, str]]] = None) -> str:
+    """Hash the schema and use cases a generated query depends on.
+
+    Uses the version stored with the metadata when available, so only the
+    (small) use case list is hashed per request.
+    """
+    version = getattr(metadata, "version", None) or schema_version(metadata.datasets, metadata.relationships)
+    if not use_cases:
+        return version
+    payload = json.dumps({"version": version, "use_cases": use_cases}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class _SimilarityIndex:
+    """Normalized question embeddings for one connection, searched by cosine similarity.
+
+    Rows live in a preallocated matrix that doubles when full; removing a
+    row moves the last row into its place, so updates do not copy the matrix.
+    """
+
+    def __init__(self):
+        self.keys: List[CacheKey] = []
+        self._rows: Dict[CacheKey, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, key: CacheKey, vector: np.ndarray) -> None:
+        row = self._rows.get(key)
+        if row is None:
+            if self._matrix is None:
+                self._matrix = np.zeros((16, vector.shape[0]), dtype=np.float32)
+            elif len(self.keys) == self._matrix.shape[0]:
+                grown = np.zeros((2 * self._matrix.shape[0], self._matrix.shape[1]), dtype=np.float32)
+                grown[:len(self.keys)] = self._matrix
+                self._matrix = grown
+            row = len(self.keys)
+            self.keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = vector
+
+    def remove(self, key: CacheKey) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self.keys[row] = self.keys[last]
+            self._rows[self.keys[row]] = row
+        self.keys.pop()
+
+    def search(self, vector: np.ndarray, version: str, threshold: float) -> Optional[CacheKey]:
+        if not self.keys:
+            return None
+        scores = self._matrix[:len(self.keys)] @ vector
+        for index in np.argsort(-scores):
+            if scores[index] < threshold:
+                break
+            if self.keys[index][1] == version:
+                return self.keys[index]
+        return None
+
+class SQLQueryCache:
+    """Two-layer in-process cache for generated SQL.
+
+    The exact layer is keyed on the normalized question plus a version hash of
+    the connection's metadata and use cases. The optional similarity layer
+    embeds questions and returns a cached answer for a question whose cosine
+    similarity is above ``SQL_CACHE_SIMILARITY_THRESHOLD`` under the same
+    version. Entries expire after ``SQL_CACHE_TTL_SECONDS`` and the least
+    recently used entries are evicted beyond ``SQL_CACHE_MAX_ENTRIES``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        similarity_enabled: bool = False,
+        similarity_threshold: float = 0.95
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_enabled = similarity_enabled
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._similarity: Dict[int, _SimilarityIndex] = {}
+        self._embedding_memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._embeddings = None
+        self._lock = threading.Lock()
+
+    def _get_embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = get_embeddings_client()
+        return self._embeddings
+
+    async def _embed(self, question: str) -> np.ndarray:
+        """Embed a normalized question, memoizing recent results."""
+        with self._lock:
+            vector = self._embedding_memo.get(question)
+            if vector is not None:
+                self._embedding_memo.move_to_end(question)
+                return vector
+        vector = np.asarray(await self._get_embeddings().aembed_query(question), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            self._embedding_memo[question] = vector
+            while len(self._embedding_memo) > self.max_entries:
+                self._embedding_memo.popitem(last=False)
+        return vector
+
+    def _remove(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+        index = self._similarity.get(key[0])
+        if index is not None:
+            index.remove(key)
+
+    def _get_entry(self, key: CacheKey) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def get(self, connection_id: int, version: str, question: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Look up a cached result; returns ``(value, layer)`` where layer is "exact" or "similar"."""
+        normalized = normalize_question(question)
+        key = (connection_id, version, normalized)
+        with self._lock:
+            value = self._get_entry(key)
+        if value is not None:
+            return value, "exact"
+
+        if not self.similarity_enabled:
+            return None, None
+        try:
+            vector = await self._embed(normalized)
+        except Exception as e:
+            logger.warning(f"Could not embed question for cache lookup: {str(e)}")
+            return None, None
+        with self._lock:
+            index = self._similarity.get(connection_id)
+            similar_key = index.search(vector, version, self.similarity_threshold) if index else None
+            value = self._get_entry(similar_key) if similar_key else None
+        if value is not None:
+            return value, "similar"
+        return None, None
+
+    async def set(self, connection_id: int, version: str, question: str, value: Any) -> None:
+        """Store a generated result."""
+        normalized = normalize_question(question)
+        key = (connection_id, version, normalized)
+        vector = None
+        if self.similarity_enabled:
+            try:
+                vector = await self._embed(normalized)
+            except Exception as e:
+                logger.warning(f"Could not embed question for cache store: {str(e)}")
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._similarity.setdefault(connection_id, _SimilarityIndex()).add(key, vector)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_connection(self, connection_id: int) -> None:
+        """Drop every cached result for a connection."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == connection_id]:
+                self._entries.pop(key, None)
+            self._similarity.pop(connection_id, None)
+        logger.debug(f"Invalidated SQL cache for connection {connection_id}")
+
+sql_query_cache = SQLQueryCache(
+    max_entries=settings.SQL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SQL_CACHE_TTL_SECONDS,
+    similarity_enabled=settings.SQL_CACHE_SIMILARITY_ENABLED,
+    similarity_threshold=settings.SQL_CACHE_SIMILARITY_THRESHOLD
+)
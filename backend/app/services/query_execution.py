@@ -0,0 +1,227 @@
+import json
+import logging
+from concurrent.futures import TimeoutError as JobTimeoutError
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.models.base_models import DatabaseConnection
+from app.services.bigquery_clients import bigquery_client_registry
+from app.services.sql_validation import is_read_only
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # Arrow output needs pyarrow; NDJSON falls back to REST pages
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_ARROW = "arrow"
+
+MEDIA_TYPES = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream"
+}
+
+class QueryNotAllowed(ValueError):
+    """The SQL is not a read-only query."""
+
+class _ChunkSink:
+    """File-like object collecting what the Arrow IPC writer produces between batches."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+class QueryResult:
+    """A finished query job whose rows are streamed page by page.
+
+    Rows are read through the BigQuery Storage Read API when it is installed
+    (through the REST API otherwise) and never held in memory beyond the
+    current page. Streaming stops at ``max_rows`` rows or ``max_bytes``
+    response bytes, whichever comes first; stopping closes the download, so
+    the rest of the result is never fetched. ``on_close`` runs once, when
+    streaming ends or ``close()`` is called.
+    """
+
+    def __init__(
+        self,
+        job: Any,
+        rows: Any,
+        storage_client: Any,
+        max_rows: int,
+        max_bytes: int,
+        on_close: Optional[Callable[[], None]] = None
+    ):
+        self.job = job
+        self.rows = rows
+        self.storage_client = storage_client
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.total_rows = rows.total_rows or 0
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self._on_close = on_close
+
+    def close(self) -> None:
+        """Release what the result holds (the checked out client); safe to call twice."""
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def headers(self) -> Dict[str, str]:
+        """Job details known before streaming; fewer rows than X-Total-Rows means the result was cut off."""
+        return {
+            "X-Job-Id": str(self.job.job_id),
+            "X-Total-Rows": str(self.total_rows),
+            "X-Bytes-Processed": str(self.job.total_bytes_processed or 0),
+            "X-Row-Limit": str(self.max_rows),
+            "X-Byte-Limit": str(self.max_bytes)
+        }
+
+    def _batches(self) -> Iterator[Any]:
+        iterator = self.rows.to_arrow_iterable(
+            bqstorage_client=self.storage_client,
+            max_queue_size=settings.QUERY_EXECUTION_MAX_QUEUE_SIZE
+        )
+        try:
+            yield from iterator
+        finally:
+            # Stops the Storage Read API download threads when we stop early
+            iterator.close()
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        if pyarrow is not None:
+            for batch in self._batches():
+                yield from batch.to_pylist()
+        else:
+            for page in self.rows.pages:
+                for row in page:
+                    yield dict(row.items())
+
+    def ndjson(self) -> Iterator[bytes]:
+        """One JSON object per row."""
+        records = self._records()
+        try:
+            for record in records:
+                line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+                if self.bytes_sent + len(line) > self.max_bytes:
+                    break
+                self.rows_sent += 1
+                self.bytes_sent += len(line)
+                yield line
+                if self.rows_sent >= self.max_rows:
+                    break
+        finally:
+            records.close()
+            self.close()
+        self._log_finished()
+
+    def arrow(self) -> Iterator[bytes]:
+        """An Arrow IPC stream, one message per record batch."""
+        try:
+            yield from self._arrow()
+        finally:
+            self.close()
+
+    def _arrow(self) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        writer = None
+        for batch in self._batches():
+            keep = min(batch.num_rows, self.max_rows - self.rows_sent)
+            if batch.num_rows and batch.nbytes:
+                # Batches are trimmed by their average row size to stay under the byte limit
+                row_size = batch.nbytes / batch.num_rows
+                keep = min(keep, int((self.max_bytes - self.bytes_sent) / row_size))
+            if keep < batch.num_rows:
+                batch = batch.slice(0, max(keep, 0))
+            if writer is None:
+                writer = pyarrow.ipc.new_stream(sink, batch.schema)
+            if batch.num_rows:
+                writer.write_batch(batch)
+            data = sink.drain()
+            self.rows_sent += batch.num_rows
+            self.bytes_sent += len(data)
+            yield data
+            if keep <= 0 or self.rows_sent >= self.max_rows:
+                break
+        if writer is None:
+            # No batches at all: still send the schema so readers get the columns
+            schema = self.job.to_arrow(create_bqstorage_client=False, max_results=0).schema
+            writer = pyarrow.ipc.new_stream(sink, schema)
+        writer.close()
+        yield sink.drain()
+        self._log_finished()
+
+    def _log_finished(self) -> None:
+        logger.info(
+            f"Streamed {self.rows_sent} of {self.total_rows} rows ({self.bytes_sent} bytes) "
+            f"for job {self.job.job_id}"
+        )
+
+def execute_query(
+    connection: DatabaseConnection,
+    sql: str,
+    max_rows: int,
+    max_bytes: int
+) -> QueryResult:
+    """Run a query with the connection's cached client and wait for it to finish.
+
+    Only a single SELECT (or WITH ... SELECT) is run; anything else raises
+    ``QueryNotAllowed``. Blocking; rows are not fetched until the returned
+    result is streamed.
+    """
+    from google.cloud import bigquery
+
+    read_only = is_read_only(sql)
+    if read_only is False:
+        raise QueryNotAllowed("Only a single SELECT query can be executed")
+
+    # The client stays checked out until the rows have been streamed
+    checkout = ExitStack()
+    client = checkout.enter_context(bigquery_client_registry.checkout(connection))
+    try:
+        if read_only is None:
+            # sqlglot could not tell; a dry run reports the statement type without running it
+            dry_run = client.query(sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+            if dry_run.statement_type != "SELECT":
+                raise QueryNotAllowed(f"Only a single SELECT query can be executed, not {dry_run.statement_type}")
+        job_config = bigquery.QueryJobConfig(
+            maximum_bytes_billed=settings.QUERY_EXECUTION_MAX_BYTES_BILLED or None
+        )
+        job = client.query(sql, job_config=job_config)
+        try:
+            rows = job.result(page_size=settings.QUERY_EXECUTION_PAGE_SIZE, timeout=settings.QUERY_EXECUTION_TIMEOUT)
+        except JobTimeoutError:
+            job.cancel()
+            raise TimeoutError(f"Query did not finish within {settings.QUERY_EXECUTION_TIMEOUT:.0f} seconds")
+
+        storage_client: Optional[Any] = None
+        if pyarrow is not None:
+            storage_client = bigquery_client_registry.get_storage_client(connection)
+    except BaseException:
+        checkout.close()
+        raise
+    logger.info(
+        f"Query job {job.job_id} for connection {connection.id} finished: "
+        f"{rows.total_rows} rows, {job.total_bytes_processed} bytes processed"
+    )
+    return QueryResult(job, rows, storage_client, max_rows, max_bytes, on_close=checkout.close)
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import get_embeddings_client
+from app.services.query_cache import metadata_version
+from app.services.tokens import count_tokens
+from app.services.vector_index import vector_index_registry
+
+logger = logging.getLogger(__name__)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split identifiers and prose into lowercase terms (snake_case and camelCase aware)."""
+    if not text:
+        return []
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    terms = re.findall(r"[a-z0-9]+", text.lower())
+    # Light stemming so "orders" matches "order"
+    return [term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term for term in terms]
+
+class BM25Index:
+    """Okapi BM25 over tokenized documents, scored through an inverted index."""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.doc_lengths = np.array([len(doc) for doc in documents], dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if self.size else 0.0
+
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for doc_id, doc in enumerate(documents):
+            for term, freq in Counter(doc).items():
+                doc_ids, freqs = postings.setdefault(term, ([], []))
+                doc_ids.append(doc_id)
+                freqs.append(freq)
+        self.postings = {
+            term: (np.array(doc_ids, dtype=np.int64), np.array(freqs, dtype=np.float32))
+            for term, (doc_ids, freqs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.size - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for term, (doc_ids, _) in self.postings.items()
+        }
+
+    def scores(self, query: List[str]) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        for term in set(query):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, freqs = posting
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_ids] / (self.avg_length or 1.0))
+            scores[doc_ids] += self.idf[term] * freqs * (self.k1 + 1) / (freqs + norm)
+        return scores
+
+def render_table(table: Dict[str, Any], columns: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Render one table for the prompt."""
+    columns = table["columns"] if columns is None else columns
+    return (
+        f"  - {table['name']}\n" +
+        "    Columns: " + ", ".join(f"{col['name']} ({col['type']})" for col in columns)
+    )
+
+def render_schema(datasets: Optional[List[Dict[str, Any]]]) -> str:
+    """Render every dataset, table and column for the prompt."""
+    return "\n".join(
+        "\n".join([f"Dataset: {dataset['name']}\nTables:"] + [render_table(table) for table in dataset["tables"]])
+        for dataset in datasets or []
+    )
+
+def table_descriptor(dataset_name: str, table: Dict[str, Any]) -> str:
+    """Text embedded for a table: its qualified name and column names."""
+    columns = ", ".join(column["name"] for column in table["columns"])
+    return f"{dataset_name}.{table['name']}: {columns}"
+
+def index_table_embeddings(connection_id: int, datasets: Optional[List[Dict[str, Any]]]) -> Dict[str, int]:
+    """Bring a connection's stored table embeddings in line with its metadata.
+
+    Only tables whose descriptor changed are embedded; dropped tables are
+    removed. Blocking, so call it from a worker thread.
+    """
+    entries = {
+        f"{dataset['name']}.{table['name']}": table_descriptor(dataset["name"], table)
+        for dataset in datasets or []
+        for table in dataset["tables"]
+    }
+    store = vector_index_registry.get(connection_id, "tables")
+    return store.sync(entries, get_embeddings_client().embed_documents)
+
+class SchemaIndex:
+    """Lexical (and optionally embedding) index over the tables of one schema version."""
+
+    def __init__(self, datasets: List[Dict[str, Any]]):
+        self.tables: List[Dict[str, Any]] = []
+        documents = []
+        for dataset in datasets or []:
+            for table in dataset["tables"]:
+                block = render_table(table)
+                self.tables.append({
+                    "dataset": dataset["name"],
+                    "name": table["name"],
+                    "columns": table["columns"],
+                    "block": block,
+                    "tokens": count_tokens(block)
+                })
+                # Table names count twice so they outrank incidental column matches
+                terms = tokenize(dataset["name"]) + tokenize(table["name"]) * 2
+                for column in table["columns"]:
+                    terms += tokenize(column["name"]) + tokenize(column.get("description"))
+                documents.append(terms)
+        self.bm25 = BM25Index(documents)
+        self.total_tokens = sum(table["tokens"] for table in self.tables)
+        self.embeddings: Optional[np.ndarray] = None
+        self._embeddings_lock = asyncio.Lock()
+
+    async def ensure_embeddings(self, connection_id: int) -> None:
+        """Load this schema version's table vectors from the connection's vector index.
+
+        Tables the index does not have yet (or whose columns changed) are
+        embedded first; the rest come straight from the memory-mapped store.
+        """
+        async with self._embeddings_lock:
+            if self.embeddings is not None or not self.tables:
+                return
+            store = vector_index_registry.get(connection_id, "tables")
+            keys = [f"{table['dataset']}.{table['name']}" for table in self.tables]
+            entries = {
+                key: table_descriptor(table["dataset"], table)
+                for key, table in zip(keys, self.tables)
+            }
+            await asyncio.to_thread(store.sync, entries, get_embeddings_client().embed_documents)
+            self.embeddings = await asyncio.to_thread(store.vectors_for, keys)
+
+    def _prune_columns(self, table: Dict[str, Any], question_terms: set, max_columns: int) -> Tuple[str, int]:
+        """Keep at most ``max_columns`` columns, preferring ones the question mentions."""
+        columns = table["columns"]
+        if len(columns) <= max_columns:
+            return table["block"], table["tokens"]
+        matching = {
+            index for index, column in enumerate(columns)
+            if question_terms & set(tokenize(column["name"]))
+        }
+        keep = set(sorted(matching)[:max_columns])
+        for index in range(len(columns)):
+            if len(keep) >= max_columns:
+                break
+            keep.add(index)
+        block = render_table(table, [column for index, column in enumerate(columns) if index in keep])
+        return block, count_tokens(block)
+
+    def select(
+        self,
+        question: str,
+        token_budget: int,
+        top_k: int,
+        max_columns: int,
+        question_vector: Optional[np.ndarray] = None,
+        embedding_weight: float = 0.5
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Pick the most relevant tables that fit the token budget and render them."""
+        if self.total_tokens <= token_budget:
+            selected = [(index, table["block"], table["tokens"]) for index, table in enumerate(self.tables)]
+        else:
+            question_terms = tokenize(question)
+            scores = self.bm25.scores(question_terms)
+            if question_vector is not None and self.embeddings is not None:
+                lexical = scores / scores.max() if scores.max() > 0 else scores
+                scores = (1 - embedding_weight) * lexical + embedding_weight * (self.embeddings @ question_vector)
+            ranked = [int(index) for index in np.argsort(-scores, kind="stable")[:top_k] if scores[index] > 0]
+            if not ranked:
+                # No signal at all: keep tables in listing order up to the budget
+                ranked = list(range(min(top_k, len(self.tables))))
+
+            selected = []
+            used = 0
+            for index in ranked:
+                block, tokens = self._prune_columns(self.tables[index], set(question_terms), max_columns)
+                if selected and used + tokens > token_budget:
+                    continue
+                selected.append((index, block, tokens))
+                used += tokens
+            selected.sort()
+
+        # Group by dataset, in listing order
+        lines = []
+        current_dataset = None
+        for index, block, _ in selected:
+            dataset = self.tables[index]["dataset"]
+            if dataset != current_dataset:
+                lines.append(f"Dataset: {dataset}\nTables:")
+                current_dataset = dataset
+            lines.append(block)
+        stats = {
+            "tables_total": len(self.tables),
+            "tables_selected": len(selected),
+            "tokens_total": self.total_tokens,
+            "tokens_selected": sum(tokens for _, _, tokens in selected),
+            "selected_tables": [
+                f"{self.tables[index]['dataset']}.{self.tables[index]['name']}" for index, _, _ in selected
+            ]
+        }
+        return "\n".join(lines), stats
+
+_index_cache: "OrderedDict[Tuple[int, str], SchemaIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+async def get_schema_index(connection_id: int, metadata: Any) -> SchemaIndex:
+    """Get the schema index for a connection's current metadata, building it once per version."""
+    key = (connection_id, metadata_version(metadata))
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    # Building is O(columns); keep it off the event loop
+    index = await asyncio.to_thread(SchemaIndex, metadata.datasets)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > settings.SCHEMA_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    logger.info(
+        f"Built schema index for connection {connection_id}: "
+        f"{len(index.tables)} tables, {index.total_tokens} tokens"
+    )
+    return index
+
+async def select_schema(
+    question: str,
+    connection_id: int,
+    metadata: Any,
+    token_budget: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Render only the tables relevant to a question, within the schema token budget."""
+    token_budget = settings.SCHEMA_TOKEN_BUDGET if token_budget is None else token_budget
+    # The full schema block is rendered and counted when metadata is saved;
+    # when it already fits there is nothing to select.
+    if metadata.schema_text is not None and metadata.schema_token_count <= token_budget:
+        return metadata.schema_text, {
+            "tokens_total": metadata.schema_token_count,
+            "tokens_selected": metadata.schema_token_count
+        }
+
+    index = await get_schema_index(connection_id, metadata)
+    question_vector = None
+    if settings.SCHEMA_RETRIEVAL_EMBEDDINGS_ENABLED:
+        try:
+            await index.ensure_embeddings(connection_id)
+            vector = np.asarray(await get_embeddings_client().aembed_query(question), dtype=np.float32)
+            question_vector = vector / (np.linalg.norm(vector) or 1.0)
+        except Exception as e:
+            logger.warning(f"Embedding retrieval unavailable, using lexical ranking only: {str(e)}")
+
+    schema_text, stats = index.select(
+        question,
+        token_budget=token_budget,
+        top_k=settings.SCHEMA_RETRIEVAL_TOP_K,
+        max_columns=settings.SCHEMA_MAX_COLUMNS_PER_TABLE,
+        question_vector=question_vector,
+        embedding_weight=settings.SCHEMA_RETRIEVAL_EMBEDDING_WEIGHT
+    )
+    reduction = 1 - stats["tokens_selected"] / stats["tokens_total"] if stats["tokens_total"] else 0.0
+    logger.info(
+        f"Schema pruning for connection {connection_id}: "
+        f"{stats['tables_total']} -> {stats['tables_selected']} tables, "
+        f"{stats['tokens_total']} -> {stats['tokens_selected']} tokens ({reduction:.1%} reduction)"
+    )
+    return schema_text, stats
@@ -1,94 +1,389 @@
-from typing import Dict, Any, Optional, List
+import asyncio
+import logging
+import threading
+import time
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple
+import httpx
+import openai
 from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from app.core.config import settings
-from app.models.database_connection import DatabaseConnection
-from app.models.database_metadata import DatabaseMetadata
+from app.models.base_models import DatabaseConnection
+from app.services.cost_estimation import check_query_cost
+from app.services.database import GenerationMetadata
+from app.services.join_graph import get_join_graph, select_join_paths
+from app.services.query_cache import metadata_version, schema_version, sql_query_cache
+from app.services.prompt_builder import format_use_cases, select_use_cases
+from app.services.schema_retrieval import render_schema, select_schema
+from app.services.sql_validation import format_feedback, get_reference_index, sqlglot, validate_sql
+from app.services.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
 
 class SQLQuery(BaseModel):
     sql_query: str = Field(description="The generated SQL query")
     explanation: str = Field(description="Explanation of what the query does")
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Additional metadata about the query")
 
+# Everything that varies per request is a template variable, so the template
+# and chain are built once and shared by all requests.
+PROMPT_TEMPLATE = """You are a BigQuery SQL expert that converts natural language questions into SQL queries.
+
+Schema Information:
+{schema}
+{relationships}
+
+{use_cases}
+
+Question: {question}
+{feedback}
+Generate a BigQuery SQL query that answers this question. Follow these rules:
+1. Use appropriate JOIN clauses based on the table relationships
+2. Include clear column names (dataset.table.column) to avoid ambiguity
+3. Use appropriate WHERE clauses to filter data
+4. Use appropriate GROUP BY and aggregation functions when needed
+5. Use BigQuery-specific functions and syntax
+6. Ensure the query is optimized for BigQuery performance
+7. Use appropriate date/time functions for BigQuery
+8. Consider BigQuery's columnar storage model when writing queries
+
+{format_instructions}"""
+
 class SQLGenerationService:
+    """Generates SQL with a long-lived LLM client and chain.
+
+    Create one instance per process (see ``get_sql_generation_service``) so
+    that the OpenAI HTTP connection pool, output parser and prompt chain are
+    reused across requests.
+    """
+
     def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+            ),
+            timeout=settings.OPENAI_REQUEST_TIMEOUT
+        )
+        async_client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            timeout=settings.OPENAI_REQUEST_TIMEOUT,
+            http_client=self.http_client
+        )
         self.llm = ChatOpenAI(
             api_key=settings.OPENAI_API_KEY,
-            model="gpt-4",
-            temperature=0
+            model=settings.OPENAI_MODEL,
+            temperature=0,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            request_timeout=settings.OPENAI_REQUEST_TIMEOUT,
+            async_client=async_client.chat.completions
         )
         self.output_parser = PydanticOutputParser(pydantic_object=SQLQuery)
+        self.prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE).partial(
+            format_instructions=self.output_parser.get_format_instructions()
+        )
+        self.chain = self.prompt | self.llm | self.output_parser
+        # Tokens in the fixed instructions, counted once for prompt budgeting
+        self.template_tokens = count_tokens(self.prompt.format(schema="", relationships="", use_cases="", question="", feedback=""))
+        # Streaming yields raw message chunks; the output is parsed once complete
+        self.stream_chain = self.prompt | self.llm
 
-    def _create_prompt(
+    async def _create_prompt_inputs(
         self,
         question: str,
-        metadata: DatabaseMetadata,
+        metadata: GenerationMetadata,
         connection: DatabaseConnection,
         use_cases: Optional[List[Dict[str, str]]] = None
-    ) -> str:
-        # Create a comprehensive prompt that includes:
-        # 1. Database schema and relationships
-        # 2. Use cases and examples if available
-        # 3. The user's question
-        # 4. Instructions for the model
-        
-        # Format datasets and tables information
-        datasets_info = "\n".join([
-            f"Dataset: {dataset['name']}\n" +
-            "Tables:\n" + "\n".join([
-                f"  - {table['name']}\n" +
-                f"    Columns: {', '.join([f'{col['name']} ({col['type']})' for col in table['columns']])}"
-                for table in dataset['tables']
-            ])
-            for dataset in metadata.datasets
-        ])
-        
-        use_cases_info = ""
-        if use_cases:
-            use_cases_info = "\nUse Cases:\n" + "\n".join([
-                f"- Question: {case['natural_language_example']}\n" +
-                f"  Query: {case['example_query']}"
-                for case in use_cases
-            ])
-
-        prompt_template = f"""You are a BigQuery SQL expert that converts natural language questions into SQL queries.
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Build the chain inputs and metadata describing what went into the prompt.
 
-Schema Information:
-{datasets_info}
+        The prompt is fitted into ``PROMPT_TOKEN_BUDGET``: the most relevant
+        use cases take up to ``USE_CASE_TOKEN_BUDGET``, join conditions between
+        the selected tables up to ``JOIN_PATH_TOKEN_BUDGET`` and the schema gets
+        the rest, capped at ``SCHEMA_TOKEN_BUDGET``.
+        """
+        # The prompt includes:
+        # 1. Database schema (only the tables relevant to the question)
+        # 2. Join conditions between those tables, along the shortest join paths
+        # 3. The use cases most similar to the question, as examples
+        # 4. The user's question
+        # 5. Instructions for the model (in the shared template)
+        prompt_metadata: Dict[str, Any] = {}
+        remaining = settings.PROMPT_TOKEN_BUDGET - self.template_tokens - count_tokens(question)
 
-{use_cases_info}
+        examples, prompt_metadata["use_cases"] = await select_use_cases(
+            question,
+            connection.id,
+            use_cases,
+            min(settings.USE_CASE_TOKEN_BUDGET, max(remaining, 0))
+        )
+        use_cases_text = format_use_cases(examples)
+        remaining -= prompt_metadata["use_cases"]["tokens"]
+        # Held back for the joins, which depend on the tables the schema selects
+        join_budget = min(settings.JOIN_PATH_TOKEN_BUDGET, max(remaining, 0)) if metadata.relationships else 0
+        remaining -= join_budget
 
-Question: {question}
+        if settings.SCHEMA_RETRIEVAL_ENABLED:
+            schema, prompt_metadata["schema"] = await select_schema(
+                question,
+                connection.id,
+                metadata,
+                min(settings.SCHEMA_TOKEN_BUDGET, max(remaining, 0))
+            )
+            schema_tokens = prompt_metadata["schema"]["tokens_selected"]
+        else:
+            schema = metadata.schema_text or render_schema(metadata.datasets)
+            schema_tokens = metadata.schema_token_count if metadata.schema_text else count_tokens(schema)
 
-Generate a BigQuery SQL query that answers this question. Follow these rules:
-1. Use appropriate JOIN clauses based on the table relationships
-2. Include clear column names (dataset.table.column) to avoid ambiguity
-3. Use appropriate WHERE clauses to filter data
-4. Use appropriate GROUP BY and aggregation functions when needed
-5. Use BigQuery-specific functions and syntax
-6. Ensure the query is optimized for BigQuery performance
-7. Use appropriate date/time functions for BigQuery
-8. Consider BigQuery's columnar storage model when writing queries
+        tables = (prompt_metadata.get("schema") or {}).get("selected_tables")
+        if tables is None:
+            # The whole schema is in the prompt
+            tables = [
+                f"{dataset['name']}.{table['name']}"
+                for dataset in metadata.datasets or []
+                for table in dataset["tables"]
+            ]
+        relationships, prompt_metadata["relationships"] = select_join_paths(
+            metadata.relationships,
+            tables,
+            join_budget,
+            get_join_graph(connection.id, metadata) if metadata.relationships else None
+        )
 
-{self.output_parser.get_format_instructions()}"""
+        inputs = {
+            "schema": schema,
+            "relationships": relationships,
+            "use_cases": use_cases_text,
+            "question": question,
+            "feedback": ""
+        }
+        prompt_tokens = (
+            self.template_tokens + count_tokens(question) +
+            prompt_metadata["use_cases"]["tokens"] + schema_tokens +
+            prompt_metadata["relationships"]["tokens"]
+        )
+        prompt_metadata["prompt"] = {
+            "tokens": prompt_tokens,
+            "budget": settings.PROMPT_TOKEN_BUDGET
+        }
+        logger.debug(
+            f"Prompt for connection {connection.id}: {prompt_tokens} tokens "
+            f"(schema {schema_tokens}, joins {prompt_metadata['relationships']['tokens']}, "
+            f"examples {prompt_metadata['use_cases']['tokens']})"
+        )
+        return inputs, prompt_metadata
 
-        return prompt_template
+    async def _validate(
+        self,
+        result: SQLQuery,
+        inputs: Dict[str, str],
+        metadata: GenerationMetadata,
+        connection: DatabaseConnection
+    ) -> SQLQuery:
+        """Check the generated SQL against the schema, re-prompting with the errors found.
+
+        Up to ``SQL_VALIDATION_MAX_RETRIES`` corrected queries are requested.
+        The outcome is reported in ``metadata["validation"]``; a query that is
+        still invalid after the retries is returned as is.
+        """
+        if not settings.SQL_VALIDATION_ENABLED or sqlglot is None:
+            return result
+        index = await get_reference_index(connection.id, metadata, connection.dataset)
+        errors = validate_sql(result.sql_query, index)
+        attempts = 1
+        while errors and attempts <= settings.SQL_VALIDATION_MAX_RETRIES:
+            logger.info(
+                f"Generated SQL for connection {connection.id} failed validation "
+                f"(attempt {attempts}): {'; '.join(errors)}"
+            )
+            result = await self.chain.ainvoke({**inputs, "feedback": format_feedback(result.sql_query, errors)})
+            errors = validate_sql(result.sql_query, index)
+            attempts += 1
+        result.metadata = {
+            **(result.metadata or {}),
+            "validation": {"valid": not errors, "attempts": attempts, "errors": errors}
+        }
+        return result
+
+    async def _generate(
+        self,
+        question: str,
+        metadata: GenerationMetadata,
+        connection: DatabaseConnection,
+        use_cases: Optional[List[Dict[str, str]]] = None
+    ) -> SQLQuery:
+        """Run the chain for a question without consulting the cache."""
+        inputs, prompt_metadata = await self._create_prompt_inputs(
+            question, metadata, connection, use_cases
+        )
+        result = await self.chain.ainvoke(inputs)
+        result = await self._validate(result, inputs, metadata, connection)
+        if prompt_metadata:
+            result.metadata = {**(result.metadata or {}), **prompt_metadata}
+        return result
+
+    async def _with_cost_estimate(
+        self,
+        result: SQLQuery,
+        metadata: GenerationMetadata,
+        connection: DatabaseConnection
+    ) -> SQLQuery:
+        """Attach the dry-run estimate as ``metadata["cost"]`` when dry runs are enabled.
+
+        Raises ``QueryCostExceededError`` for over-budget queries when
+        ``SQL_DRY_RUN_REJECT_OVER_BUDGET`` is set.
+        """
+        if not settings.SQL_DRY_RUN_ENABLED:
+            return result
+        version = metadata.version or schema_version(metadata.datasets, metadata.relationships)
+        cost = await check_query_cost(connection, result.sql_query, version)
+        # Copy, so cached results are not modified
+        return result.model_copy(update={"metadata": {**(result.metadata or {}), "cost": cost}})
 
     async def generate_sql(
         self,
         question: str,
-        metadata: DatabaseMetadata,
+        metadata: GenerationMetadata,
         connection: DatabaseConnection,
         use_cases: Optional[List[Dict[str, str]]] = None
     ) -> SQLQuery:
-        """Generate SQL query from natural language question."""
-        prompt = ChatPromptTemplate.from_template(self._create_prompt(
+        """Generate SQL query from natural language question.
+
+        Results are cached per connection, keyed on the question and a version
+        hash of the metadata and use cases; cache hits are marked in
+        ``metadata["cache"]``. With dry runs enabled the estimated bytes
+        scanned and cost are added as ``metadata["cost"]``.
+        """
+        if not settings.SQL_CACHE_ENABLED:
+            result = await self._generate(question, metadata, connection, use_cases)
+            return await self._with_cost_estimate(result, metadata, connection)
+
+        version = metadata_version(metadata, use_cases)
+        cached, layer = await sql_query_cache.get(connection.id, version, question)
+        if cached is not None:
+            result = cached.model_copy(update={"metadata": {**(cached.metadata or {}), "cache": layer}})
+            return await self._with_cost_estimate(result, metadata, connection)
+
+        result = await self._generate(question, metadata, connection, use_cases)
+        await sql_query_cache.set(connection.id, version, question, result)
+        return await self._with_cost_estimate(result, metadata, connection)
+
+    async def stream_sql(
+        self,
+        question: str,
+        metadata: GenerationMetadata,
+        connection: DatabaseConnection,
+        use_cases: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Generate SQL, yielding ``("token", text)`` as the completion arrives.
+
+        Ends with a single ``("result", SQLQuery)`` once the full output has
+        been parsed. Cache hits yield only the result.
+        """
+        version = None
+        if settings.SQL_CACHE_ENABLED:
+            version = metadata_version(metadata, use_cases)
+            cached, layer = await sql_query_cache.get(connection.id, version, question)
+            if cached is not None:
+                result = cached.model_copy(update={"metadata": {**(cached.metadata or {}), "cache": layer}})
+                yield "result", await self._with_cost_estimate(result, metadata, connection)
+                return
+
+        inputs, prompt_metadata = await self._create_prompt_inputs(
             question, metadata, connection, use_cases
-        ))
-        
-        chain = prompt | self.llm | self.output_parser
-        result = await chain.ainvoke({"input": question})
-        
-        return result 
\ No newline at end of file
+        )
+        parts = []
+        async for chunk in self.stream_chain.astream(inputs):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", chunk.content
+
+        result = self.output_parser.parse("".join(parts))
+        # Corrections after a failed validation are not streamed
+        result = await self._validate(result, inputs, metadata, connection)
+        if prompt_metadata:
+            result.metadata = {**(result.metadata or {}), **prompt_metadata}
+        if version is not None:
+            await sql_query_cache.set(connection.id, version, question, result)
+        yield "result", await self._with_cost_estimate(result, metadata, connection)
+
+    async def generate_sql_batch(
+        self,
+        questions: List[str],
+        metadata: GenerationMetadata,
+        connection: DatabaseConnection,
+        use_cases: Optional[List[Dict[str, str]]] = None,
+        concurrency: int = 8
+    ) -> AsyncIterator[Tuple[int, Optional[SQLQuery], Optional[str]]]:
+        """Generate SQL for many questions concurrently against one connection.
+
+        Yields ``(index, result, error)`` as each question finishes, in
+        completion order. At most ``concurrency`` generations are in flight.
+        When the API reports a rate limit (after the client's own retries),
+        every worker waits out a shared cool-down before retrying, so the
+        batch backs off as a whole instead of hammering the quota.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        resume_at = [0.0]
+
+        async def run(index: int, question: str) -> Tuple[int, Optional[SQLQuery], Optional[str]]:
+            async with semaphore:
+                for attempt in range(settings.SQL_BATCH_RATE_LIMIT_RETRIES + 1):
+                    delay = resume_at[0] - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    try:
+                        return index, await self.generate_sql(question, metadata, connection, use_cases), None
+                    except openai.RateLimitError as e:
+                        if attempt == settings.SQL_BATCH_RATE_LIMIT_RETRIES:
+                            return index, None, f"Rate limited: {str(e)}"
+                        backoff = settings.SQL_BATCH_RATE_LIMIT_BACKOFF * (2 ** attempt)
+                        retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+                        if retry_after:
+                            try:
+                                backoff = max(backoff, float(retry_after))
+                            except ValueError:
+                                pass
+                        resume_at[0] = max(resume_at[0], time.monotonic() + backoff)
+                        logger.warning(
+                            f"Rate limited generating SQL for connection {connection.id}, "
+                            f"backing off {backoff:.1f}s (attempt {attempt + 1})"
+                        )
+                    except Exception as e:
+                        return index, None, f"Error generating SQL query: {str(e)}"
+
+        tasks = [asyncio.create_task(run(index, question)) for index, question in enumerate(questions)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # Stop outstanding generations if the consumer goes away
+            for task in tasks:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self.http_client.aclose()
+
+_sql_generation_service: Optional[SQLGenerationService] = None
+_sql_generation_service_lock = threading.Lock()
+
+def get_sql_generation_service() -> SQLGenerationService:
+    """Get the process-wide SQL generation service, creating it on first use."""
+    global _sql_generation_service
+    if _sql_generation_service is None:
+        with _sql_generation_service_lock:
+            if _sql_generation_service is None:
+                _sql_generation_service = SQLGenerationService()
+    return _sql_generation_service
+
+async def close_sql_generation_service() -> None:
+    """Release the process-wide SQL generation service."""
+    global _sql_generation_service
+    if _sql_generation_service is not None:
+        await _sql_generation_service.aclose()
+        _sql_generation_service = None
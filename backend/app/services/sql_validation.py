@@ -0,0 +1,219 @@
+import asyncio
+import difflib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.query_cache import metadata_version
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import ParseError, SqlglotError
+    from sqlglot.optimizer.scope import Scope, traverse_scope
+except ImportError:  # Validation is skipped without sqlglot
+    sqlglot = None
+
+logger = logging.getLogger(__name__)
+
+# Columns BigQuery provides on partitioned and wildcard tables
+PSEUDO_COLUMNS = {"_partitiontime", "_partitiondate", "_table_suffix", "_file_name"}
+
+class SchemaReferenceIndex:
+    """Tables and column names of one schema version, for resolving SQL references.
+
+    Names are compared case-insensitively, as BigQuery does for columns.
+    """
+
+    def __init__(self, datasets: Optional[List[Dict[str, Any]]], default_dataset: Optional[str] = None):
+        self.default_dataset = default_dataset.lower() if default_dataset else None
+        self.columns: Dict[Tuple[str, str], Set[str]] = {}
+        self.by_name: Dict[str, List[Tuple[str, str]]] = {}
+        for dataset in datasets or []:
+            for table in dataset["tables"]:
+                key = (dataset["name"].lower(), table["name"].lower())
+                self.columns[key] = {column["name"].lower() for column in table["columns"]}
+                self.by_name.setdefault(key[1], []).append(key)
+
+    def resolve_table(self, dataset: str, name: str) -> Optional[Tuple[str, str]]:
+        """The metadata key for a table reference, or None if there is no such table."""
+        dataset, name = dataset.lower(), name.lower()
+        if dataset:
+            return (dataset, name) if (dataset, name) in self.columns else None
+        if self.default_dataset and (self.default_dataset, name) in self.columns:
+            return self.default_dataset, name
+        matches = self.by_name.get(name)
+        return matches[0] if matches else None
+
+    def similar_tables(self, name: str) -> List[str]:
+        names = difflib.get_close_matches(name.lower(), list(self.by_name), n=3)
+        return [f"{dataset}.{table}" for table in names for dataset, _ in self.by_name[table]][:3]
+
+    def similar_columns(self, key: Tuple[str, str], name: str) -> List[str]:
+        return difflib.get_close_matches(name.lower(), sorted(self.columns[key]), n=3)
+
+def _is_unindexed_table(table: "exp.Table") -> bool:
+    """Wildcard and INFORMATION_SCHEMA tables are not part of the crawled metadata."""
+    parts = [table.catalog, table.db, table.name]
+    return "*" in table.name or any("information_schema" in part.lower() for part in parts if part)
+
+def _source_columns(source: Any, index: SchemaReferenceIndex) -> Optional[Set[str]]:
+    """Column names a FROM source provides, or None when they cannot be known."""
+    if isinstance(source, exp.Table):
+        if _is_unindexed_table(source):
+            return None
+        key = index.resolve_table(source.db, source.name)
+        # Tables crawled without columns are not checked
+        return index.columns[key] or None if key else None
+    if isinstance(source, Scope) and isinstance(source.expression, exp.Select):
+        if source.expression.is_star:
+            return None
+        return {name.lower() for name in source.expression.named_selects}
+    return None
+
+def _own_columns(scope: "Scope") -> List["exp.Column"]:
+    """Columns whose nearest enclosing SELECT is the scope's own.
+
+    A scope's ``columns`` also include those of subqueries in its WHERE and
+    select list, which belong to (and are checked with) the subquery's scope.
+    """
+    if not isinstance(scope.expression, exp.Select):
+        return scope.columns
+    return [column for column in scope.columns if column.find_ancestor(exp.Select) is scope.expression]
+
+def _outer_sources(scope: "Scope") -> Dict[str, Any]:
+    """Sources of enclosing scopes, which correlated subqueries can reference."""
+    outer: Dict[str, Any] = {}
+    parent = scope.parent if scope.is_subquery else None
+    while parent is not None:
+        for alias, source in parent.sources.items():
+            outer.setdefault(alias.lower(), source)
+        parent = parent.parent
+    return outer
+
+def _check_scope(scope: "Scope", index: SchemaReferenceIndex, errors: List[str]) -> None:
+    for alias, source in scope.sources.items():
+        if isinstance(source, exp.Table) and not _is_unindexed_table(source):
+            if index.resolve_table(source.db, source.name) is None:
+                reference = ".".join(part for part in (source.db, source.name) if part)
+                message = f"Unknown table `{reference}`."
+                similar = index.similar_tables(source.name)
+                if similar:
+                    message += f" Did you mean: {', '.join(similar)}?"
+                errors.append(message)
+
+    # Local sources shadow those of enclosing scopes
+    sources = {**_outer_sources(scope), **{alias.lower(): source for alias, source in scope.sources.items()}}
+    # Select aliases can be referenced outside the select list (GROUP BY, ORDER BY)
+    aliases: Set[str] = set()
+    select_list = set()
+    if isinstance(scope.expression, exp.Select):
+        for projection in scope.expression.expressions:
+            if isinstance(projection, exp.Alias):
+                aliases.add(projection.alias.lower())
+            select_list.update(id(column) for column in projection.find_all(exp.Column))
+    for column in _own_columns(scope):
+        parts = [part.name.lower() for part in column.parts]
+        # The column follows the first part naming a source: alias.col,
+        # dataset.table.col, alias.struct_col.field
+        qualifier = next((i for i, part in enumerate(parts[:-1]) if part in sources), None)
+        if qualifier is not None:
+            source = sources[parts[qualifier]]
+            name = parts[qualifier + 1]
+            known = _source_columns(source, index)
+            if known is None or name in known or name in PSEUDO_COLUMNS:
+                continue
+            if isinstance(source, exp.Table):
+                key = index.resolve_table(source.db, source.name)
+                message = f"Column `{name}` does not exist in table `{key[0]}.{key[1]}`."
+                similar = index.similar_columns(key, name)
+                if similar:
+                    message += f" Did you mean: {', '.join(similar)}?"
+            else:
+                message = f"Column `{name}` is not selected by `{parts[qualifier]}`."
+            errors.append(message)
+        elif len(parts) == 1:
+            name = parts[0]
+            if name in PSEUDO_COLUMNS or (name in aliases and id(column) not in select_list):
+                continue
+            provided = [_source_columns(source, index) for source in sources.values()]
+            if not provided or any(known is None or name in known for known in provided):
+                continue
+            errors.append(f"Column `{name}` does not exist in any table of the query.")
+        # Other qualifiers (UNNEST aliases, struct fields of unqualified columns) are not checked
+
+def validate_sql(sql: str, index: SchemaReferenceIndex) -> List[str]:
+    """Parse SQL in the BigQuery dialect and resolve its table and column references.
+
+    Returns the problems found, as messages written to be fed back to the
+    model; an empty list means the query is valid as far as the schema goes.
+    """
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="bigquery") if statement is not None]
+    except SqlglotError as e:
+        # Lexer failures (TokenError) carry no structured error details
+        details = e.errors[0] if isinstance(e, ParseError) and e.errors else {}
+        location = f" (line {details['line']}, column {details['col']})" if details.get("line") else ""
+        return [f"Syntax error{location}: {details.get('description') or str(e)}"]
+    if not statements:
+        return ["The query is empty."]
+
+    errors: List[str] = []
+    for statement in statements:
+        try:
+            for scope in traverse_scope(statement):
+                _check_scope(scope, index, errors)
+        except Exception as e:
+            # Constructs sqlglot cannot scope are left to BigQuery
+            logger.debug(f"Could not resolve references in generated SQL: {str(e)}")
+    # Keep the first occurrence of each message
+    return list(dict.fromkeys(errors))
+
+def is_read_only(sql: str) -> Optional[bool]:
+    """Whether SQL is a single query (SELECT, WITH ... SELECT or a set operation).
+
+    Returns None when sqlglot is unavailable or cannot parse the SQL, so the
+    caller can ask BigQuery instead.
+    """
+    if sqlglot is None:
+        return None
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read="bigquery") if statement is not None]
+    except SqlglotError:
+        return None
+    # Scripts are rejected outright, even if every statement is a query
+    if len(statements) != 1:
+        return False
+    # Intersect and Except are Union subclasses
+    return isinstance(statements[0].unnest(), (exp.Select, exp.Union))
+
+_index_cache: "OrderedDict[Tuple[int, str], SchemaReferenceIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+async def get_reference_index(connection_id: int, metadata: Any, default_dataset: Optional[str]) -> SchemaReferenceIndex:
+    """Get the reference index for a connection's current metadata, building it once per version."""
+    key = (connection_id, metadata_version(metadata))
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = await asyncio.to_thread(SchemaReferenceIndex, metadata.datasets, default_dataset)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > settings.SQL_VALIDATION_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+def format_feedback(sql: str, errors: List[str]) -> str:
+    """Prompt section asking the model to fix a query that failed validation."""
+    return (
+        "A previous answer to this question used this query:\n" +
+        f"{sql}\n" +
+        "It failed validation against the schema:\n" +
+        "\n".join(f"- {error}" for error in errors) + "\n" +
+        "Write a corrected query that uses only the tables and columns listed in the schema."
+    )
@@ -0,0 +1,32 @@
+import logging
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """Load the tokenizer for the configured model once; None if unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating token counts from text length: {str(e)}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens for the configured model (about 4 characters per token without tiktoken)."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
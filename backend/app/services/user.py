@@ -1,8 +1,11 @@
 import logging
 from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.base_models import User
+from app.models.user import User
 from app.schemas.user import UserCreate
+from app.core.auth_cache import invalidate_user
 from app.core.security import get_password_hash, verify_password
 from datetime import datetime
 
@@ -47,6 +50,41 @@ def create_user(db: Session, user: UserCreate) -> User:
         logger.error(f"Error creating user: {str(e)}", exc_info=True)
         raise
 
+async def deactivate_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Deactivate a user; the commit drops them from the auth cache so existing tokens stop working."""
+    logger.debug(f"Deactivating user {user_id}")
+    result = await db.execute(select(User).where(User.id == user_id))
+    db_user = result.scalar_one_or_none()
+    if not db_user:
+        return None
+    db_user.is_active = False
+    db_user.updated_at = datetime.utcnow()
+    await db.commit()
+    await db.refresh(db_user)
+    logger.debug(f"User {user_id} deactivated")
+    return db_user
+
+# Users changed or deleted through any session are dropped from the auth cache
+# once the change commits; dropping them at flush time would let a concurrent
+# request re-cache the old row before the commit lands.
+_CHANGED_USERS = "changed_user_ids"
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    changed = session.info.setdefault(_CHANGED_USERS, set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            changed.add(instance.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     logger.debug(f"Attempting to authenticate user: {email}")
     user = get_user_by_email(db, email)
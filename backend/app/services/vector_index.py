@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EmbedFunction = Callable[[List[str]], List[List[float]]]
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+class VectorStore:
+    """Normalized float32 embeddings for one connection, stored on disk.
+
+    Vectors live in ``<name>.f32`` as a raw row-major matrix that is
+    memory-mapped for search; ``<name>.json`` holds the row keys and a hash
+    of the text each row was embedded from. ``sync`` embeds only new or
+    changed texts: changed rows are overwritten in place, new rows are
+    appended and removed rows are filled with the last row before the file
+    is truncated, so nothing is rebuilt from scratch.
+    """
+
+    def __init__(self, directory: str, name: str, model: str):
+        self.directory = directory
+        self.name = name
+        self.model = model
+        self.data_path = os.path.join(directory, f"{name}.f32")
+        self.meta_path = os.path.join(directory, f"{name}.json")
+        self.keys: List[str] = []
+        self.hashes: Dict[str, str] = {}
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _reset(self) -> None:
+        self.keys, self.hashes, self.dim, self._rows, self._matrix = [], {}, None, {}, None
+        for path in (self.data_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load(self) -> None:
+        """Read the key list and map the vectors, discarding files that do not agree."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.data_path):
+            return
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.keys, self.hashes, self.dim = meta["keys"], meta["hashes"], meta["dim"]
+            expected = len(self.keys) * (self.dim or 0) * 4
+            if meta.get("model") != self.model or os.path.getsize(self.data_path) != expected:
+                logger.warning(f"Discarding stale vector index {self.meta_path}")
+                self._reset()
+                return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable vector index {self.meta_path}: {str(e)}")
+            self._reset()
+            return
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._map()
+
+    def _map(self) -> None:
+        self._matrix = None
+        if self.keys:
+            self._matrix = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=(len(self.keys), self.dim))
+
+    def _save_meta(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self.meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"model": self.model, "dim": self.dim, "keys": self.keys, "hashes": self.hashes}, f)
+        os.replace(temp_path, self.meta_path)
+
+    def _remove_rows(self, keys: List[str]) -> None:
+        rows = sorted((self._rows[key] for key in keys), reverse=True)
+        if not rows:
+            return
+        matrix = np.memmap(self.data_path, dtype=np.float32, mode="r+", shape=(len(self.keys), self.dim))
+        for row in rows:
+            last = len(self.keys) - 1
+            removed = self.keys[row]
+            if row != last:
+                matrix[row] = matrix[last]
+                self.keys[row] = self.keys[last]
+                self._rows[self.keys[row]] = row
+            self.keys.pop()
+            del self._rows[removed]
+            self.hashes.pop(removed, None)
+        matrix.flush()
+        del matrix
+        os.truncate(self.data_path, len(self.keys) * self.dim * 4)
+
+    def _write_rows(self, keys: List[str], vectors: np.ndarray, hashes: List[str]) -> None:
+        existing = [(index, self._rows[key]) for index, key in enumerate(keys) if key in self._rows]
+        if existing:
+            matrix = np.memmap(self.data_path, dtype=np.float32, mode="r+", shape=(len(self.keys), self.dim))
+            for index, row in existing:
+                matrix[row] = vectors[index]
+            matrix.flush()
+            del matrix
+        new = [index for index, key in enumerate(keys) if key not in self._rows]
+        if new:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.data_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[new], dtype=np.float32).tobytes())
+            for index in new:
+                self._rows[keys[index]] = len(self.keys)
+                self.keys.append(keys[index])
+        for key, text_hash in zip(keys, hashes):
+            self.hashes[key] = text_hash
+
+    @staticmethod
+    def _embed(texts: List[str], embed: EmbedFunction) -> Optional[np.ndarray]:
+        """Embed texts in batches of ``VECTOR_INDEX_EMBED_BATCH_SIZE`` as normalized rows."""
+        if not texts:
+            return None
+        vectors = []
+        batch_size = max(1, settings.VECTOR_INDEX_EMBED_BATCH_SIZE)
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(embed(texts[start:start + batch_size]))
+        return _normalize(np.asarray(vectors, dtype=np.float32))
+
+    def sync(self, entries: Dict[str, str], embed: EmbedFunction) -> Dict[str, int]:
+        """Make the store hold exactly ``entries`` (key -> text), embedding only what changed."""
+        with self._lock:
+            self._load()
+            hashes = {key: _text_hash(text) for key, text in entries.items()}
+            removed = [key for key in self.keys if key not in entries]
+            changed = [key for key, text_hash in hashes.items() if self.hashes.get(key) != text_hash]
+
+            matrix = self._embed([entries[key] for key in changed], embed)
+            if matrix is not None and self.dim is not None and matrix.shape[1] != self.dim:
+                # Embedding size changed; the old vectors cannot be compared with the new ones,
+                # so start over and embed the entries that were unchanged as well
+                logger.warning(f"Embedding dimension changed for {self.meta_path}, rebuilding")
+                self._reset()
+                removed = []
+                embedded = set(changed)
+                unchanged = [key for key in entries if key not in embedded]
+                if unchanged:
+                    matrix = np.vstack([matrix, self._embed([entries[key] for key in unchanged], embed)])
+                    changed = changed + unchanged
+
+            if removed or changed:
+                self._matrix = None  # Release the read-only map before writing
+                self._remove_rows(removed)
+                if matrix is not None:
+                    self.dim = self.dim or matrix.shape[1]
+                    self._write_rows(changed, matrix, [hashes[key] for key in changed])
+                self._save_meta()
+                self._map()
+            return {"embedded": len(changed), "removed": len(removed), "total": len(self.keys)}
+
+    def vectors_for(self, keys: List[str]) -> Optional[np.ndarray]:
+        """Vectors for ``keys`` in order (zero rows for unknown keys); None if the store is empty."""
+        with self._lock:
+            self._load()
+            if self._matrix is None:
+                return None
+            result = np.zeros((len(keys), self.dim), dtype=np.float32)
+            for index, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is not None:
+                    result[index] = self._matrix[row]
+            return result
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Top-``k`` keys by cosine similarity to a query vector."""
+        with self._lock:
+            self._load()
+            if self._matrix is None or k <= 0:
+                return []
+            query = query.astype(np.float32) / (np.linalg.norm(query) or 1.0)
+            scores = np.asarray(self._matrix @ query)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.keys[row], float(scores[row])) for row in top]
+
+class VectorIndexRegistry:
+    """Open vector stores, one per connection and index name (e.g. "tables", "use_cases")."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._stores: Dict[Tuple[int, str], VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def get(self, connection_id: int, name: str) -> VectorStore:
+        with self._lock:
+            store = self._stores.get((connection_id, name))
+            if store is None:
+                store = VectorStore(
+                    os.path.join(self.root, str(connection_id)),
+                    name,
+                    settings.OPENAI_EMBEDDING_MODEL
+                )
+                self._stores[(connection_id, name)] = store
+            return store
+
+    def drop_connection(self, connection_id: int) -> None:
+        """Forget and delete every index of a connection."""
+        with self._lock:
+            for key in [key for key in self._stores if key[0] == connection_id]:
+                del self._stores[key]
+        shutil.rmtree(os.path.join(self.root, str(connection_id)), ignore_errors=True)
+
+vector_index_registry = VectorIndexRegistry(settings.VECTOR_INDEX_DIR)
@@ -0,0 +1,95 @@
+"""Compare serialization time for a large metadata response.
+
+Builds a synthetic schema and times the default FastAPI path (response model
+validation, ``jsonable_encoder`` and ``json.dumps``) against the fast path
+used when ``FAST_JSON_RESPONSES`` is enabled.
+
+    python benchmark_json.py --datasets 100 --tables 100 --columns 12
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from fastapi.encoders import jsonable_encoder
+from app.core.responses import fast_json_response, orjson
+from app.schemas.database import DatabaseMetadataResponse
+
+def build_metadata(datasets: int, tables: int, columns: int) -> dict:
+    return {
+        "id": 1,
+        "database_connection_id": 1,
+        "datasets": [
+            {
+                "name": f"dataset_{d}",
+                "tables": [
+                    {
+                        "name": f"table_{t}",
+                        "columns": [
+                            {
+                                "name": f"column_{c}",
+                                "type": "STRING" if c % 3 else "INTEGER",
+                                "mode": "NULLABLE",
+                                "description": f"Column {c} of table {t} in dataset {d}"
+                            }
+                            for c in range(columns)
+                        ]
+                    }
+                    for t in range(tables)
+                ]
+            }
+            for d in range(datasets)
+        ],
+        "tables": None,
+        "relationships": [],
+        "constraints": []
+    }
+
+def default_path(content: dict) -> bytes:
+    # What FastAPI does for a response_model endpoint returning the model
+    model = DatabaseMetadataResponse(**content)
+    validated = DatabaseMetadataResponse.model_validate(model.model_dump())
+    return json.dumps(
+        jsonable_encoder(validated),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def fast_path(content: dict) -> bytes:
+    return fast_json_response(content).body
+
+def measure(fn, content: dict, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", type=int, default=100)
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = build_metadata(args.datasets, args.tables, args.columns)
+    total_columns = args.datasets * args.tables * args.columns
+    size = len(fast_path(content))
+    print(f"Synthetic schema: {args.datasets * args.tables} tables, {total_columns} columns, {size / 1e6:.1f} MB")
+    print(f"Fast path encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+
+    default_seconds = measure(default_path, content, args.repeat)
+    fast_seconds = measure(fast_path, content, args.repeat)
+    print(f"Default (validate + jsonable_encoder + json): {default_seconds * 1000:.0f} ms")
+    print(f"Fast path:                                    {fast_seconds * 1000:.0f} ms")
+    print(f"Speedup: {default_seconds / fast_seconds:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+# Register every model on Base.metadata before creating tables
+import app.models.user  # noqa: F401
+import app.services.database  # noqa: F401
+from app.core.auth_cache import CurrentUser
+from app.core.deps import get_current_user, get_db
+from app.db.base_class import Base
+from app.main import app as api
+from app.services import database
+
+@pytest.fixture
+def db_file(tmp_path):
+    """A fresh app database file with all tables created."""
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+@pytest.fixture
+def db(db_file) -> Session:
+    """Sync session on the test database."""
+    engine = create_engine(f"sqlite:///{db_file}")
+    session = Session(engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def run_async(db_file):
+    """Run ``fn(async_session)`` against the test database and return its result."""
+    def run(fn):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as session:
+                    return await fn(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+@pytest.fixture
+def api_user() -> CurrentUser:
+    return CurrentUser(id=1, email="ana@example.com", full_name="Ana", is_active=True, is_superuser=False)
+
+@pytest.fixture
+def api_client(db_file, api_user, monkeypatch):
+    """API client on the test database, authenticated as ``api_user``."""
+    async def test_db():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+        try:
+            async with AsyncSession(engine) as session:
+                yield session
+        finally:
+            await engine.dispose()
+
+    monkeypatch.setattr(database, "_index_table_embeddings", lambda db_metadata: None)
+    api.dependency_overrides[get_db] = test_db
+    api.dependency_overrides[get_current_user] = lambda: api_user
+    try:
+        yield TestClient(api)
+    finally:
+        api.dependency_overrides.clear()
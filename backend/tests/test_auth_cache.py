@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.core import auth_cache
+from app.core.deps import get_current_user
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services.user import deactivate_user
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth_cache._user_cache.clear()
+    yield
+    auth_cache._user_cache.clear()
+
+@pytest.fixture
+def user(db):
+    user = User(email="ana@example.com", full_name="Ana", hashed_password="x", is_active=True, is_superuser=False)
+    db.add(user)
+    db.commit()
+    return user
+
+def _authenticate(run_async, user_id):
+    token = create_access_token(subject=str(user_id))
+    return run_async(lambda session: get_current_user(db=session, token=token))
+
+def test_cached_user_is_served_without_a_lookup(db, run_async, user):
+    assert _authenticate(run_async, user.id).email == "ana@example.com"
+    # A bulk UPDATE bypasses the session hooks, so the snapshot stays until the TTL
+    db.execute(update(User).where(User.id == user.id).values(email="changed@example.com"))
+    db.commit()
+    assert _authenticate(run_async, user.id).email == "ana@example.com"
+
+def test_deactivated_user_is_rejected_within_the_ttl(run_async, user):
+    assert _authenticate(run_async, user.id).is_active
+
+    deactivated = run_async(lambda session: deactivate_user(session, user.id))
+
+    assert deactivated.is_active is False
+    assert auth_cache.get_cached_user(user.id) is None
+    with pytest.raises(HTTPException) as error:
+        _authenticate(run_async, user.id)
+    assert error.value.status_code == 400
+
+def test_deleted_user_is_rejected_within_the_ttl(db, run_async, user):
+    _authenticate(run_async, user.id)
+
+    db.delete(user)
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        _authenticate(run_async, user.id)
+    assert error.value.status_code == 401
+
+def test_rolled_back_changes_keep_the_cache(db, run_async, user):
+    _authenticate(run_async, user.id)
+
+    user.is_active = False
+    db.flush()
+    db.rollback()
+
+    assert auth_cache.get_cached_user(user.id) is not None
+
+def test_deactivating_an_unknown_user(run_async):
+    assert run_async(lambda session: deactivate_user(session, 404)) is None
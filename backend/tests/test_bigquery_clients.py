@@ -0,0 +1,78 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.bigquery_clients import BigQueryClientRegistry, _ClientEntry
+
+class StubClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class StubRegistry(BigQueryClientRegistry):
+    """Builds stub clients whose tokens never need a refresh."""
+
+    def __init__(self, max_clients=2, idle_seconds=60.0, build_delay=0.0):
+        super().__init__(max_clients, idle_seconds, refresh_margin=60.0)
+        self.build_delay = build_delay
+        self.builds = 0
+
+    def _build(self, connection, key_hash):
+        self.builds += 1
+        time.sleep(self.build_delay)
+        credentials = SimpleNamespace(
+            token="token",
+            expiry=datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+        )
+        return _ClientEntry(connection.id, StubClient(), credentials, None, key_hash)
+
+def _connection(connection_id, credentials="a"):
+    return SimpleNamespace(id=connection_id, project_id="proj", credentials_json={"key": credentials})
+
+def test_checked_out_clients_are_not_evicted():
+    registry = StubRegistry(max_clients=1, idle_seconds=0.0)
+    with registry.checkout(_connection(1)) as first:
+        # Over the limit and idle, but in use
+        with registry.checkout(_connection(2)) as second:
+            assert not first.closed and not second.closed
+        assert not first.closed
+    with registry.checkout(_connection(3)):
+        pass
+    assert first.closed and second.closed
+
+def test_idle_clients_are_closed_after_release():
+    registry = StubRegistry(idle_seconds=0.0)
+    with registry.checkout(_connection(1)) as client:
+        pass
+    with registry.checkout(_connection(2)):
+        assert client.closed
+
+def test_replaced_client_is_closed_by_its_last_holder():
+    registry = StubRegistry()
+    with registry.checkout(_connection(1, "old")) as old:
+        with registry.checkout(_connection(1, "new")) as new:
+            assert new is not old
+        assert not old.closed
+        registry.invalidate(1)
+        assert not old.closed
+        assert new.closed
+    assert old.closed
+
+def test_clients_are_built_outside_the_lock():
+    registry = StubRegistry(build_delay=0.2)
+    cached = registry._acquire(_connection(1))
+    registry._release(cached)
+
+    thread = threading.Thread(target=lambda: registry._release(registry._acquire(_connection(2))))
+    thread.start()
+    time.sleep(0.05)
+    # Connection 2 is being built; connection 1 is still served without waiting
+    start = time.monotonic()
+    with registry.checkout(_connection(1)) as client:
+        assert client is cached.client
+    assert time.monotonic() - start < 0.1
+    thread.join()
+    assert registry.builds == 2
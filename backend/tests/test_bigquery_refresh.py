@@ -0,0 +1,122 @@
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.database import DatabaseService
+from app.services.extractors.registry import get_extractor
+
+def _field(name):
+    return SimpleNamespace(name=name, field_type="STRING", mode="NULLABLE", description=None)
+
+class StubClient:
+    """A BigQuery client over ``{dataset: {table: (last_modified_ms, [column, ...])}}``."""
+
+    def __init__(self, project):
+        self.project = project
+        self.get_table_calls = []
+        self.queries = []
+
+    def _ref(self, dataset_id):
+        return SimpleNamespace(
+            project="proj",
+            dataset_id=dataset_id,
+            table=lambda table_id: (dataset_id, table_id)
+        )
+
+    def list_datasets(self):
+        return [SimpleNamespace(dataset_id=name, reference=self._ref(name)) for name in self.project]
+
+    def get_dataset(self, reference):
+        return SimpleNamespace(location="US")
+
+    def list_tables(self, reference):
+        return [SimpleNamespace(table_id=name) for name in self.project[reference.dataset_id]]
+
+    def get_table(self, ref):
+        self.get_table_calls.append(ref)
+        modified, columns = self.project[ref[0]][ref[1]]
+        return SimpleNamespace(
+            schema=[_field(column) for column in columns],
+            modified=datetime.fromtimestamp(modified / 1000, tz=timezone.utc)
+        )
+
+    def query(self, sql, job_config=None):
+        self.queries.append((sql, job_config))
+        if "__TABLES__" in sql:
+            dataset_id = sql.split("`")[1].split(".")[1]
+            rows = [
+                {"table_id": name, "last_modified_time": modified}
+                for name, (modified, _) in sorted(self.project[dataset_id].items())
+            ]
+        else:
+            params = {p.name: set(p.values) for p in job_config.query_parameters} if job_config else None
+            rows = [
+                {
+                    "table_schema": dataset_id, "table_name": table_id, "column_name": column,
+                    "data_type": "STRING", "is_nullable": "YES", "description": None
+                }
+                for dataset_id, tables in sorted(self.project.items())
+                for table_id, (_, columns) in sorted(tables.items())
+                for column in columns
+                if params is None
+                or dataset_id in params["datasets"]
+                or f"{dataset_id}.{table_id}" in params["tables"]
+            ]
+        return SimpleNamespace(result=lambda page_size=None: iter(rows))
+
+@pytest.fixture
+def client(monkeypatch):
+    client = StubClient({
+        "sales": {"orders": (1000, ["id", "total"]), "refunds": (1000, ["id"])},
+        "legacy": {"old": (1000, ["id"])},
+    })
+    monkeypatch.setattr(DatabaseService, "create_engine", staticmethod(lambda connection: nullcontext(client)))
+    return client
+
+def _connection(strategy):
+    return SimpleNamespace(id=1, connection_type="bigquery", project_id="proj", metadata_strategy=strategy)
+
+def _tables(metadata):
+    return {
+        f"{dataset['name']}.{table['name']}": [column["name"] for column in table["columns"]]
+        for dataset in metadata["datasets"]
+        for table in dataset["tables"]
+    }
+
+@pytest.mark.parametrize("strategy", ["api", "information_schema"])
+def test_refresh_fetches_only_changed_tables(client, strategy):
+    extractor = get_extractor(_connection(strategy))
+    previous = extractor.extract(_connection(strategy))
+    assert _tables(previous) == {"sales.orders": ["id", "total"], "sales.refunds": ["id"], "legacy.old": ["id"]}
+
+    client.project["sales"]["orders"] = (2000, ["id", "total", "currency"])
+    client.project["sales"]["returns"] = (2000, ["id"])
+    del client.project["sales"]["refunds"]
+    del client.project["legacy"]
+    client.get_table_calls.clear()
+    client.queries.clear()
+
+    refreshed = extractor.extract(_connection(strategy), previous)
+
+    assert _tables(refreshed) == {"sales.orders": ["id", "total", "currency"], "sales.returns": ["id"]}
+    assert set(refreshed["table_fingerprints"]) == {"sales.orders", "sales.returns"}
+    assert [dataset["name"] for dataset in refreshed["datasets"]] == ["sales"]
+    if strategy == "api":
+        assert sorted(client.get_table_calls) == [("sales", "orders"), ("sales", "returns")]
+    else:
+        assert client.get_table_calls == []
+        (_, job_config), = [query for query in client.queries if "COLUMNS" in query[0]]
+        params = {p.name: p.values for p in job_config.query_parameters}
+        assert params == {"datasets": [], "tables": ["sales.orders", "sales.returns"]}
+
+def test_refresh_without_changes_fetches_nothing(client):
+    extractor = get_extractor(_connection("api"))
+    previous = extractor.extract(_connection("api"))
+    client.get_table_calls.clear()
+
+    refreshed = extractor.extract(_connection("api"), previous)
+
+    assert client.get_table_calls == []
+    assert refreshed == previous
@@ -0,0 +1,87 @@
+import pytest
+
+from app.services.metadata_catalog import (
+    decode_cursor,
+    encode_cursor,
+    list_catalog_datasets,
+    list_catalog_tables,
+    search_catalog_columns,
+    search_catalog_tables,
+    sync_metadata_catalog
+)
+
+CONNECTION_ID = 1
+
+@pytest.fixture
+def catalog(db):
+    datasets = [
+        {
+            "name": f"ds{d}",
+            "tables": [
+                {"name": f"t{t:02d}", "columns": [{"name": "id"}, {"name": f"col_{t:02d}"}]}
+                for t in range(7)
+            ]
+        }
+        for d in range(3)
+    ]
+    sync_metadata_catalog(db, CONNECTION_ID, datasets)
+    db.commit()
+
+def _collect(run_async, fetch, key):
+    items, cursor = [], None
+    while True:
+        page, cursor = run_async(lambda session: fetch(session, cursor))
+        items.extend(key(item) for item in page)
+        if cursor is None:
+            return items
+
+def test_list_tables_pages_in_listing_order(catalog, run_async):
+    names = _collect(
+        run_async,
+        lambda session, cursor: list_catalog_tables(session, CONNECTION_ID, "ds1", 3, cursor),
+        lambda table: table.name
+    )
+    assert names == [f"t{t:02d}" for t in range(7)]
+
+def test_list_datasets_with_prefix_search(catalog, run_async):
+    datasets, cursor = run_async(lambda session: list_catalog_datasets(session, CONNECTION_ID, 10, search="ds2"))
+    assert [dataset.name for dataset in datasets] == ["ds2"]
+    assert cursor is None
+
+def test_search_tables_across_datasets(catalog, run_async):
+    tables = _collect(
+        run_async,
+        lambda session, cursor: search_catalog_tables(session, CONNECTION_ID, "t0", 2, cursor),
+        lambda table: (table.name, table.dataset_name)
+    )
+    assert len(tables) == 21
+    assert tables == sorted(tables, key=lambda item: item[0])
+
+def test_search_columns_by_prefix(catalog, run_async):
+    matches = _collect(
+        run_async,
+        lambda session, cursor: search_catalog_columns(session, CONNECTION_ID, "col_03", 2, cursor),
+        lambda row: (row[1].dataset_name, row[1].name, row[0].name)
+    )
+    assert sorted(matches) == [(f"ds{d}", "t03", "col_03") for d in range(3)]
+
+def test_decode_cursor_round_trip():
+    assert decode_cursor(encode_cursor("orders", 4), (str, int)) == ["orders", 4]
+    assert decode_cursor(None, (int, int)) is None
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(1),
+    encode_cursor(1, 2, 3),
+    encode_cursor({"a": 1}, 2),
+    encode_cursor("1", 2),
+    encode_cursor(True, 2),
+    encode_cursor([1], 2)
+])
+def test_decode_cursor_rejects_wrong_shape(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, (int, int))
+
+def test_list_tables_rejects_bad_cursor_before_querying(catalog, run_async):
+    with pytest.raises(ValueError):
+        run_async(lambda session: list_catalog_tables(session, CONNECTION_ID, "ds1", 3, encode_cursor(1)))
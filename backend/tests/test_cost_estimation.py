@@ -0,0 +1,91 @@
+import asyncio
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import cost_estimation
+from app.services.cost_estimation import CostEstimator, QueryCostExceededError, check_query_cost
+
+class StubClient:
+    """Stands in for a BigQuery client; dry runs report a fixed byte count."""
+
+    def __init__(self, total_bytes: int = 1000, error: Exception = None):
+        self.total_bytes = total_bytes
+        self.error = error
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        assert job_config.dry_run
+        self.queries.append(sql)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(total_bytes_processed=self.total_bytes)
+
+CONNECTION = SimpleNamespace(id=1)
+
+def _estimator(client, ttl_seconds=60.0, max_entries=100):
+    return CostEstimator(max_entries=max_entries, ttl_seconds=ttl_seconds, client_factory=lambda connection: nullcontext(client))
+
+def test_cache_hit_per_sql_and_version():
+    client = StubClient()
+    estimator = _estimator(client)
+
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1")) == (1000, False)
+    # Whitespace and a trailing semicolon do not change the cache key
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT   1;", "v1")) == (1000, True)
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v2")) == (1000, False)
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 2", "v1")) == (1000, False)
+    assert len(client.queries) == 3
+
+def test_cache_entries_expire(monkeypatch):
+    client = StubClient()
+    estimator = _estimator(client, ttl_seconds=10)
+    now = [100.0]
+    monkeypatch.setattr(cost_estimation.time, "monotonic", lambda: now[0])
+
+    asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1"))
+    now[0] += 5
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1"))[1] is True
+    now[0] += 10
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1"))[1] is False
+    assert len(client.queries) == 2
+
+def test_invalidate_connection_drops_entries():
+    client = StubClient()
+    estimator = _estimator(client)
+    asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1"))
+    estimator.invalidate_connection(CONNECTION.id)
+    assert asyncio.run(estimator.bytes_processed(CONNECTION, "SELECT 1", "v1"))[1] is False
+
+def test_estimate_flags_over_budget(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_DRY_RUN_BYTE_BUDGET", 500)
+    estimate = asyncio.run(_estimator(StubClient(total_bytes=1000)).estimate(CONNECTION, "SELECT 1", "v1"))
+    assert estimate["over_budget"] is True
+    assert estimate["total_bytes_processed"] == 1000
+    assert estimate["byte_budget"] == 500
+
+    monkeypatch.setattr(settings, "SQL_DRY_RUN_BYTE_BUDGET", None)
+    estimate = asyncio.run(_estimator(StubClient(total_bytes=1000)).estimate(CONNECTION, "SELECT 1", "v1"))
+    assert estimate["over_budget"] is False
+
+def test_estimate_reports_dry_run_failures():
+    estimator = _estimator(StubClient(error=RuntimeError("Unrecognized name: foo")))
+    estimate = asyncio.run(estimator.estimate(CONNECTION, "SELECT foo", "v1"))
+    assert estimate["error"] == "Unrecognized name: foo"
+    assert "total_bytes_processed" not in estimate
+
+@pytest.mark.parametrize("reject", [False, True])
+def test_check_query_cost_rejects_over_budget_when_enabled(monkeypatch, reject):
+    monkeypatch.setattr(cost_estimation, "cost_estimator", _estimator(StubClient(total_bytes=1000)))
+    monkeypatch.setattr(settings, "SQL_DRY_RUN_BYTE_BUDGET", 500)
+    monkeypatch.setattr(settings, "SQL_DRY_RUN_REJECT_OVER_BUDGET", reject)
+
+    if reject:
+        with pytest.raises(QueryCostExceededError) as error:
+            asyncio.run(check_query_cost(CONNECTION, "SELECT 1", "v1"))
+        assert error.value.total_bytes_processed == 1000
+        assert error.value.byte_budget == 500
+    else:
+        assert asyncio.run(check_query_cost(CONNECTION, "SELECT 1", "v1"))["over_budget"] is True
@@ -0,0 +1,46 @@
+from sqlalchemy import update
+
+from app.models.base_models import DatabaseMetadata
+from app.services import database
+from app.services.database import get_generation_metadata
+
+def _save(db, connection_id, version, table):
+    db.add(DatabaseMetadata(
+        database_connection_id=connection_id,
+        datasets=[{"name": "sales", "tables": [{"name": table, "columns": []}]}],
+        relationships=[],
+        version=version,
+        schema_text=f"schema {version}",
+        schema_token_count=2
+    ))
+    db.commit()
+
+def test_json_columns_are_loaded_once_per_version(db, run_async, monkeypatch):
+    _save(db, 41, "v1", "orders")
+    loads = []
+    load = database.get_database_metadata
+
+    async def counting_load(session, connection_id):
+        loads.append(connection_id)
+        return await load(session, connection_id)
+
+    monkeypatch.setattr(database, "get_database_metadata", counting_load)
+
+    first = run_async(lambda session: get_generation_metadata(session, 41))
+    again = run_async(lambda session: get_generation_metadata(session, 41))
+    assert again is first
+    assert first.datasets[0]["tables"][0]["name"] == "orders"
+    assert loads == [41]
+
+    db.execute(update(DatabaseMetadata).values(
+        version="v2",
+        datasets=[{"name": "sales", "tables": [{"name": "refunds", "columns": []}]}]
+    ))
+    db.commit()
+    changed = run_async(lambda session: get_generation_metadata(session, 41))
+    assert changed.version == "v2"
+    assert changed.datasets[0]["tables"][0]["name"] == "refunds"
+    assert loads == [41, 41]
+
+def test_missing_metadata(run_async):
+    assert run_async(lambda session: get_generation_metadata(session, 404)) is None
@@ -0,0 +1,54 @@
+import pytest
+
+from app.models.base_models import DatabaseConnection, DatabaseMetadata
+from app.schemas.database import DatabaseMetadataUpdate
+from app.services.database import update_database_metadata
+
+@pytest.fixture
+def connection(db, api_user):
+    connection = DatabaseConnection(name="warehouse", connection_type="sqlite", user_id=api_user.id)
+    db.add(connection)
+    db.commit()
+    return connection
+
+def _get(client, path, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/api/v1/databases{path}", headers=headers)
+
+def test_connection_list_etag_follows_edits(api_client, api_user, db, connection):
+    first = _get(api_client, "/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert _get(api_client, "/", etag).status_code == 304
+
+    connection.name = "renamed"
+    db.commit()
+    changed = _get(api_client, "/", etag)
+    assert changed.status_code == 200
+    assert changed.json()[0]["name"] == "renamed"
+    assert changed.headers["etag"] != etag
+
+    db.delete(connection)
+    db.commit()
+    db.add(DatabaseConnection(name="other", connection_type="sqlite", user_id=api_user.id))
+    db.commit()
+    assert _get(api_client, "/", changed.headers["etag"]).status_code == 200
+
+def test_metadata_etag_covers_tables_and_constraints(api_client, db, connection):
+    metadata = DatabaseMetadata(database_connection_id=connection.id, datasets=[], relationships=[])
+    db.add(metadata)
+    db.commit()
+    update_database_metadata(db, metadata, DatabaseMetadataUpdate(tables=[{"name": "orders"}]))
+    path = f"/{connection.id}/metadata"
+
+    first = _get(api_client, path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert _get(api_client, path, etag).status_code == 304
+
+    # Datasets and relationships, and so the version, are unchanged
+    update_database_metadata(db, metadata, DatabaseMetadataUpdate(constraints=[{"table": "orders"}]))
+    changed = _get(api_client, path, etag)
+    assert changed.status_code == 200
+    assert changed.json()["constraints"] == [{"table": "orders"}]
+    assert changed.headers["etag"] != etag
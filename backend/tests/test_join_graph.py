@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.join_graph import build_join_paths, get_join_graph, infer_relationships, select_join_paths
+
+def _table(name, *columns):
+    return {"name": name, "columns": [{"name": column, "type": column_type} for column, column_type in columns]}
+
+DATASETS = [
+    {
+        "name": "sales",
+        "tables": [
+            _table("customers", ("id", "INT64"), ("name", "STRING")),
+            _table("orders", ("id", "INT64"), ("customer_id", "INT64"), ("store_id", "STRING")),
+            _table("order_items", ("id", "INT64"), ("order_id", "INT64"), ("product_id", "INT64")),
+            _table("dim_products", ("product_id", "INT64"), ("category_id", "INT64")),
+            _table("categories", ("id", "INT64"))
+        ]
+    },
+    {"name": "ops", "tables": [_table("stores", ("id", "INTEGER"))]}
+]
+
+CONSTRAINTS = [
+    {"type": "primary_key", "name": None, "dataset": "sales", "table": "dim_products", "columns": ["product_id"]}
+]
+
+def _edges(relationships):
+    return {
+        (r["from_table"], r["from_columns"][0], r["to_table"], r["to_columns"][0], r["source"])
+        for r in relationships
+    }
+
+def test_infer_relationships_from_names_keys_and_types():
+    edges = _edges(infer_relationships(DATASETS, constraints=CONSTRAINTS))
+    assert edges == {
+        ("orders", "customer_id", "customers", "id", "inferred"),
+        ("order_items", "order_id", "orders", "id", "inferred"),
+        # Same name as the table's declared single-column key
+        ("order_items", "product_id", "dim_products", "product_id", "inferred"),
+        ("dim_products", "category_id", "categories", "id", "inferred")
+        # orders.store_id is a STRING and stores.id an INTEGER, so no join is inferred
+    }
+
+def test_declared_relationships_are_kept_and_not_inferred_again():
+    declared = [{
+        "name": "fk_orders_customer",
+        "from_dataset": "sales", "from_table": "orders", "from_columns": ["customer_id"],
+        "to_dataset": "sales", "to_table": "customers", "to_columns": ["id"]
+    }]
+    relationships = infer_relationships(DATASETS, declared, CONSTRAINTS)
+    from_customer = [r for r in relationships if r["from_columns"] == ["customer_id"]]
+    assert len(from_customer) == 1
+    assert from_customer[0]["source"] == "declared"
+    assert from_customer[0]["name"] == "fk_orders_customer"
+
+def test_ambiguous_matches_across_datasets_are_skipped():
+    datasets = [
+        {"name": "a", "tables": [_table("users", ("id", "INT64"))]},
+        {"name": "b", "tables": [_table("users", ("id", "INT64"))]},
+        {"name": "c", "tables": [_table("events", ("id", "INT64"), ("user_id", "INT64"))]}
+    ]
+    assert infer_relationships(datasets) == []
+
+@pytest.fixture
+def relationships():
+    return infer_relationships(DATASETS, constraints=CONSTRAINTS)
+
+def test_build_join_paths_for_selected_tables(relationships):
+    paths = build_join_paths(relationships, ["sales.customers", "sales.order_items", "sales.categories"])
+
+    # Stored once per pair, under the lexically smaller table
+    assert set(paths) == {"sales.categories", "sales.customers"}
+    # customers -> orders -> order_items passes through a table outside the list
+    path = paths["sales.customers"]["sales.order_items"]
+    assert [relationships[index]["from_table"] for index in path] == ["orders", "order_items"]
+    assert len(paths["sales.categories"]["sales.order_items"]) == 2
+
+def test_build_join_paths_respects_max_length(relationships, monkeypatch):
+    monkeypatch.setattr(settings, "JOIN_PATH_MAX_LENGTH", 2)
+    paths = build_join_paths(relationships, ["sales.customers", "sales.categories", "sales.orders"])
+    # categories is three joins from orders and four from customers
+    assert list(paths) == ["sales.customers"]
+    assert list(paths["sales.customers"]) == ["sales.orders"]
+
+def test_build_join_paths_respects_max_paths(relationships, monkeypatch):
+    monkeypatch.setattr(settings, "JOIN_PATH_MAX_PATHS", 1)
+    paths = build_join_paths(relationships, ["sales.customers", "sales.orders", "sales.order_items"])
+    assert sum(len(targets) for targets in paths.values()) == 1
+
+def test_select_join_paths_renders_conditions(relationships):
+    text, stats = select_join_paths(relationships, ["sales.customers", "sales.order_items"], 1000)
+    assert "sales.orders.customer_id = sales.customers.id" in text
+    assert "sales.order_items.order_id = sales.orders.id" in text
+    assert stats["joins"] == 2
+
+def test_select_join_paths_within_budget(relationships):
+    assert select_join_paths(relationships, ["sales.customers", "sales.order_items"], 1) == ("", {"joins": 0, "tokens": 0})
+    assert select_join_paths(relationships, ["sales.customers"], 1000) == ("", {"joins": 0, "tokens": 0})
+    assert select_join_paths([], ["sales.customers", "sales.orders"], 1000) == ("", {"joins": 0, "tokens": 0})
+
+def test_join_graph_is_cached_per_metadata_version(relationships):
+    metadata = SimpleNamespace(version="v1", relationships=relationships)
+    graph = get_join_graph(1, metadata)
+    assert get_join_graph(1, metadata) is graph
+    assert get_join_graph(1, SimpleNamespace(version="v2", relationships=relationships)) is not graph
+
+    first = build_join_paths(relationships, ["sales.customers", "sales.order_items"], graph)
+    # The search from customers is reused for the next prompt
+    assert graph.paths_from("sales.customers") is graph.paths_from("sales.customers")
+    assert build_join_paths(relationships, ["sales.customers", "sales.order_items"], graph) == first
+    assert first == build_join_paths(relationships, ["sales.customers", "sales.order_items"])
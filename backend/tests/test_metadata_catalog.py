@@ -0,0 +1,71 @@
+from sqlalchemy import func, select
+
+from app.models.metadata_catalog import MetadataColumn, MetadataDataset, MetadataTable
+from app.services.metadata_catalog import get_catalog_table, sync_metadata_catalog
+
+CONNECTION_ID = 1
+
+def _table(name, *columns):
+    return {"name": name, "columns": [{"name": column, "type": "STRING", "mode": "NULLABLE"} for column in columns]}
+
+def _datasets():
+    return [
+        {"name": "sales", "tables": [_table("orders", "id", "customer_id"), _table("customers", "id", "name")]},
+        {"name": "web", "tables": [_table("events", "id", "ts", "url")]}
+    ]
+
+def _count(db, model):
+    return db.execute(select(func.count()).select_from(model)).scalar()
+
+def test_sync_writes_datasets_tables_and_columns(db):
+    stats = sync_metadata_catalog(db, CONNECTION_ID, _datasets())
+    db.commit()
+
+    assert stats == {"tables_written": 3, "tables_unchanged": 0, "tables_removed": 0, "columns_written": 7}
+    datasets = db.execute(select(MetadataDataset).order_by(MetadataDataset.position)).scalars().all()
+    assert [(d.name, d.table_count) for d in datasets] == [("sales", 2), ("web", 1)]
+    assert _count(db, MetadataColumn) == 7
+
+def test_sync_skips_unchanged_tables(db):
+    sync_metadata_catalog(db, CONNECTION_ID, _datasets())
+    db.commit()
+
+    datasets = _datasets()
+    datasets[0]["tables"][0] = _table("orders", "id", "customer_id", "total")
+    stats = sync_metadata_catalog(db, CONNECTION_ID, datasets)
+    db.commit()
+
+    assert stats == {"tables_written": 1, "tables_unchanged": 2, "tables_removed": 0, "columns_written": 3}
+    assert _count(db, MetadataColumn) == 8
+
+def test_sync_removes_dropped_tables_and_datasets(db):
+    sync_metadata_catalog(db, CONNECTION_ID, _datasets())
+    db.commit()
+
+    stats = sync_metadata_catalog(db, CONNECTION_ID, [{"name": "sales", "tables": [_table("orders", "id", "customer_id")]}])
+    db.commit()
+
+    assert stats["tables_removed"] == 2
+    assert _count(db, MetadataDataset) == 1
+    assert _count(db, MetadataTable) == 1
+    assert _count(db, MetadataColumn) == 2
+
+def test_sync_is_scoped_to_the_connection(db):
+    sync_metadata_catalog(db, CONNECTION_ID, _datasets())
+    sync_metadata_catalog(db, CONNECTION_ID + 1, [{"name": "other", "tables": [_table("t", "a")]}])
+    db.commit()
+
+    sync_metadata_catalog(db, CONNECTION_ID, [])
+    db.commit()
+
+    assert _count(db, MetadataTable) == 1
+    assert _count(db, MetadataColumn) == 1
+
+def test_get_catalog_table_returns_columns_in_order(db, run_async):
+    sync_metadata_catalog(db, CONNECTION_ID, _datasets())
+    db.commit()
+
+    table, columns = run_async(lambda session: get_catalog_table(session, CONNECTION_ID, "web", "events"))
+    assert table.name == "events"
+    assert [column.name for column in columns] == ["id", "ts", "url"]
+    assert run_async(lambda session: get_catalog_table(session, CONNECTION_ID, "web", "missing")) is None
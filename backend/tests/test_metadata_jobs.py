@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.metadata_job import MetadataExtractionJob
+from app.services import metadata_jobs
+from app.services.metadata_jobs import MetadataJobManager, get_active_metadata_job
+
+@pytest.fixture
+def manager(db_file, monkeypatch):
+    engine = create_engine(f"sqlite:///{db_file}")
+    monkeypatch.setattr(metadata_jobs, "SessionLocal", sessionmaker(bind=engine))
+    yield MetadataJobManager(1)
+    engine.dispose()
+
+def _job(db, connection_id, owner, heartbeat_age, status="running"):
+    job = MetadataExtractionJob(
+        database_connection_id=connection_id, user_id=1, status=status, full_refresh=False,
+        owner=owner, heartbeat_at=datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+def test_only_jobs_with_a_stale_heartbeat_are_recovered(db, manager):
+    stale = _job(db, 1, "other:1:dead", settings.METADATA_JOB_STALE_SECONDS + 60)
+    alive = _job(db, 2, "other:2:live", 1)
+    pending = _job(db, 3, "other:3:live", 1, status="pending")
+
+    manager.recover_interrupted_jobs()
+
+    db.expire_all()
+    assert stale.status == "failed"
+    assert stale.finished_at is not None
+    assert alive.status == "running"
+    assert pending.status == "pending"
+
+def test_heartbeat_refreshes_only_own_jobs(db, manager):
+    own = _job(db, 1, manager.owner, 60)
+    other = _job(db, 2, "other:1:live", 60)
+    own_before, other_before = own.heartbeat_at, other.heartbeat_at
+
+    manager.heartbeat()
+
+    db.expire_all()
+    assert own.heartbeat_at > own_before
+    assert other.heartbeat_at == other_before
+
+def test_one_active_job_per_connection(db):
+    _job(db, 1, "a:1:x", 1)
+    _job(db, 1, "a:1:x", 1, status="failed")
+    with pytest.raises(IntegrityError):
+        _job(db, 1, "b:2:y", 1, status="pending")
+    db.rollback()
+    _job(db, 2, "b:2:y", 1, status="pending")
+
+def test_submit_reuses_a_job_queued_by_another_process(db, manager, run_async, monkeypatch):
+    existing = _job(db, 1, "other:1:live", 1, status="pending")
+    # The other process commits its job after this one checked for an active job
+    calls = []
+
+    async def racing_lookup(session, connection_id):
+        calls.append(connection_id)
+        return None if len(calls) == 1 else await get_active_metadata_job(session, connection_id)
+
+    monkeypatch.setattr(metadata_jobs, "get_active_metadata_job", racing_lookup)
+
+    async def submit(session):
+        job = await manager.submit(session, SimpleNamespace(id=1), user_id=1)
+        return job.id, (await get_active_metadata_job(session, 1)).id
+
+    assert run_async(submit) == (existing.id, existing.id)
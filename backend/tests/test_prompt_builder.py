@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.services.prompt_builder import UseCaseIndex, format_use_cases
+from app.services.tokens import count_tokens
+
+USE_CASES = [
+    {"natural_language_example": "Total revenue by month", "example_query": "SELECT month, SUM(amount) FROM sales.orders GROUP BY month"},
+    {"natural_language_example": "Top customers by number of orders", "example_query": "SELECT customer_id, COUNT(*) FROM sales.orders GROUP BY customer_id"},
+    {"natural_language_example": "Daily page views", "example_query": "SELECT DATE(ts), COUNT(*) FROM web.events GROUP BY 1"},
+    {"natural_language_example": "Customers who signed up last week", "example_query": "SELECT * FROM sales.customers WHERE signup_date > CURRENT_DATE - 7"}
+]
+
+def test_select_ranks_matching_use_cases_first():
+    index = UseCaseIndex(USE_CASES)
+    selected, _ = index.select("page views per day", top_k=1, token_budget=10000)
+    assert selected == [USE_CASES[2]]
+
+def test_select_keeps_original_order_and_top_k():
+    index = UseCaseIndex(USE_CASES)
+    selected, _ = index.select("customers orders", top_k=2, token_budget=10000)
+    assert selected == [USE_CASES[1], USE_CASES[3]]
+
+def test_select_reports_tokens_within_budget():
+    index = UseCaseIndex(USE_CASES)
+    selected, tokens = index.select("customers orders", top_k=5, token_budget=10000)
+    assert tokens <= 10000
+    assert tokens >= count_tokens(format_use_cases(selected)) - len(selected)
+
+def test_select_skips_examples_that_do_not_fit():
+    index = UseCaseIndex(USE_CASES)
+    header = count_tokens("\nUse Cases:\n")
+    budget = header + min(index.tokens[1], index.tokens[3]) + 1
+    selected, tokens = index.select("customers signed up orders", top_k=5, token_budget=budget)
+    assert 1 <= len(selected) < len(USE_CASES)
+    assert tokens <= budget
+
+def test_select_falls_back_to_all_examples_without_matches():
+    index = UseCaseIndex(USE_CASES)
+    selected, _ = index.select("zzz", top_k=2, token_budget=10000)
+    assert selected == USE_CASES[:2]
+
+def test_select_with_nothing_fitting_uses_no_tokens():
+    index = UseCaseIndex(USE_CASES)
+    assert index.select("revenue", top_k=5, token_budget=1) == ([], 0)
+
+def test_select_blends_embedding_similarity():
+    index = UseCaseIndex(USE_CASES)
+    index.embeddings = np.eye(len(USE_CASES), dtype=np.float32)
+    # No lexical match; the vector points at the third example
+    question_vector = np.array([0, 0, 1, 0], dtype=np.float32)
+    selected, _ = index.select("traffic", top_k=1, token_budget=10000, question_vector=question_vector)
+    assert selected == [USE_CASES[2]]
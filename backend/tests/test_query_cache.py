@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.query_cache import SQLQueryCache, _SimilarityIndex, metadata_version
+
+class StubEmbeddings:
+    """Embeds questions by looking them up; unknown questions get an orthogonal vector."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    async def aembed_query(self, text):
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+def _cache(**kwargs):
+    options = {"max_entries": 10, "ttl_seconds": 60}
+    options.update(kwargs)
+    return SQLQueryCache(**options)
+
+def test_exact_hit_on_normalized_question():
+    cache = _cache()
+    asyncio.run(cache.set(1, "v1", "How many orders?", "sql"))
+    assert asyncio.run(cache.get(1, "v1", "  how many   ORDERS ")) == ("sql", "exact")
+
+def test_miss_after_metadata_change():
+    cache = _cache()
+    before = SimpleNamespace(version="v1", datasets=None, relationships=None)
+    after = SimpleNamespace(version="v2", datasets=None, relationships=None)
+    asyncio.run(cache.set(1, metadata_version(before), "How many orders?", "sql"))
+    assert asyncio.run(cache.get(1, metadata_version(after), "How many orders?")) == (None, None)
+    # Use cases are part of the version too
+    with_use_cases = metadata_version(before, [{"question": "q", "sql": "s"}])
+    assert asyncio.run(cache.get(1, with_use_cases, "How many orders?")) == (None, None)
+
+def test_least_recently_used_entries_are_evicted():
+    cache = _cache(max_entries=2)
+    asyncio.run(cache.set(1, "v1", "a", "sql a"))
+    asyncio.run(cache.set(1, "v1", "b", "sql b"))
+    asyncio.run(cache.get(1, "v1", "a"))
+    asyncio.run(cache.set(1, "v1", "c", "sql c"))
+    assert asyncio.run(cache.get(1, "v1", "b")) == (None, None)
+    assert asyncio.run(cache.get(1, "v1", "a")) == ("sql a", "exact")
+    assert asyncio.run(cache.get(1, "v1", "c")) == ("sql c", "exact")
+
+def test_expired_entries_miss():
+    cache = _cache(ttl_seconds=-1)
+    asyncio.run(cache.set(1, "v1", "a", "sql a"))
+    assert asyncio.run(cache.get(1, "v1", "a")) == (None, None)
+
+def test_similarity_hit_within_the_same_version():
+    cache = _cache(similarity_enabled=True, similarity_threshold=0.9)
+    cache._embeddings = StubEmbeddings({
+        "how many orders": [1.0, 0.0, 0.0],
+        "count the orders": [0.99, 0.1, 0.0],
+        "list customers": [0.0, 1.0, 0.0]
+    })
+    asyncio.run(cache.set(1, "v1", "How many orders?", "sql"))
+    assert asyncio.run(cache.get(1, "v1", "Count the orders")) == ("sql", "similar")
+    assert asyncio.run(cache.get(1, "v1", "List customers")) == (None, None)
+    assert asyncio.run(cache.get(1, "v2", "Count the orders")) == (None, None)
+    assert asyncio.run(cache.get(2, "v1", "Count the orders")) == (None, None)
+
+def test_invalidate_connection():
+    cache = _cache(similarity_enabled=True)
+    cache._embeddings = StubEmbeddings({"a": [1.0, 0.0, 0.0]})
+    asyncio.run(cache.set(1, "v1", "a", "sql 1"))
+    asyncio.run(cache.set(2, "v1", "a", "sql 2"))
+    cache.invalidate_connection(1)
+    assert asyncio.run(cache.get(1, "v1", "a")) == (None, None)
+    assert asyncio.run(cache.get(2, "v1", "a")) == ("sql 2", "exact")
+
+def test_similarity_index_grows_and_swap_removes():
+    index = _SimilarityIndex()
+    vectors = np.eye(40, dtype=np.float32)
+    keys = [(1, "v1", f"q{i}") for i in range(40)]
+    for key, vector in zip(keys, vectors):
+        index.add(key, vector)
+    index.add(keys[5], vectors[5])
+    assert len(index.keys) == 40
+
+    index.remove(keys[3])
+    index.remove(keys[3])
+    assert len(index.keys) == 39
+    assert index.search(vectors[3], "v1", 0.5) is None
+    # Every remaining key still finds its own vector, including the one moved into row 3
+    for key, vector in zip(keys, vectors):
+        if key != keys[3]:
+            assert index.search(vector, "v1", 0.5) == key
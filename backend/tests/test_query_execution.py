@@ -0,0 +1,50 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import query_execution
+from app.services.query_execution import QueryNotAllowed, execute_query
+
+class StubClient:
+    def __init__(self, statement_type="SELECT"):
+        self.statement_type = statement_type
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        self.queries.append((sql, bool(job_config.dry_run)))
+        rows = SimpleNamespace(total_rows=0)
+        return SimpleNamespace(
+            job_id="job", total_bytes_processed=0, statement_type=self.statement_type,
+            result=lambda page_size=None, timeout=None: rows
+        )
+
+@pytest.fixture
+def client(monkeypatch):
+    client = StubClient()
+    registry = SimpleNamespace(checkout=lambda connection: nullcontext(client), get_storage_client=lambda connection: None)
+    monkeypatch.setattr(query_execution, "bigquery_client_registry", registry)
+    return client
+
+CONNECTION = SimpleNamespace(id=1)
+
+def test_select_runs_without_a_dry_run(client):
+    execute_query(CONNECTION, "SELECT 1", 10, 1000).close()
+    assert client.queries == [("SELECT 1", False)]
+
+def test_dml_is_rejected_before_reaching_bigquery(client):
+    with pytest.raises(QueryNotAllowed):
+        execute_query(CONNECTION, "DELETE FROM ds.t WHERE true", 10, 1000)
+    assert client.queries == []
+
+def test_unparseable_sql_is_checked_with_a_dry_run(client):
+    sql = "EXPORT DATA OPTIONS (uri = 'gs://b/*') AS SELECT 1"
+    client.statement_type = "EXPORT_DATA"
+    with pytest.raises(QueryNotAllowed):
+        execute_query(CONNECTION, sql, 10, 1000)
+    assert client.queries == [(sql, True)]
+
+    client.queries.clear()
+    client.statement_type = "SELECT"
+    execute_query(CONNECTION, sql, 10, 1000).close()
+    assert client.queries == [(sql, True), (sql, False)]
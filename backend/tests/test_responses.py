@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from app.core import responses
+from app.core.config import settings
+from app.core.responses import fast_json_response
+from app.models.base_models import DatabaseConnection, DatabaseMetadata
+from app.schemas.database import DatabaseMetadataResponse
+
+METADATA = {
+    "datasets": [{
+        "name": "ventas",
+        "tables": [{
+            "name": "pedidos",
+            "description": "Pedidos — año fiscal ✓",
+            "columns": [
+                {"name": "importe", "type": "FLOAT64", "description": None, "sample": 1e-07},
+                {"name": "id", "type": "INT64", "max": 9007199254740993, "nested": {"fields": []}}
+            ]
+        }]
+    }],
+    "tables": [{"name": "pedidos", "row_count": 0, "size_mb": 12.5}],
+    "relationships": [{"from": "pedidos.cliente_id", "to": "clientes.id", "confidence": 0.9}],
+    "constraints": None
+}
+
+@pytest.mark.skipif(responses.orjson is None, reason="orjson not installed")
+def test_fast_response_matches_response_model():
+    payload = {"id": 7, "database_connection_id": 3, **METADATA}
+
+    fast = fast_json_response(payload)
+    validated = jsonable_encoder(DatabaseMetadataResponse(**payload))
+
+    assert isinstance(fast, ORJSONResponse)
+    assert json.loads(fast.body) == validated
+
+@pytest.mark.skipif(responses.orjson is None, reason="orjson not installed")
+def test_metadata_endpoint_serializes_the_same_on_both_paths(api_client, api_user, db, monkeypatch):
+    connection = DatabaseConnection(name="warehouse", connection_type="bigquery", user_id=api_user.id)
+    db.add(connection)
+    db.commit()
+    db.add(DatabaseMetadata(database_connection_id=connection.id, version="v1", **METADATA))
+    db.commit()
+    path = f"/api/v1/databases/{connection.id}/metadata"
+
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+    validated = api_client.get(path)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = api_client.get(path)
+
+    assert validated.status_code == fast.status_code == 200
+    assert fast.json() == validated.json()
+    assert fast.headers["etag"] == validated.headers["etag"]
+    assert fast.headers["content-type"] == validated.headers["content-type"] == "application/json"
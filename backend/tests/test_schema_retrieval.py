@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.schema_retrieval import BM25Index, SchemaIndex, render_schema, select_schema, tokenize
+
+def _table(name, *columns):
+    return {"name": name, "columns": [{"name": column, "type": "STRING"} for column in columns]}
+
+DATASETS = [
+    {
+        "name": "sales",
+        "tables": [
+            _table("orders", "order_id", "customer_id", "total_amount", "created_at"),
+            _table("customers", "customer_id", "email", "signup_date"),
+            _table("refunds", "refund_id", "order_id", "reason")
+        ]
+    },
+    {
+        "name": "ops",
+        "tables": [_table(f"log_{i}", *(f"field_{j}" for j in range(20))) for i in range(10)]
+    }
+]
+
+def test_tokenize_splits_identifiers_and_stems():
+    assert tokenize("customerOrders total_amount") == ["customer", "order", "total", "amount"]
+    assert tokenize(None) == []
+
+def test_bm25_ranks_matching_documents_first():
+    index = BM25Index([["order", "total"], ["customer", "email"], ["order", "order", "refund"]])
+    scores = index.scores(["refund", "order"])
+    assert scores.argmax() == 2
+    assert scores[1] == 0
+
+def test_select_respects_the_token_budget():
+    index = SchemaIndex(DATASETS)
+    budget = index.total_tokens // 4
+
+    text, stats = index.select("total amount of orders per customer", budget, top_k=10, max_columns=50)
+
+    assert stats["tokens_selected"] <= budget
+    assert stats["tokens_selected"] < stats["tokens_total"]
+    assert stats["selected_tables"][:2] == ["sales.orders", "sales.customers"]
+    assert "log_" not in text
+
+def test_select_keeps_everything_when_it_fits():
+    index = SchemaIndex(DATASETS)
+    text, stats = index.select("anything", index.total_tokens, top_k=1, max_columns=50)
+    assert stats["tables_selected"] == stats["tables_total"]
+    assert text == render_schema(DATASETS)
+
+def test_select_prunes_columns_to_those_mentioned():
+    index = SchemaIndex(DATASETS)
+    text, _ = index.select("log 3, value 17", 50, top_k=1, max_columns=2)
+    assert "- log_3" in text
+    assert "field_3 (STRING), field_17 (STRING)" in text
+    assert text.count("(STRING)") == 2
+
+def test_select_schema_uses_the_precompiled_schema_when_it_fits():
+    metadata = SimpleNamespace(schema_text="precompiled", schema_token_count=10, datasets=DATASETS)
+    assert asyncio.run(select_schema("orders", 1, metadata, token_budget=10)) == (
+        "precompiled", {"tokens_total": 10, "tokens_selected": 10}
+    )
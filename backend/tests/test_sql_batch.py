@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from app.core.config import settings
+from app.services.sql_generation import SQLGenerationService, SQLQuery
+
+def _service(generate):
+    # The batch only goes through generate_sql, so skip building the LLM client
+    service = SQLGenerationService.__new__(SQLGenerationService)
+    service.generate_sql = generate
+    return service
+
+def _collect(service, questions, concurrency):
+    async def main():
+        return [
+            item async for item in service.generate_sql_batch(
+                questions, SimpleNamespace(), SimpleNamespace(id=1), None, concurrency
+            )
+        ]
+    return asyncio.run(main())
+
+def test_semaphore_bounds_concurrency():
+    running = [0]
+    peak = [0]
+
+    async def generate(question, metadata, connection, use_cases):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return SQLQuery(sql_query=f"SELECT '{question}'", explanation="")
+
+    items = _collect(_service(generate), [f"q{i}" for i in range(10)], concurrency=3)
+
+    assert peak[0] == 3
+    assert sorted(index for index, _, _ in items) == list(range(10))
+    assert all(result is not None and error is None for _, result, error in items)
+
+def test_item_errors_do_not_fail_the_batch():
+    async def generate(question, metadata, connection, use_cases):
+        if question == "bad":
+            raise ValueError("no such table")
+        return SQLQuery(sql_query="SELECT 1", explanation="")
+
+    items = {index: (result, error) for index, result, error in _collect(_service(generate), ["ok", "bad", "ok"], 2)}
+
+    assert items[1] == (None, "Error generating SQL query: no such table")
+    assert items[0][0].sql_query == items[2][0].sql_query == "SELECT 1"
+    assert items[0][1] is None and items[2][1] is None
+
+def test_rate_limits_are_retried(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_BATCH_RATE_LIMIT_BACKOFF", 0.0)
+    monkeypatch.setattr(settings, "SQL_BATCH_RATE_LIMIT_RETRIES", 2)
+    attempts = []
+
+    async def generate(question, metadata, connection, use_cases):
+        attempts.append(question)
+        if len(attempts) == 1:
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://llm"))
+            raise openai.RateLimitError("slow down", response=response, body=None)
+        return SQLQuery(sql_query="SELECT 1", explanation="")
+
+    items = _collect(_service(generate), ["q"], 1)
+
+    assert attempts == ["q", "q"]
+    assert items[0][2] is None
@@ -0,0 +1,94 @@
+import pytest
+
+from app.services.sql_validation import SchemaReferenceIndex, is_read_only, validate_sql
+
+DATASETS = [
+    {
+        "name": "ds",
+        "tables": [
+            {"name": "t", "columns": [{"name": "a"}, {"name": "b"}, {"name": "arr"}]},
+            {"name": "u", "columns": [{"name": "k"}, {"name": "v"}]}
+        ]
+    }
+]
+
+@pytest.fixture
+def index():
+    return SchemaReferenceIndex(DATASETS, default_dataset="ds")
+
+@pytest.mark.parametrize("sql", [
+    "SELECT a, b FROM ds.t",
+    "SELECT t.a, u.v FROM ds.t JOIN ds.u ON u.k = t.a",
+    "SELECT a AS x FROM t ORDER BY x",
+    "SELECT a FROM ds.t WHERE a IN (SELECT k FROM ds.u)",
+    "SELECT a FROM ds.t WHERE a NOT IN (SELECT k FROM ds.u WHERE v > 0)",
+    "SELECT a FROM ds.t WHERE EXISTS (SELECT 1 FROM ds.u WHERE u.k = t.a)",
+    "SELECT a FROM ds.t WHERE EXISTS (SELECT 1 FROM ds.u WHERE k = a)",
+    "SELECT a, (SELECT MAX(k) FROM ds.u) AS m FROM ds.t",
+    "SELECT a, x FROM ds.t, UNNEST(t.arr) AS x",
+    "SELECT a, x FROM ds.t CROSS JOIN UNNEST(arr) AS x WHERE x > 1",
+    "WITH c AS (SELECT k, v FROM ds.u) SELECT t.a, c.v FROM ds.t JOIN c ON c.k = t.a",
+    "WITH c AS (SELECT k FROM ds.u) SELECT a FROM ds.t WHERE a IN (SELECT k FROM c)",
+    "SELECT d.total FROM (SELECT SUM(v) AS total FROM ds.u) AS d",
+    "SELECT _PARTITIONTIME FROM ds.t"
+])
+def test_valid_queries_pass(index, sql):
+    assert validate_sql(sql, index) == []
+
+def test_unknown_table(index):
+    errors = validate_sql("SELECT a FROM ds.tt", index)
+    assert errors == ["Unknown table `ds.tt`. Did you mean: ds.t?"]
+
+def test_unknown_qualified_column(index):
+    errors = validate_sql("SELECT t.c FROM ds.t", index)
+    assert errors == ["Column `c` does not exist in table `ds.t`."]
+
+def test_unknown_column_in_subquery(index):
+    errors = validate_sql("SELECT a FROM ds.t WHERE a IN (SELECT kk FROM ds.u)", index)
+    assert errors == ["Column `kk` does not exist in any table of the query."]
+
+def test_unknown_column_in_cte(index):
+    errors = validate_sql("WITH c AS (SELECT missing FROM ds.u) SELECT * FROM c", index)
+    assert errors == ["Column `missing` does not exist in any table of the query."]
+
+def test_column_not_selected_by_cte(index):
+    errors = validate_sql("WITH c AS (SELECT k FROM ds.u) SELECT c.v FROM c", index)
+    assert errors == ["Column `v` is not selected by `c`."]
+
+@pytest.mark.parametrize("sql", ["SELECT 'abc", "SELECT a FROM", "SELECT a FROM ds.t WHERE (a = 1"])
+def test_syntax_errors_are_reported(index, sql):
+    errors = validate_sql(sql, index)
+    assert len(errors) == 1
+    assert errors[0].startswith("Syntax error")
+
+def test_empty_query(index):
+    assert validate_sql(";", index) == ["The query is empty."]
+
+@pytest.mark.parametrize("sql", [
+    "SELECT a FROM ds.t",
+    "WITH c AS (SELECT k FROM ds.u) SELECT * FROM c",
+    "SELECT a FROM ds.t UNION ALL SELECT k FROM ds.u",
+    "SELECT a FROM ds.t EXCEPT DISTINCT SELECT k FROM ds.u",
+    "(SELECT a FROM ds.t)"
+])
+def test_queries_are_read_only(sql):
+    assert is_read_only(sql) is True
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO ds.t (a) VALUES (1)",
+    "WITH c AS (SELECT k FROM ds.u) INSERT INTO ds.t (a) SELECT k FROM c",
+    "UPDATE ds.t SET a = 1 WHERE true",
+    "DELETE FROM ds.t WHERE true",
+    "MERGE ds.t USING ds.u ON t.a = u.k WHEN MATCHED THEN DELETE",
+    "CREATE TABLE ds.x AS SELECT a FROM ds.t",
+    "DROP TABLE ds.t",
+    "SELECT a FROM ds.t; DROP TABLE ds.t",
+    "CALL ds.cleanup()",
+    "EXECUTE IMMEDIATE 'DROP TABLE ds.t'",
+    ";"
+])
+def test_other_statements_are_not_read_only(sql):
+    assert is_read_only(sql) is False
+
+def test_unparseable_sql_is_left_to_bigquery():
+    assert is_read_only("EXPORT DATA OPTIONS (uri = 'gs://b/*') AS SELECT a FROM ds.t") is None
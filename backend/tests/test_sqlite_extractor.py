@@ -0,0 +1,109 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.extractors.registry import get_extractor
+from app.services.extractors.sql import SQLiteExtractor
+
+SCHEMA = """
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    name TEXT
+);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER REFERENCES customers,
+    total REAL
+);
+CREATE TABLE order_items (
+    order_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    sku TEXT,
+    PRIMARY KEY (order_id, line),
+    FOREIGN KEY (order_id) REFERENCES orders (id)
+);
+INSERT INTO customers VALUES (1, 'a@example.com', 'A'), (2, 'b@example.com', 'B');
+INSERT INTO orders VALUES (10, 1, 5.0), (11, 2, 7.5), (12, 3, 1.0), (13, NULL, 2.0);
+INSERT INTO order_items VALUES (10, 1, 'x'), (11, 1, 'y');
+"""
+
+@pytest.fixture
+def connection(tmp_path, monkeypatch):
+    sqlite3.connect(tmp_path / "shop.db").executescript(SCHEMA).connection.close()
+    monkeypatch.setattr(settings, "SQLITE_CONNECTIONS_DIR", str(tmp_path))
+    return SimpleNamespace(
+        id=1, connection_type="sqlite", database_name="shop.db", dataset=None,
+        host=None, port=None, username=None, credentials_json=None
+    )
+
+def test_registry_returns_sqlite_extractor(connection):
+    assert isinstance(get_extractor(connection), SQLiteExtractor)
+
+def test_extract_datasets_and_columns(connection):
+    metadata = SQLiteExtractor().extract(connection)
+
+    assert [dataset["name"] for dataset in metadata["datasets"]] == ["main"]
+    tables = {table["name"]: table["columns"] for table in metadata["datasets"][0]["tables"]}
+    assert sorted(tables) == ["customers", "order_items", "orders"]
+    assert tables["customers"] == [
+        {"name": "id", "type": "INTEGER", "mode": "REQUIRED", "description": None},
+        {"name": "email", "type": "TEXT", "mode": "REQUIRED", "description": None},
+        {"name": "name", "type": "TEXT", "mode": "NULLABLE", "description": None}
+    ]
+    assert set(metadata["table_fingerprints"]) == {"main.customers", "main.orders", "main.order_items"}
+
+def test_extract_constraints(connection):
+    constraints = SQLiteExtractor().extract(connection)["constraints"]
+
+    primary_keys = {c["table"]: c["columns"] for c in constraints if c["type"] == "primary_key"}
+    assert primary_keys == {"customers": ["id"], "orders": ["id"], "order_items": ["order_id", "line"]}
+    uniques = [(c["table"], c["columns"]) for c in constraints if c["type"] == "unique"]
+    assert uniques == [("customers", ["email"])]
+
+def test_extract_relationships(connection):
+    relationships = SQLiteExtractor().extract(connection)["relationships"]
+
+    by_table = {r["from_table"]: r for r in relationships}
+    assert set(by_table) == {"orders", "order_items"}
+    # REFERENCES without a column list points at the parent's primary key
+    assert by_table["orders"]["from_columns"] == ["customer_id"]
+    assert (by_table["orders"]["to_table"], by_table["orders"]["to_columns"]) == ("customers", ["id"])
+    assert (by_table["order_items"]["to_table"], by_table["order_items"]["to_columns"]) == ("orders", ["id"])
+
+def test_sample_overlap(connection):
+    extractor = SQLiteExtractor()
+    relationships = extractor.extract(connection)["relationships"]
+    relationships.sort(key=lambda r: r["from_table"])
+    composite = dict(relationships[0], from_columns=["a", "b"], to_columns=["c", "d"])
+
+    overlaps = extractor.sample_overlap(connection, relationships + [composite], sample_size=100)
+    # order_items -> orders: both sampled ids exist; orders -> customers: 2 of 3 non-null ids
+    assert overlaps == [1.0, pytest.approx(2 / 3), None]
+
+def test_test_connection(connection):
+    assert SQLiteExtractor().test_connection(connection) is True
+
+def test_opens_files_read_only(connection, tmp_path):
+    engine = SQLiteExtractor().create_engine(connection)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(Exception, match="readonly"):
+                conn.exec_driver_sql("DELETE FROM customers")
+    finally:
+        engine.dispose()
+
+@pytest.mark.parametrize("database_name", ["missing.db", "../outside.db", "/etc/passwd"])
+def test_refuses_paths_outside_the_configured_directory(connection, tmp_path, database_name):
+    sqlite3.connect(tmp_path.parent / "outside.db").close()
+    connection.database_name = database_name
+    with pytest.raises(ValueError):
+        SQLiteExtractor().test_connection(connection)
+    assert not (tmp_path / "missing.db").exists()
+
+def test_disabled_without_a_configured_directory(connection, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_CONNECTIONS_DIR", None)
+    with pytest.raises(ValueError):
+        SQLiteExtractor().extract(connection)
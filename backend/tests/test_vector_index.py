@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+
+from app.services.vector_index import VectorStore
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record which texts were embedded."""
+
+    def __init__(self, dim: int = 3):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def _vector(self, text):
+        if text == "x-axis":
+            return [1.0] + [0.0] * (self.dim - 1)
+        return [float(len(text) + i) for i in range(self.dim)]
+
+def _store(tmp_path):
+    return VectorStore(str(tmp_path), "tables", "test-model")
+
+def test_sync_embeds_only_new_and_changed_entries(tmp_path):
+    store = _store(tmp_path)
+    embed = FakeEmbeddings()
+    assert store.sync({"a": "alpha", "b": "beta"}, embed) == {"embedded": 2, "removed": 0, "total": 2}
+
+    embed.calls.clear()
+    stats = store.sync({"a": "alpha", "b": "beta two", "c": "gamma"}, embed)
+    assert stats == {"embedded": 2, "removed": 0, "total": 3}
+    assert sorted(embed.calls) == ["beta two", "gamma"]
+
+def test_sync_removes_entries_and_reloads_from_disk(tmp_path):
+    store = _store(tmp_path)
+    embed = FakeEmbeddings()
+    store.sync({"a": "alpha", "b": "beta", "c": "x-axis"}, embed)
+    store.sync({"c": "x-axis", "b": "beta"}, embed)
+
+    reopened = _store(tmp_path)
+    vectors = reopened.vectors_for(["c", "missing"])
+    assert sorted(reopened.keys) == ["b", "c"]
+    np.testing.assert_allclose(vectors[0], [1.0, 0.0, 0.0])
+    np.testing.assert_allclose(vectors[1], [0.0, 0.0, 0.0])
+
+def test_search_ranks_by_cosine_similarity(tmp_path):
+    store = _store(tmp_path)
+    store.sync({"a": "alpha", "c": "x-axis"}, FakeEmbeddings())
+    results = store.search(np.array([1.0, 0.0, 0.0]), 1)
+    assert [key for key, _ in results] == ["c"]
+
+def test_dimension_change_rebuilds_without_deadlock(tmp_path):
+    store = _store(tmp_path)
+    store.sync({"a": "alpha", "b": "beta"}, FakeEmbeddings(dim=3))
+
+    result = {}
+    def resync():
+        result["stats"] = store.sync({"a": "alpha", "b": "beta changed"}, FakeEmbeddings(dim=2))
+    thread = threading.Thread(target=resync, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert result["stats"]["total"] == 2
+    assert store.dim == 2
+    assert store.vectors_for(["a", "b"]).shape == (2, 2)
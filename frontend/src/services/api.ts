@@ -99,4 +99,43 @@ export const extractDatabaseMetadata = (id: number) =>
 export const generateSQLQuery = (connectionId: number, question: string) =>
   api.post(`/query/${connectionId}/generate`, { question });
 
+// Streams Server-Sent Events: onToken for raw output as it arrives, then the parsed result
+export const streamSQLQuery = async (
+  connectionId: number,
+  question: string,
+  onToken: (text: string) => void
+) => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${API_URL}/query/${connectionId}/generate/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ question, database_connection_id: connectionId }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Streaming request failed: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop() || '';
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+      if (event === 'token') onToken(data.text);
+      if (event === 'result') return data;
+      if (event === 'error') throw new Error(data.detail);
+    }
+  }
+  throw new Error('Stream ended without a result');
+};
+
 export default api; 
\ No newline at end of file